@@ -1,21 +1,32 @@
+import os
+import sys
 import matplotlib.pyplot as plt
 import numpy as np
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from common.packed import PackedSequence, as_text
+from common.figures import show_figure
+from common.instrument import count, enable_from_argv, timed
 
-def calculate_cg_content(sequence: str) -> float:
+
+def calculate_cg_content(sequence) -> float:
     """
     (C+G)% as defined in Gagniuc et al.
     CG% = 100 * (C + G) / (A + C + G + T)
+    Accepts a str or a PackedSequence.
     """
-    sequence = sequence.upper()
     length = len(sequence)
     if length == 0:
         return 0.0
 
-    c = sequence.count("C")
-    g = sequence.count("G")
-    a = sequence.count("A")
-    t = sequence.count("T")
+    if isinstance(sequence, PackedSequence):
+        a, c, g, t = (int(value) for value in sequence.base_counts())
+    else:
+        sequence = sequence.upper()
+        c = sequence.count("C")
+        g = sequence.count("G")
+        a = sequence.count("A")
+        t = sequence.count("T")
 
     total = a + c + g + t
     if total == 0:
@@ -24,7 +35,7 @@ def calculate_cg_content(sequence: str) -> float:
     return (c + g) / total * 100.0
 
 
-def calculate_kappa_ic(sequence: str) -> float:
+def calculate_kappa_ic(sequence) -> float:
     """
     Kappa Index of Coincidence for a *single* sequence,
     implemented exactly as in Gagniuc's VB code (DNAKAPPA):
@@ -46,7 +57,7 @@ def calculate_kappa_ic(sequence: str) -> float:
 
     Here we implement the same logic in Python.
     """
-    sequence = sequence.upper()
+    sequence = as_text(sequence).upper()
     n = len(sequence)
     if n <= 1:
         return 0.0
@@ -72,15 +83,19 @@ def calculate_kappa_ic(sequence: str) -> float:
     return ic_value
 
 
-def sliding_window_analysis(sequence: str, window_size: int = 30):
+@timed("sliding_windows")
+def sliding_window_analysis(sequence, window_size: int = 30):
     """
     Perform sliding-window analysis (step = 1 nt).
     Returns:
         positions: start index of each window
         cg_values: (C+G)% for each window
         kappa_values: Kappa IC for each window
+    A PackedSequence is never decoded as a whole: each window is sliced
+    packed, counted from its codes and decoded on its own for the kappa.
     """
-    sequence = sequence.upper()
+    if not isinstance(sequence, PackedSequence):
+        sequence = sequence.upper()
     n = len(sequence)
     if n < window_size:
         return [], [], []
@@ -98,6 +113,7 @@ def sliding_window_analysis(sequence: str, window_size: int = 30):
         cg_values.append(cg)
         kappa_values.append(kappa)
 
+    count("windows", len(positions))
     return positions, cg_values, kappa_values
 
 
@@ -135,7 +151,7 @@ def plot_pattern(cg_values, kappa_values, title="DNA Pattern: (C+G)% vs Kappa IC
     plt.legend()
 
     plt.tight_layout()
-    plt.show()
+    show_figure(title)
 
 
 def plot_centers(centers, labels=None):
@@ -160,10 +176,11 @@ def plot_centers(centers, labels=None):
     plt.legend()
 
     plt.tight_layout()
-    plt.show()
+    show_figure("pattern_centers")
 
 
 def main():
+    enable_from_argv()
     # Test sequence from the assignment
     S = "CGGACTGATCTATCTAAAAAAAAAAAAAAAAAAAAAAAAAAACGTAGCATCTATCGATCTATCTAGCGATCTATCTACTACG"
     window_size = 30
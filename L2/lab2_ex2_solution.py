@@ -1,23 +1,41 @@
 # Find in sequence S only the dinucleotydes and trinucleotydes that exist, without the use of 
 # the brute force engine
 
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.kmers import MAX_DENSE_K, count_kmers, count_kmers_multi, kmer_counts, window_codes
+
 S="TACGTGCGCGCGAGCTATCTACTGACTTACGACTAGTGTAGCTGCATCATCGATCGA"
 
 # In order to achieve the results, one must verify these combinations starting from the beginning 
 # of the sequence.
 
-def from_the_beginning(S, k):
+def from_the_beginning(S, k, counts=None):
+    # count every k-mer in one pass (or use the table passed in) instead of
+    # comparing all pairs of windows, then print one line per window as before
     pieces = len(S)-k+1
-    for i in range (pieces):
-        cnt = 0
-        for j in range (pieces):
-            if S[i:i+k] == S[j:j+k]:
-                cnt += 1
-        percentage = (cnt/pieces)*100
-        print(S[i:i+k], cnt, f"{percentage:.4f}%", sep="\t")
+    if pieces <= 0:
+        return
+    S = S.upper()
+    windows = [S[i:i+k] for i in range(pieces)]
+    # windows with a non-ACGT base are not counted
+    if k > MAX_DENSE_K:
+        # no dense table past MAX_DENSE_K; the sparse counter gives a dict
+        found = kmer_counts(S, k)
+        cnts = [found.get(window, 0) for window in windows]
+    else:
+        if counts is None:
+            counts = count_kmers(S, k)
+        codes, valid = window_codes(S, k)
+        cnts = [int(counts[code]) if ok else 0 for code, ok in zip(codes.tolist(), valid.tolist())]
+    print("\n".join(f"{window}\t{cnt}\t{(cnt/pieces)*100:.4f}%" for window, cnt in zip(windows, cnts)))
 
-from_the_beginning(S, 2)
-from_the_beginning(S, 3)
+if __name__ == "__main__":
+    tables = count_kmers_multi(S.upper(), (2, 3))
+    from_the_beginning(S, 2, tables[2])
+    from_the_beginning(S, 3, tables[3])
 
         
         
@@ -1,209 +1,209 @@
 import os
+import sys
 import tkinter as tk
 from tkinter import filedialog, messagebox
 from tkinter import ttk
-from collections import Counter
-
-SEQ = ""  
-RESULTS = [] 
-
-
-def read_fasta(path):
-    parts = []
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            if line.startswith(">"):
-                continue
-            parts.append(line.strip())
-    return "".join(parts).upper()
-
-
-def compute_freqs(sequence, window_size, step):
-    sequence = sequence.upper()
-    n = len(sequence)
-    if n < window_size:
-        return []
-
-    rows = []
-    idx = 0
-    for start in range(0, n - window_size + 1, step):
-        window = sequence[start:start + window_size]
-        counts = Counter(window)
-        total = float(window_size)
-        freq_a = counts.get("A", 0) / total
-        freq_c = counts.get("C", 0) / total
-        freq_g = counts.get("G", 0) / total
-        freq_t = counts.get("T", 0) / total
-        rows.append({
-            "window_index": idx,
-            "start": start,
-            "end": start + window_size - 1,
-            "A": freq_a,
-            "C": freq_c,
-            "G": freq_g,
-            "T": freq_t,
-        })
-        idx += 1
-    return rows
-
-
-root = tk.Tk()
-root.title("FASTA Sliding-Window Analyzer (simple)")
-root.geometry("980x680")
-
-
-top = ttk.Frame(root)
-top.pack(side=tk.TOP, fill=tk.X, padx=10, pady=10)
-
-file_label_var = tk.StringVar(value="No file selected")
-window_size_var = tk.IntVar(value=30)
-step_var = tk.IntVar(value=1)
-
-
-def on_open():
-    global SEQ, RESULTS
-    path = filedialog.askopenfilename(
-        title="Select FASTA file",
-        initialdir=os.getcwd(),
-        filetypes=[("FASTA files", "*.fa *.fasta *.fna"), ("All files", "*.*")],
-    )
-    if not path:
-        return
-    seq = read_fasta(path)
-    if not seq:
-        messagebox.showinfo("Empty", "No sequence found in file")
-        return
-    file_label_var.set(os.path.basename(path))
-    SEQ = seq
-    RESULTS = []
-    clear_plot()
-
-
-def on_analyze():
-    global RESULTS
-    if not SEQ:
-        messagebox.showinfo("No Sequence", "Open a FASTA file first")
-        return
-    w = int(window_size_var.get())
-    s = int(step_var.get())
-    RESULTS = compute_freqs(SEQ, w, s)
-    draw_plot()
-
-
-ttk.Button(top, text="Open FASTA", command=on_open).pack(side=tk.LEFT)
-ttk.Label(top, textvariable=file_label_var).pack(side=tk.LEFT, padx=10)
-
-ttk.Label(top, text="Step:").pack(side=tk.LEFT, padx=(12, 4))
-ttk.Entry(top, textvariable=step_var, width=6).pack(side=tk.LEFT)
-
-ttk.Button(top, text="Analyze", command=on_analyze).pack(side=tk.LEFT, padx=(16, 6))
-
-
-import matplotlib
-matplotlib.use("TkAgg")
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
-
-fig = Figure(figsize=(9.0, 4.8), dpi=100)
-ax = fig.add_subplot(111)
-ax.set_title("Relative Frequencies Per Sliding Window")
-ax.set_xlabel("Window Index")
-ax.set_ylabel("Relative Frequency")
-ax.set_ylim(0.0, 1.0)
-ax.grid(True, linestyle=":", linewidth=0.7)
-
-canvas = FigureCanvasTkAgg(fig, master=root)
-canvas_widget = canvas.get_tk_widget()
-canvas_widget.pack(side=tk.TOP, fill=tk.BOTH, expand=True, padx=10, pady=10)
-
-
-def clear_plot():
-    ax.clear()
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.composition import Composition, window_frequencies
+from common.fasta import read_fasta
+from common.tracks import LineTracks
+from common.worker import LatestWorker
+
+COMPOSITION = None
+RESULTS = None
+DEBOUNCE_MS = 150
+POLL_MS = 30
+
+
+def compute_freqs(sequence, window_size, step, is_stale=None):
+    # column arrays from prefix sums of A/C/G/T, one subtraction per window;
+    # pass a Composition to reuse the sums for other window sizes and steps
+    return window_frequencies(sequence, window_size, step, is_stale)
+
+
+def load_composition(path, is_stale=None):
+    # parsing and the prefix sums are the slow part of opening a genome
+    seq = read_fasta(path).upper()
+    if is_stale is not None and is_stale():
+        return None
+    return Composition(seq)
+
+
+if __name__ == "__main__":
+    root = tk.Tk()
+    root.title("FASTA Sliding-Window Analyzer (simple)")
+    root.geometry("980x680")
+
+
+    top = ttk.Frame(root)
+    top.pack(side=tk.TOP, fill=tk.X, padx=10, pady=10)
+
+    file_label_var = tk.StringVar(value="No file selected")
+    status_var = tk.StringVar(value="")
+    worker = LatestWorker()
+    pending_slider = None
+    window_size_var = tk.IntVar(value=30)
+    step_var = tk.IntVar(value=1)
+
+
+    def on_open():
+        global COMPOSITION, RESULTS
+        path = filedialog.askopenfilename(
+            title="Select FASTA file",
+            initialdir=os.getcwd(),
+            filetypes=[("FASTA files", "*.fa *.fasta *.fna *.gz"), ("All files", "*.*")],
+        )
+        if not path:
+            return
+        file_label_var.set(os.path.basename(path))
+        COMPOSITION = None
+        RESULTS = None
+        clear_plot()
+        # prefix sums once per sequence, built off the Tk thread; every
+        # window size reuses them
+        status_var.set("Loading...")
+        worker.submit(lambda is_stale: ("loaded", load_composition(path, is_stale)))
+
+
+    def on_analyze():
+        if COMPOSITION is None:
+            messagebox.showinfo("No Sequence", "Open a FASTA file first")
+            return
+        try:
+            w = int(window_size_var.get())
+            s = int(step_var.get())
+        except (tk.TclError, ValueError):
+            messagebox.showinfo("Invalid", "Window size and step must be whole numbers")
+            return
+        if w < 1 or s < 1:
+            messagebox.showinfo("Invalid", "Window size and step must be at least 1")
+            return
+        composition = COMPOSITION
+        status_var.set("Computing...")
+        worker.submit(lambda is_stale: ("freqs", compute_freqs(composition, w, s, is_stale)))
+
+
+    def poll_results():
+        global COMPOSITION, RESULTS
+        result = worker.poll()
+        if isinstance(result, Exception):
+            status_var.set("")
+            messagebox.showerror("Analysis failed", f"{type(result).__name__}: {result}")
+        elif result is not None:
+            kind, value = result
+            status_var.set("")
+            if kind == "loaded":
+                if not len(value):
+                    messagebox.showinfo("Empty", "No sequence found in file")
+                else:
+                    COMPOSITION = value
+            elif value is not None:
+                RESULTS = value
+                draw_plot()
+        root.after(POLL_MS, poll_results)
+
+
+    ttk.Button(top, text="Open FASTA", command=on_open).pack(side=tk.LEFT)
+    ttk.Label(top, textvariable=file_label_var).pack(side=tk.LEFT, padx=10)
+
+    ttk.Label(top, text="Step:").pack(side=tk.LEFT, padx=(12, 4))
+    ttk.Entry(top, textvariable=step_var, width=6).pack(side=tk.LEFT)
+
+    ttk.Button(top, text="Analyze", command=on_analyze).pack(side=tk.LEFT, padx=(16, 6))
+    ttk.Label(top, textvariable=status_var).pack(side=tk.LEFT, padx=6)
+
+
+    import matplotlib
+    matplotlib.use("TkAgg")
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(9.0, 4.8), dpi=100)
+    ax = fig.add_subplot(111)
     ax.set_title("Relative Frequencies Per Sliding Window")
     ax.set_xlabel("Window Index")
     ax.set_ylabel("Relative Frequency")
     ax.set_ylim(0.0, 1.0)
     ax.grid(True, linestyle=":", linewidth=0.7)
-    canvas.draw_idle()
-
-
-def draw_plot():
-    clear_plot()
-    if not RESULTS:
-        return
-    xs = [row["window_index"] for row in RESULTS]
-    ys_a = [row["A"] for row in RESULTS]
-    ys_c = [row["C"] for row in RESULTS]
-    ys_g = [row["G"] for row in RESULTS]
-    ys_t = [row["T"] for row in RESULTS]
-
-    def smooth(values, k):
-        if k <= 1:
-            return values
-        half = k // 2
-        smoothed = []
-        for i in range(len(values)):
-            left = max(0, i - half)
-            right = min(len(values), i + half + 1)
-            window_vals = values[left:right]
-            smoothed.append(sum(window_vals) / len(window_vals))
-        return smoothed
-
-    k = int(smooth_var.get())
-    ys_a = smooth(ys_a, k)
-    ys_c = smooth(ys_c, k)
-    ys_g = smooth(ys_g, k)
-    ys_t = smooth(ys_t, k)
-    ax.plot(xs, ys_a, label="A")
-    ax.plot(xs, ys_c, label="C")
-    ax.plot(xs, ys_g, label="G")
-    ax.plot(xs, ys_t, label="T")
-    ax.legend(title="Base")
-    canvas.draw_idle()
-
-
-bottom = ttk.Frame(root)
-bottom.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=8)
-ttk.Label(bottom, text="Window size:").pack(side=tk.LEFT)
-
-
-def on_window_slider_change(_val):
-    if not SEQ:
-        return
-    on_analyze()
-
-
-size_slider = tk.Scale(
-    bottom,
-    from_=1,
-    to=200,
-    orient=tk.HORIZONTAL,
-    variable=window_size_var,
-    showvalue=True,
-    length=600,
-    resolution=1,
-    command=on_window_slider_change,
-)
-size_slider.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=10)
-
-ttk.Label(bottom, text="Smooth:").pack(side=tk.LEFT, padx=(10, 4))
-smooth_var = tk.IntVar(value=1) 
-
-def on_smooth_change(_val):
-    draw_plot()
-
-smooth_slider = tk.Scale(
-    bottom,
-    from_=1,
-    to=21,
-    orient=tk.HORIZONTAL,
-    variable=smooth_var,
-    showvalue=True,
-    length=160,
-    resolution=2, 
-    command=on_smooth_change,
-)
-smooth_slider.pack(side=tk.LEFT)
-
-
-root.mainloop()
\ No newline at end of file
+
+    canvas = FigureCanvasTkAgg(fig, master=root)
+    canvas_widget = canvas.get_tk_widget()
+    canvas_widget.pack(side=tk.TOP, fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+
+    # the four lines are created once; redraws only replace their data,
+    # smoothed in O(n) and cut down to min/max points per pixel column
+    tracks = LineTracks(ax, "ACGT", legend_title="Base")
+
+
+    def clear_plot():
+        tracks.clear()
+        canvas.draw_idle()
+
+
+    def draw_plot():
+        if RESULTS is None or not len(RESULTS["window_index"]):
+            clear_plot()
+            return
+        k = int(smooth_var.get())
+        tracks.update(RESULTS["window_index"], {base: RESULTS[base] for base in "ACGT"}, smooth=k)
+        canvas.draw_idle()
+
+
+    bottom = ttk.Frame(root)
+    bottom.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=8)
+    ttk.Label(bottom, text="Window size:").pack(side=tk.LEFT)
+
+
+    def on_window_slider_change(_val):
+        # restart the countdown on every tick; only a pause analyzes
+        global pending_slider
+        if COMPOSITION is None:
+            return
+        if pending_slider is not None:
+            root.after_cancel(pending_slider)
+        pending_slider = root.after(DEBOUNCE_MS, on_slider_settled)
+
+
+    def on_slider_settled():
+        global pending_slider
+        pending_slider = None
+        on_analyze()
+
+
+    size_slider = tk.Scale(
+        bottom,
+        from_=1,
+        to=200,
+        orient=tk.HORIZONTAL,
+        variable=window_size_var,
+        showvalue=True,
+        length=600,
+        resolution=1,
+        command=on_window_slider_change,
+    )
+    size_slider.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=10)
+
+    ttk.Label(bottom, text="Smooth:").pack(side=tk.LEFT, padx=(10, 4))
+    smooth_var = tk.IntVar(value=1) 
+
+    def on_smooth_change(_val):
+        draw_plot()
+
+    smooth_slider = tk.Scale(
+        bottom,
+        from_=1,
+        to=21,
+        orient=tk.HORIZONTAL,
+        variable=smooth_var,
+        showvalue=True,
+        length=160,
+        resolution=2, 
+        command=on_smooth_change,
+    )
+    smooth_slider.pack(side=tk.LEFT)
+
+
+    root.after(POLL_MS, poll_results)
+    root.mainloop()
@@ -1,3 +1,9 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.kmers import MAX_DENSE_K, count_kmers, count_kmers_multi, kmer_code, kmer_counts
+
 S="TACGTGCGCGCGAGCTATCTACTGACTTACGACTAGTGTAGCTGCATCATCGATCGA"
 bases = ["A", "C", "G", "T"]
 
@@ -20,17 +26,27 @@ k = 2
 # ABCDE => AB BC CD DE = 4
 # => len(s)-k+1
 
-def brute_force_engine(S, k, combinations):
+def brute_force_engine(S, k, combinations, counts=None):
+    # one counting pass over S (or the table passed in), then a lookup
+    # per combination
     pieces = len(S)-k+1
+    if counts is None and k > MAX_DENSE_K:
+        # no dense table past MAX_DENSE_K; the sparse counter gives a dict
+        counts = kmer_counts(S.upper(), k)
+    elif counts is None:
+        counts = count_kmers(S.upper(), k)
     for combination in combinations:
-        cnt = 0
-        for i in range (pieces):
-            if combination == S[i:i+k]:
-                cnt += 1
+        if isinstance(counts, dict):
+            cnt = counts.get(combination.upper(), 0)
+        else:
+            cnt = int(counts[kmer_code(combination)])
         percentage = (cnt/pieces)*100
         print(combination, cnt, f"{percentage:.4f}%", sep="\t")
 
-brute_force_engine(S, 2, di)
-brute_force_engine(S, 3, tri)
+if __name__ == "__main__":
+    tables = count_kmers_multi(S.upper(), (2, 3))
+    brute_force_engine(S, 2, di, tables[2])
+    brute_force_engine(S, 3, tri, tables[3])
+
         
 
@@ -5,33 +5,31 @@
 
 import matplotlib.pyplot as plt
 import math
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.composition import Composition
+from common.fasta import read_fasta
+from common.figures import show_figure
+from common.melting import NearestNeighborTm, salt_adjusted_tm, wallace_tm
 
 sliding_window_size = 9
 step_size = 1   
 
-def read_fasta(path):
-    with open(path, "r") as f:
-        lines = f.readlines()
-    seq = ""
-    for line in lines:
-        if line.startswith(">"):
-            continue
-        seq += line.strip()
-    return seq
-
 
 def calculate_melting_temps(S):
-    P1 = []
-    P2 = []
-
-    n = len(S)
-    for i in range(0, n - sliding_window_size + 1, step_size):
-        window = S[i:i+ sliding_window_size]
-        P1.append(calculate_melting_temp_1(window))
-        P2.append(calculate_melting_temp_2(window))
-    
+    # every window at once from A/C/G/T prefix sums; P1 is the negated
+    # salt-adjusted formula of calculate_melting_temp_1, P2 the Wallace rule
+    composition = Composition(S)
+    P1 = -salt_adjusted_tm(composition, sliding_window_size, step_size, na=0.001)
+    P2 = wallace_tm(composition, sliding_window_size, step_size)
     return P1, P2
 
+def calculate_nearest_neighbor_temps(S, na=0.05):
+    # SantaLucia nearest-neighbour Tm from dinucleotide prefix sums
+    return NearestNeighborTm(S).tm(sliding_window_size, step_size, na=na)
+
 def calculate_melting_temp_1(S):
     a_number, c_number, g_number, t_number = count_molecules(S)
     total_bases = len(S)
@@ -51,9 +49,14 @@ def count_molecules(S):
     return a_number, c_number, g_number, t_number
 
 
-dna_sequence = read_fasta("dna.fasta")
-P1, P2 = calculate_melting_temps(dna_sequence)
+if __name__ == "__main__":
+    dna_sequence = read_fasta("dna.fasta")
+    P1, P2 = calculate_melting_temps(dna_sequence)
+    P3 = calculate_nearest_neighbor_temps(dna_sequence)
+
+    plt.plot(P1, label="P1 (GC content)")
+    plt.plot(P2, label="P2 (Wallace)")
+    plt.plot(P3, label="P3 (nearest neighbour)")
+    plt.legend()
+    show_figure("melting_temperatures")
 
-plt.plot(P1)
-plt.plot(P2)
-plt.show()
@@ -2,32 +2,28 @@
 # horizontal bars
 # either consider a common treshold or one for each signal
 
+import argparse
 import matplotlib.pyplot as plt
 import math
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.composition import Composition
+from common.fasta import iter_fasta
+from common.figures import show_figure
+from common.melting import salt_adjusted_tm, wallace_tm
+from common.tracks import draw_runs, runs_to_bases, threshold_runs, write_bed
 
 sliding_window_size = 9
 step_size = 1   
 
-def read_fasta(path):
-    with open(path, "r") as f:
-        lines = f.readlines()
-    seq = ""
-    for line in lines:
-        if line.startswith(">"):
-            continue
-        seq += line.strip()
-    return seq
-
 def calculate_melting_temps(S):
-    P1 = []
-    P2 = []
-
-    n = len(S)
-    for i in range(0, n - sliding_window_size + 1, step_size):
-        window = S[i:i+ sliding_window_size]
-        P1.append(calculate_melting_temp_1(window))
-        P2.append(calculate_melting_temp_2(window))
-    
+    # every window at once from A/C/G/T prefix sums; P1 is the negated
+    # salt-adjusted formula of calculate_melting_temp_1, P2 the Wallace rule
+    composition = Composition(S)
+    P1 = -salt_adjusted_tm(composition, sliding_window_size, step_size, na=0.001)
+    P2 = wallace_tm(composition, sliding_window_size, step_size)
     return P1, P2
 
 def calculate_melting_temp_1(S):
@@ -48,31 +44,22 @@ def count_molecules(S):
     t_number = S.count("T")
     return a_number, c_number, g_number, t_number
 
-def plot_threshold_bars(P1, P2, threshold_P1, threshold_P2, mode="above"):
+def plot_threshold_bars(P1, P2, threshold_P1, threshold_P2, mode="above", bed_path=None, chrom="sequence"):
     """
     Plot horizontal bars showing regions where signals are above/below thresholds
     mode: "above" or "below" - show bars where condition is met
+    bed_path: also write the regions as BED, "{signal}" is replaced by P1 / P2
     """
-    # Create binary indicators (1 where condition is met, 0 where not)
-    P1_bars = []
-    P2_bars = []
-    
-    for i in range(len(P1)):
-        if mode == "above":
-            P1_bars.append(1 if P1[i] >= threshold_P1 else 0)
-            P2_bars.append(1 if P2[i] >= threshold_P2 else 0)
-        elif mode == "below":
-            P1_bars.append(1 if P1[i] < threshold_P1 else 0)
-            P2_bars.append(1 if P2[i] < threshold_P2 else 0)
-    
-    # Plot bars
+    # runs of consecutive windows where the condition is met, [start, end)
+    P1_runs = threshold_runs(P1, threshold_P1, mode)
+    P2_runs = threshold_runs(P2, threshold_P2, mode)
+
+    # Plot bars, one broken_barh collection per signal
     plt.figure(figsize=(12, 4))
     
     # Plot P1 bars on top row
-    plt.subplot(2, 1, 1)
-    for i in range(len(P1_bars)):
-        if P1_bars[i] == 1:
-            plt.barh(0, 1, left=i, height=0.03, color='blue', alpha=0.8)
+    ax = plt.subplot(2, 1, 1)
+    draw_runs(ax, P1_runs, y=-0.015, height=0.03, color='blue', alpha=0.8)
     plt.ylim(-0.2, 0.2)
     plt.xlim(0, len(P1))
     plt.title(f'P1 - Regions {mode.capitalize()} Threshold ({threshold_P1:.1f}°C)')
@@ -80,10 +67,8 @@ def plot_threshold_bars(P1, P2, threshold_P1, threshold_P2, mode="above"):
     plt.yticks([])  # Remove y-axis ticks
     
     # Plot P2 bars on bottom row  
-    plt.subplot(2, 1, 2)
-    for i in range(len(P2_bars)):
-        if P2_bars[i] == 1:
-            plt.barh(0, 1, left=i, height=0.03, color='orange', alpha=0.8)
+    ax = plt.subplot(2, 1, 2)
+    draw_runs(ax, P2_runs, y=-0.015, height=0.03, color='orange', alpha=0.8)
     plt.ylim(-0.2, 0.2)
     plt.xlim(0, len(P2))
     plt.title(f'P2 - Regions {mode.capitalize()} Threshold ({threshold_P2:.1f}°C)')
@@ -92,29 +77,47 @@ def plot_threshold_bars(P1, P2, threshold_P1, threshold_P2, mode="above"):
     plt.xlabel('Window Number')
     
     plt.tight_layout()
-    plt.show()
+    show_figure(f"threshold_bars_{mode}")
+
+    if bed_path:
+        for name, runs in (("P1", P1_runs), ("P2", P2_runs)):
+            regions = runs_to_bases(runs, sliding_window_size, step_size)
+            write_bed(bed_path.replace("{signal}", name), chrom, regions, name=f"{name}_{mode}")
     
     # Print statistics
-    P1_count = sum(P1_bars)
-    P2_count = sum(P2_bars)
+    P1_count = int((P1_runs[:, 1] - P1_runs[:, 0]).sum())
+    P2_count = int((P2_runs[:, 1] - P2_runs[:, 0]).sum())
     print(f"Mode: {mode}")
     print(f"P1 windows {mode} threshold: {P1_count} out of {len(P1)} ({P1_count/len(P1)*100:.1f}%)")
     print(f"P2 windows {mode} threshold: {P2_count} out of {len(P2)} ({P2_count/len(P2)*100:.1f}%)")
 
-# Calculate P1 and P2 vectors
-dna_sequence = read_fasta("dna.fasta")
-P1, P2 = calculate_melting_temps(dna_sequence)
-
-# Calculate thresholds
-threshold_P1 = sum(P1) / len(P1)  # Average of P1
-threshold_P2 = sum(P2) / len(P2)  # Average of P2
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Melting temperature regions above or below the average")
+    parser.add_argument("fasta", nargs="?", default="dna.fasta")
+    parser.add_argument("--mode", choices=["above", "below"], default="above")
+    parser.add_argument("--bed", metavar="PATH",
+                        help="write the regions as BED; {signal} in PATH becomes P1 / P2")
+    args = parser.parse_args()
 
-print(f"P1 Threshold (average): {threshold_P1:.2f}°C")
-print(f"P2 Threshold (average): {threshold_P2:.2f}°C")
+    # Calculate P1 and P2 vectors
+    # one pass over the file; the BED coordinates and chrom name only make
+    # sense for a single record
+    records = iter_fasta(args.fasta)
+    header, dna_sequence = next(records, ("", ""))
+    if next(records, None) is not None:
+        parser.error(f"{args.fasta} holds more than one record; pass a single-sequence FASTA")
+    P1, P2 = calculate_melting_temps(dna_sequence)
 
-# Example usage - you can change "above" to "below"
-plot_threshold_bars(P1, P2, threshold_P1, threshold_P2, mode="above")
+    # Calculate thresholds
+    threshold_P1 = P1.mean()  # Average of P1
+    threshold_P2 = P2.mean()  # Average of P2
 
-# Uncomment this line to see regions below thresholds instead:
-# plot_threshold_bars(P1, P2, threshold_P1, threshold_P2, mode="below")
+    print(f"P1 Threshold (average): {threshold_P1:.2f}°C")
+    print(f"P2 Threshold (average): {threshold_P2:.2f}°C")
 
+    bed_path = args.bed
+    if bed_path and "{signal}" not in bed_path:
+        root, extension = os.path.splitext(bed_path)
+        bed_path = f"{root}_{{signal}}{extension or '.bed'}"
+    plot_threshold_bars(P1, P2, threshold_P1, threshold_P2, mode=args.mode,
+                        bed_path=bed_path, chrom=(header.split() or ["sequence"])[0])
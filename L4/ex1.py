@@ -1,3 +1,9 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.codons import AMINO_ACID_NAMES, translate
+
 genetic_code = {
     'UUU': 'Phe', 'UUC': 'Phe', 'UUA': 'Leu', 'UUG': 'Leu',
     'UCU': 'Ser', 'UCC': 'Ser', 'UCA': 'Ser', 'UCG': 'Ser',
@@ -20,27 +26,18 @@ genetic_code = {
     'GGU': 'Gly', 'GGC': 'Gly', 'GGA': 'Gly', 'GGG': 'Gly'
 }
 
-def translate_rna(sequence, sequence_type="RNA"):
-    if sequence_type == "DNA":
-        sequence = sequence.replace('T', 'U')
-    
-    i = 0
-    while i <= len(sequence) - 3:
-        if sequence[i:i+3] == 'AUG':
-            break
-        i += 1
+def translate_rna(sequence, sequence_type="RNA", table=None):
+    # codons map through a lookup table on 6-bit codes, T and U alike, so
+    # DNA needs no T -> U copy; table is an NCBI id or a codon dict
+    start = sequence.find('ATG' if sequence_type == "DNA" else 'AUG')
+    if start < 0:
+        return []
 
-    amino_acids = []
-    while i <= len(sequence) - 3:
-        codon = sequence[i:i+3]
-        amino_acids.append(codon_to_amino_acid(codon))
-        
-        if codon == 'UAA' or codon == 'UAG' or codon == 'UGA':
-            break
-        
-        i += 3
-    
-    return amino_acids
+    protein = translate(sequence[start:], genetic_code if table is None else table)
+    stop = protein.find(b'*')
+    if stop >= 0:
+        protein = protein[:stop + 1]
+    return [AMINO_ACID_NAMES.get(amino_acid, 'Unknown') for amino_acid in protein.decode('ascii')]
 
 def codon_to_amino_acid(codon):
     return genetic_code.get(codon, 'Unknown')
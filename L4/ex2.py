@@ -1,39 +1,26 @@
+import os
+import sys
 from ex1 import genetic_code, translate_rna, codon_to_amino_acid
 import matplotlib.pyplot as plt
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.cache import cached_read_fasta
+from common.figures import show_figure
+from common.codons import codon_string, codon_usage, usage_counts
+from common.topn import top_items
 
 # a
 
-def read_fasta(filename):
-    sequence = ""
-    with open(filename, 'r') as file:
-        for line in file:
-            if not line.startswith('>'):
-                sequence += line.strip()
-    return sequence
-
-def get_codons(sequence, sequence_type="DNA"):
-    if sequence_type == "DNA":
-        sequence = sequence.replace('T', 'U')
-    
-    codons = []
-    for i in range(0, len(sequence) - 2, 3):
-        codon = sequence[i:i+3]
-        if len(codon) == 3:
-            codons.append(codon)
-    return codons
-
-def count_codons(codons):
-    codon_count = {}
-    for codon in codons:
-        if codon in codon_count:
-            codon_count[codon] += 1
-        else:
-            codon_count[codon] = 1
-    return codon_count
+# codon usage is a 6 x 64 matrix (frames +1 +2 +3 -1 -2 -3) counted in one
+# pass; the reports use frame +1, ties between equal counts in codon order
+
+def count_codons(usage, frames=(0,)):
+    return usage_counts(usage[list(frames)].sum(axis=0))
 
 def get_top_items(item_count, n=10):
-    sorted_items = sorted(item_count.items(), key=lambda x: x[1], reverse=True)
-    return sorted_items[:n]
+    # partial selection of the n largest, no full sort
+    return top_items(item_count, n)
 
 def create_bar_chart(data, title, xlabel="Items", ylabel="Frequency"):
     names = [item[0] for item in data]
@@ -46,7 +33,7 @@ def create_bar_chart(data, title, xlabel="Items", ylabel="Frequency"):
     plt.ylabel(ylabel)
     plt.xticks(rotation=45)
     plt.tight_layout()
-    plt.show()
+    show_figure(title)
 
 def create_comparison_chart(data1, data2, labels, title, xlabel="Items", ylabel="Frequency"):
     names = [item[0] for item in data1]
@@ -66,11 +53,11 @@ def create_comparison_chart(data1, data2, labels, title, xlabel="Items", ylabel=
     plt.xticks(x, names, rotation=45)
     plt.legend()
     plt.tight_layout()
-    plt.show()
+    show_figure(title)
 
-covid_sequence = read_fasta("covid-19-nov-2021-sequence.fasta")
-covid_codons = get_codons(covid_sequence, "DNA")
-covid_codon_count = count_codons(covid_codons)
+covid_sequence = cached_read_fasta("covid-19-nov-2021-sequence.fasta")
+covid_codon_usage = codon_usage(covid_sequence)
+covid_codon_count = count_codons(covid_codon_usage)
 top_covid_codons = get_top_items(covid_codon_count, 10)
 
 print("Top 10 COVID-19 codons:")
@@ -81,9 +68,9 @@ create_bar_chart(top_covid_codons, "Top 10 Most Frequent Codons in COVID-19", "C
 
 # b
 
-influenza_sequence = read_fasta("influenza-river-sequence.fasta")
-influenza_codons = get_codons(influenza_sequence, "DNA")
-influenza_codon_count = count_codons(influenza_codons)
+influenza_sequence = cached_read_fasta("influenza-river-sequence.fasta")
+influenza_codon_usage = codon_usage(influenza_sequence)
+influenza_codon_count = count_codons(influenza_codon_usage)
 top_influenza_codons = get_top_items(influenza_codon_count, 10)
 
 print("\nTop 10 Influenza codons:")
@@ -94,20 +81,23 @@ create_bar_chart(top_influenza_codons, "Top 10 Most Frequent Codons in Influenza
 
 # c
 
-def find_common_codons_from_all(covid_count, influenza_count):
-    covid_codons = set(covid_count.keys())
-    influenza_codons = set(influenza_count.keys())
-    common_codons = covid_codons.intersection(influenza_codons)
-    return common_codons
+# both reports read frame +1 of the usage matrices built above
+
+def find_common_codons_from_all(covid_usage, influenza_usage, frame=0):
+    covid_row, influenza_row = covid_usage[frame], influenza_usage[frame]
+    common = np.flatnonzero((covid_row > 0) & (influenza_row > 0))
+    return {codon_string(code): (int(covid_row[code]), int(influenza_row[code]))
+            for code in common.tolist()}
 
-all_common_codons = find_common_codons_from_all(covid_codon_count, influenza_codon_count)
+common_codon_counts = find_common_codons_from_all(covid_codon_usage, influenza_codon_usage)
+all_common_codons = set(common_codon_counts)
 
 print(f"\nTotal common codons found: {len(all_common_codons)}")
 print(f"Common codons: {sorted(list(all_common_codons))}")
 
 comparison_data = []
-for codon in all_common_codons:
-    comparison_data.append((codon, covid_codon_count[codon], influenza_codon_count[codon]))
+for codon, (covid_freq, influenza_freq) in common_codon_counts.items():
+    comparison_data.append((codon, covid_freq, influenza_freq))
 
 comparison_data.sort(key=lambda x: x[1] + x[2], reverse=True)
 top_common_codons = comparison_data[:10]
@@ -10,21 +10,19 @@
 What would be the main problem with the algorithm approach when it encounters specific types of sequences? explain it in a .txt file
 '''
 
+import os
 import random
+import sys
 
-
-def read_fasta(filename):
-    with open(filename, 'r') as file:
-        lines = file.readlines()
-    
-    sequence = ""
-    for line in lines[1:]:
-        sequence += line.strip()
-    
-    return sequence
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.fasta import read_fasta
+from common.instrument import enable_from_argv, timed
 
 
+@timed("sampling")
 def generate_random_samples(sequence, num_samples=2000, sample_length=150):
+    # only len() and slicing are used, so an IndexedSequence from
+    # common.faidx can be sampled without loading the genome
     samples = []
     seq_length = len(sequence)
     
@@ -81,6 +79,7 @@ def find_starting_sample(samples, original_sequence, sample_length=150):
     return best_index
 
 
+@timed("greedy_reconstruction", sequence_arg=1)
 def simple_reconstruct(samples, original_sequence, overlap_size=15):
     if not samples:
         return ""
@@ -143,6 +142,7 @@ def calculate_simple_accuracy(original, reconstructed):
 
 
 def main():
+    enable_from_argv()
     import time
     random.seed(int(time.time() * 1000))
     
@@ -17,40 +17,31 @@ Note: Short DNA fragments meet small friction forces and travel faster through t
 
 import matplotlib.pyplot as plt
 from matplotlib.patches import Rectangle
+import os
 import random
+import re
+import sys
 from math import log10
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.cache import cached_first_record
+from common.faidx import IndexedFasta
+from common.figures import show_figure
+
 
 def load_sequence_from_fasta(file_path):
-    dna_seq = ""
-    sequence_name = "Unknown"
-    
-    file = open(file_path, "r")
-    lines = file.readlines()
-    file.close()
-    
-    for line in lines:
-        current_line = line.strip()
-        if len(current_line) == 0:
-            continue
-            
-        if current_line[0] == '>':
-            if len(dna_seq) > 0:
-                break
-            sequence_name = current_line[1:] if len(current_line) > 1 else "Unknown"
-        else:
-            dna_seq += current_line.upper()
-    
-    clean_dna = ""
-    valid_bases = ['A', 'C', 'G', 'T']
-    for base in dna_seq:
-        if base in valid_bases:
-            clean_dna += base
+    sequence_name, dna_seq = cached_first_record(file_path)
+    if not sequence_name:
+        sequence_name = "Unknown"
+    
+    clean_dna = re.sub("[^ACGT]", "", dna_seq.upper())
     
     return sequence_name, clean_dna
 
 
 def extract_fragments(dna_string, count=10, minimum=100, maximum=3000):
+    # dna_string only needs len() and slicing, so an IndexedSequence from
+    # common.faidx works too and only the sampled windows are read from disk
     fragments_list = []
     total_length = len(dna_string)
     max_allowed = maximum if maximum < total_length else total_length
@@ -131,7 +122,7 @@ def draw_gel_visualization(fragment_sizes, gel_positions, lane_name="DNA Lane",
     axis.axis("off")
     
     plt.tight_layout()
-    plt.show()
+    show_figure(f"gel_{lane_name}")
 
 
 def main():
@@ -147,18 +138,33 @@ def main():
     
     random.seed()
     
-    print(f"Loading DNA sequence from: {fasta_file}")
+    print(f"Indexing DNA sequence from: {fasta_file}")
     try:
-        seq_name, dna_sequence = load_sequence_from_fasta(fasta_file)
-        print(f"  Loaded: {seq_name}")
-        print(f"  Total length: {len(dna_sequence)} base pairs")
-        print()
-    except:
+        fasta = IndexedFasta(fasta_file)
+    except (OSError, ValueError):
         print(f"  Error reading {fasta_file}")
         return
-    
-    print(f"Extracting {num_fragments} random fragments ({min_size}-{max_size} bp)...")
-    dna_fragments = extract_fragments(dna_sequence, num_fragments, min_size, max_size)
+    with fasta:
+        try:
+            dna_sequence = fasta.first()
+        except StopIteration:
+            print(f"  Error reading {fasta_file}")
+            return
+        seq_name = dna_sequence.name
+        print(f"  Indexed: {seq_name}")
+        print(f"  Total length: {len(dna_sequence)} base pairs")
+        print()
+
+        print(f"Extracting {num_fragments} random fragments ({min_size}-{max_size} bp)...")
+        dna_fragments = extract_fragments(dna_sequence, num_fragments, min_size, max_size)
+    # fragments come straight from the file, so drop soft-masking and N
+    # runs like load_sequence_from_fasta does for the whole sequence
+    dna_fragments = [re.sub("[^ACGT]", "", fragment.upper()) for fragment in dna_fragments]
+    # a window inside an N gap has no bases left and cannot run on the gel
+    dropped = dna_fragments.count("")
+    dna_fragments = [fragment for fragment in dna_fragments if fragment]
+    if dropped:
+        print(f"  Dropped {dropped} fragment(s) made only of N / non-ACGT bases")
     
     sizes = [len(fragment) for fragment in dna_fragments]
     print(f"  Sizes: {sorted(sizes)}")
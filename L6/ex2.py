@@ -5,25 +5,33 @@ to digest each genome and plot the electrophoresis gel simulation for each genom
 Lab solved by: Uritu Andra-Ioana, 1241EB
 '''
 
+import argparse
+import os
+import sys
 import matplotlib.pyplot as plt
 from matplotlib.patches import Rectangle
-from math import log10
+from math import ceil, log10
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from ex1 import load_sequence_from_fasta
+from common.batch import expand_inputs, run_batch
+from common.faidx import find_all
+from common.figures import render_figures, set_figures_dir, show_figure
+from common.instrument import enable, stage, timed
 
 
+@timed("ecori_digest")
 def digest_with_ecori(sequence):
     """
     Digest DNA sequence with EcoRI restriction enzyme.
     EcoRI recognition site: GAATTC
     Returns list of fragment lengths
+    Accepts a str or an IndexedSequence (scanned chunk by chunk)
     """
     recognition_site = "GAATTC"
     fragments = []
     
-    positions = []
-    for i in range(len(sequence) - len(recognition_site) + 1):
-        if sequence[i:i + len(recognition_site)] == recognition_site:
-            positions.append(i)
+    positions = find_all(sequence, recognition_site)
     
     if len(positions) == 0:
         return [len(sequence)]
@@ -106,74 +114,129 @@ def draw_gel_visualization(fragment_sizes, gel_positions, lane_name="DNA Lane",
     axis.axis("off")
     
     plt.tight_layout()
-    plt.show()
+    show_figure(f"gel_{lane_name}")
+
+
+def digest_genome(filename):
+    """
+    Load one genome and digest it with EcoRI.
+    Runs in a worker process, so errors are returned instead of raised.
+    """
+    try:
+        with stage("read_fasta"):
+            seq_name, dna_sequence = load_sequence_from_fasta(filename)
+        fragments = digest_with_ecori(dna_sequence)
+    except Exception as e:
+        return {'filename': filename, 'error': str(e)}
+    
+    return {
+        'filename': filename,
+        'name': seq_name,
+        'length': len(dna_sequence),
+        'fragments': fragments
+    }
 
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="EcoRI digestion of a batch of genomes")
+    parser.add_argument("genomes", nargs="*",
+                        help="FASTA files or glob patterns (default: the 10 lab genomes)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: one per core)")
+    parser.add_argument("--figures", metavar="DIR", default=None,
+                        help="save figures as PNG files in DIR instead of showing them")
+    parser.add_argument("--profile", action="store_true",
+                        help="report per-stage timings and memory (runs serially)")
+    args = parser.parse_args(argv)
+    
+    if args.profile:
+        enable()
+        args.workers = 1
+    
+    if args.figures:
+        set_figures_dir(args.figures)
+    
+    if args.genomes:
+        filenames = expand_inputs(args.genomes)
+    else:
+        filenames = [f"sequence ({genome_num}).fasta" for genome_num in range(1, 11)]
+    
     print("=" * 60)
     print("EcoRI RESTRICTION ENZYME DIGESTION")
     print("Restriction site: GAATTC")
     print("=" * 60)
     print()
     
-    fig = plt.figure(figsize=(15, 12))
+    results = run_batch(digest_genome, filenames, args.workers)
+    
+    if args.figures:
+        gel_jobs = []
+        for genome_num, result in enumerate(results, 1):
+            if 'error' not in result:
+                fragments = result['fragments']
+                gel_jobs.append((fragments, calculate_gel_positions(fragments),
+                                 f"G{genome_num}", f"Genome {genome_num} — {result['name'][:40]}"))
+        render_figures(draw_gel_visualization, gel_jobs, args.workers)
+    
+    columns = 5
+    rows = max(1, ceil(len(filenames) / columns))
+    fig = plt.figure(figsize=(15, 6 * rows))
     
-    for genome_num in range(1, 11):
-        filename = f"sequence ({genome_num}).fasta"
+    for genome_num, result in enumerate(results, 1):
+        filename = result['filename']
         
         print(f"Genome {genome_num}: {filename}")
         
-        try:
-            seq_name, dna_sequence = load_sequence_from_fasta(filename)
-            print(f"  Sequence length: {len(dna_sequence)} bp")
-            
-            fragments = digest_with_ecori(dna_sequence)
-            print(f"  Fragments after EcoRI digestion: {len(fragments)}")
-            print(f"  Fragment sizes: {sorted(fragments, reverse=True)[:5]}... (showing top 5)")
-            print()
-            
-            positions = calculate_gel_positions(fragments)
-            
-            ax = plt.subplot(2, 5, genome_num)
-            
-            gel_box = Rectangle((0.18, 0.05), 0.64, 0.9, fill=False, linewidth=1.5)
-            ax.add_patch(gel_box)
-            
-            lane_center = 0.5
-            lane_size = 0.28
-            lane_left = lane_center - lane_size / 2
-            lane_right = lane_center + lane_size / 2
-            
-            lane_box = Rectangle((lane_left, 0.08), lane_size, 0.84, fill=False, linewidth=1.0)
-            ax.add_patch(lane_box)
-            
-            bands_data = list(zip(positions, fragments))
-            bands_data.sort(key=lambda item: item[0])
-            
-            for position, size in bands_data:
-                band_start = lane_left + 0.01
-                band_end = lane_right - 0.01
-                ax.plot([band_start, band_end], [position, position], 
-                       linewidth=3, color='darkblue')
-                ax.text(lane_right + 0.03, position, f"{size}", 
-                       va="center", fontsize=7)
-            
-            label_x = (lane_left + lane_right) / 2
-            ax.text(label_x, 0.03, f"G{genome_num}", ha="center", 
-                   va="center", fontsize=9, weight='bold')
-            
-            ax.set_title(f"Genome {genome_num}", fontsize=10)
-            ax.set_xlim(0, 1)
-            ax.set_ylim(0, 1)
-            ax.axis("off")
-            
-        except Exception as e:
-            print(f"  Error: {e}")
+        if 'error' in result:
+            print(f"  Error: {result['error']}")
             print()
+            continue
+        
+        dna_length = result['length']
+        fragments = result['fragments']
+        print(f"  Sequence length: {dna_length} bp")
+        print(f"  Fragments after EcoRI digestion: {len(fragments)}")
+        print(f"  Fragment sizes: {sorted(fragments, reverse=True)[:5]}... (showing top 5)")
+        print()
+        
+        positions = calculate_gel_positions(fragments)
+        
+        ax = plt.subplot(rows, columns, genome_num)
+        
+        gel_box = Rectangle((0.18, 0.05), 0.64, 0.9, fill=False, linewidth=1.5)
+        ax.add_patch(gel_box)
+        
+        lane_center = 0.5
+        lane_size = 0.28
+        lane_left = lane_center - lane_size / 2
+        lane_right = lane_center + lane_size / 2
+        
+        lane_box = Rectangle((lane_left, 0.08), lane_size, 0.84, fill=False, linewidth=1.0)
+        ax.add_patch(lane_box)
+        
+        bands_data = list(zip(positions, fragments))
+        bands_data.sort(key=lambda item: item[0])
+        
+        for position, size in bands_data:
+            band_start = lane_left + 0.01
+            band_end = lane_right - 0.01
+            ax.plot([band_start, band_end], [position, position], 
+                   linewidth=3, color='darkblue')
+            ax.text(lane_right + 0.03, position, f"{size}", 
+                   va="center", fontsize=7)
+        
+        label_x = (lane_left + lane_right) / 2
+        ax.text(label_x, 0.03, f"G{genome_num}", ha="center", 
+               va="center", fontsize=9, weight='bold')
+        
+        ax.set_title(f"Genome {genome_num}", fontsize=10)
+        ax.set_xlim(0, 1)
+        ax.set_ylim(0, 1)
+        ax.axis("off")
     
     plt.suptitle("EcoRI Restriction Digestion - All Genomes", fontsize=14, fontweight='bold')
     plt.tight_layout()
-    plt.show()
+    show_figure("ecori_all_genomes")
     
     print("=" * 60)
     print("Digestion complete!")
@@ -12,19 +12,13 @@ TAATAATAA ...
 
 '''
 
+import os
+import sys
 
-def read_fasta(filename):
-    with open(filename, 'r') as file:
-        lines = file.readlines()
-    
-    sequence = ""
-    
-    for line in lines:
-        if line.startswith('>'):
-            continue
-        sequence += line.strip()
-    
-    return sequence
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.fasta import read_fasta
+from common.instrument import count, enable_from_argv, stage, timed
+from common.packed import as_text
 
 
 def extract_pattern(sequence, position, pattern_size):
@@ -49,7 +43,10 @@ def count_pattern_at_position(sequence, position, pattern_size):
     return pattern, repeat_count, current_pos
 
 
+@timed("tandem_repeats")
 def find_tandem_repeats(sequence, pattern_size, min_repetitions=2):
+    # the scan compares text slices, so a PackedSequence is decoded here
+    sequence = as_text(sequence)
     repeats = []  
     sequence_length = len(sequence)
     
@@ -73,6 +70,7 @@ def find_tandem_repeats(sequence, pattern_size, min_repetitions=2):
         else:
             i += 1
     
+    count("tandem_repeats", len(repeats))
     return repeats
 
 
@@ -89,13 +87,15 @@ def display_repeats(repeats, pattern_size):
 
 
 def main():
+    enable_from_argv()
     print("=" * 60)
     print("DNA TANDEM REPEAT DETECTOR")
     print("=" * 60)
     print()
     
     try:
-        dna_sequence = read_fasta("wolbachia-pipientis.fasta")
+        with stage("read_fasta"):
+            dna_sequence = read_fasta("wolbachia-pipientis.fasta")
         print(f"Sequence length: {len(dna_sequence)} base pairs")
         print()
     except FileNotFoundError:
@@ -9,29 +9,53 @@ and from left to right most to least repeated. on the vertical axis will be the
 Lab solved by: Uritu Andra-Ioana, 1241EB
 '''
 
+import argparse
+import functools
+import os
+import sys
 import matplotlib.pyplot as plt
-from ex1 import read_fasta, extract_pattern
+import numpy as np
+from math import ceil
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.batch import default_workers, expand_inputs, run_batch
+from common.cache import cached_read_fasta, cached_records
+from common.figures import render_figures, set_figures_dir, show_figure
+from common.instrument import enable, stage, timed
+from common.kmer_index import index_for_fasta
+from common.kmers import kmer_counts, kmer_string, kmer_tables
+from common.sketch import distance_matrix, newick, sketch_files, upgma
+from common.topn import heavy_hitter_kmers, top_tables
 
-def count_all_patterns(sequence, pattern_length=3):
-    pattern_counts = {}
-    
-    for i in range(len(sequence) - pattern_length + 1):
-        pattern = extract_pattern(sequence, i, pattern_length)
-        if pattern in pattern_counts:
-            pattern_counts[pattern] += 1
-        else:
-            pattern_counts[pattern] = 1
-    
-    return pattern_counts
+
+@timed("count_patterns")
+def count_all_patterns(sequence, pattern_length=3, workers=1):
+    # integer k-mer counting from common.kmers; works up to length 31
+    # (patterns containing N or other non-ACGT letters are not counted)
+    return kmer_counts(sequence, pattern_length, workers=workers)
+
+
+@timed("count_patterns")
+def count_patterns_for_lengths(sequence, pattern_lengths, workers=1):
+    """
+    {length: (codes, counts) tables} for several pattern lengths, the
+    short ones from one shared scan. With workers > 1 the genome is counted
+    in overlapping chunks on a process pool.
+    """
+    return kmer_tables(sequence, pattern_lengths, workers=workers)
 
 
-def get_top_patterns(pattern_counts, top_n=20):
-    sorted_patterns = sorted(pattern_counts.items(), key=lambda x: x[1], reverse=True)
-    return sorted_patterns[:top_n]
+@timed("heavy_hitters", sequence_arg=None)
+def get_top_patterns_approximate(sequences, pattern_length, top_n=20, epsilon=1e-5):
+    """
+    Top patterns from a fixed-memory heavy-hitter summary instead of a full
+    count table. Counts are lower bounds, at most epsilon * total too low.
+    """
+    return [(pattern, lower) for pattern, lower, _ in
+            heavy_hitter_kmers(sequences, pattern_length, n=top_n, epsilon=epsilon)]
 
 
-def plot_top_patterns(top_patterns, strain_number):
+def plot_top_patterns(top_patterns, strain_number, pattern_length=3):
     patterns = [item[0] for item in top_patterns]
     counts = [item[1] for item in top_patterns]
     
@@ -39,57 +63,266 @@ def plot_top_patterns(top_patterns, strain_number):
     plt.bar(range(len(patterns)), counts, color='steelblue')
     plt.xlabel('Pattern', fontsize=12)
     plt.ylabel('Number of Repetitions', fontsize=12)
-    plt.title(f'Top 20 Most Repeated Patterns - Strain {strain_number}', fontsize=14, fontweight='bold')
+    title = f'Top 20 Most Repeated Patterns - Strain {strain_number}'
+    name = f"top_patterns_strain_{strain_number}"
+    if pattern_length != 3:
+        title += f' (length {pattern_length})'
+        name += f"_length_{pattern_length}"
+    plt.title(title, fontsize=14, fontweight='bold')
     plt.xticks(range(len(patterns)), patterns, rotation=45, ha='right')
     plt.grid(axis='y', alpha=0.3)
     plt.tight_layout()
-    plt.show()
+    show_figure(name)
+
+
+def analyze_strain_indexed(filename, pattern_lengths=(3,), workers=1):
+    """
+    Top 20 patterns of every length from the strain's persistent k-mer
+    indexes; they are built on the first run and memory-mapped afterwards.
+    """
+    try:
+        with stage("kmer_index"):
+            indexes = {length: index_for_fasta(filename, length, workers=workers)
+                       for length in pattern_lengths}
+    except FileNotFoundError:
+        return {'filename': filename, 'error': 'not found'}
+    main_index = indexes[pattern_lengths[0]]
+    return {
+        'filename': filename,
+        'length': main_index.meta['bases'],
+        'unique_patterns': len(main_index),
+        'top_patterns': main_index.top(20),
+        'unique_by_length': {length: len(index) for length, index in indexes.items()},
+        'top_by_length': {length: index.top(20) for length, index in indexes.items()}
+    }
+
+
+def shared_patterns(filenames, pattern_length, top_n=5):
+    """
+    Patterns present in every strain and the top_n of them by total count,
+    answered from the k-mer indexes without rescanning any sequence.
+    """
+    indexes = [index_for_fasta(filename, pattern_length) for filename in filenames]
+    codes = indexes[0].codes
+    for index in indexes[1:]:
+        codes = np.intersect1d(codes, index.codes, assume_unique=True)
+    totals = sum(index.lookup(codes) for index in indexes)
+    top = np.argsort(-totals, kind="stable")[:top_n]
+    return len(codes), [(kmer_string(int(codes[i]), pattern_length), int(totals[i])) for i in top]
+
+
+def plot_dendrogram(merges, names, title='UPGMA Tree of the Strains (Mash distance)'):
+    """Draw the UPGMA merges as a dendrogram, leaves on the vertical axis."""
+    n = len(names)
+    children = {n + step: (a, b) for step, (a, b, _, _) in enumerate(merges)}
+    heights = {n + step: height for step, (_, _, height, _) in enumerate(merges)}
+    
+    leaf_order = []
+    stack = [n + len(merges) - 1] if merges else [0]
+    while stack:
+        node = stack.pop()
+        if node < n:
+            leaf_order.append(node)
+        else:
+            stack.extend(reversed(children[node]))
+    y = {leaf: position for position, leaf in enumerate(leaf_order)}
+    
+    plt.figure(figsize=(10, max(3, 0.4 * n)))
+    for node in sorted(children):
+        a, b = children[node]
+        y[node] = (y[a] + y[b]) / 2
+        for child in (a, b):
+            plt.plot([heights.get(child, 0.0), heights[node]], [y[child], y[child]], color='steelblue')
+        plt.plot([heights[node], heights[node]], [y[a], y[b]], color='steelblue')
+    plt.yticks(range(n), [names[leaf] for leaf in leaf_order], fontsize=8)
+    plt.xlabel('Mash distance / 2', fontsize=12)
+    plt.title(title, fontsize=14, fontweight='bold')
+    plt.tight_layout()
+    show_figure("strain_dendrogram")
+
+
+def compare_strains(filenames, workers=None, k=21, sketch_size=1000):
+    """
+    MinHash-sketch every strain (in parallel), print the pairwise Mash
+    distance matrix and the UPGMA tree, and plot the tree.
+    """
+    sketches = sketch_files(filenames, k=k, size=sketch_size, workers=workers)
+    with stage("distance_matrix"):
+        distances = distance_matrix(sketches, workers=1 if len(sketches) < 200 else workers)
+    names = [f"S{number}" for number in range(1, len(filenames) + 1)]
+    
+    print(f"Mash distances (k={k}, {sketch_size} hashes per sketch):")
+    print("      " + " ".join(f"{name:>7}" for name in names))
+    for name, row in zip(names, distances):
+        print(f"{name:>5} " + " ".join(f"{value:7.4f}" for value in row))
+    print()
+    merges = upgma(distances)
+    print("UPGMA tree (Newick):")
+    print(newick(merges, names))
+    for name, filename in zip(names, filenames):
+        print(f"  {name} = {filename}")
+    print()
+    plot_dendrogram(merges, names)
+    return distances
 
 
-def main():
+def analyze_strain(filename, pattern_lengths=(3,), epsilon=None, workers=1):
+    """
+    Count the patterns of every requested length in one scan of the strain
+    and keep the top 20 of each; the first length is the main report.
+    With an epsilon the top 20 come from heavy-hitter summaries of the
+    packed records instead (fixed memory, unique counts unknown).
+    Runs in a worker process, so a missing file is reported in the result;
+    workers > 1 splits the counting of this one strain over processes.
+    """
+    if epsilon is not None:
+        try:
+            with stage("read_fasta"):
+                records = [packed for _, packed in cached_records(filename)]
+        except FileNotFoundError:
+            return {'filename': filename, 'error': 'not found'}
+        top_by_length = {length: get_top_patterns_approximate(records, length, 20, epsilon)
+                         for length in pattern_lengths}
+        return {
+            'filename': filename,
+            'length': sum(len(packed) for packed in records),
+            'unique_patterns': None,
+            'top_patterns': top_by_length[pattern_lengths[0]],
+            'unique_by_length': {length: None for length in pattern_lengths},
+            'top_by_length': top_by_length
+        }
+    
+    try:
+        with stage("read_fasta"):
+            sequence = cached_read_fasta(filename)
+    except FileNotFoundError:
+        return {'filename': filename, 'error': 'not found'}
+    
+    # the top 20 are picked on the code arrays; only they become strings
+    tables_by_length = count_patterns_for_lengths(sequence, pattern_lengths, workers)
+    top_by_length, unique_by_length = {}, {}
+    for length, tables in tables_by_length.items():
+        codes, counts, unique_by_length[length] = top_tables(tables, 20)
+        top_by_length[length] = [(kmer_string(code, length), count)
+                                 for code, count in zip(codes.tolist(), counts.tolist())]
+    main_length = pattern_lengths[0]
+    return {
+        'filename': filename,
+        'length': len(sequence),
+        'unique_patterns': unique_by_length[main_length],
+        'top_patterns': top_by_length[main_length],
+        'unique_by_length': unique_by_length,
+        'top_by_length': top_by_length
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Top 20 patterns for a batch of strains")
+    parser.add_argument("strains", nargs="*",
+                        help="FASTA files or glob patterns (default: the 10 lab strains)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: one per core)")
+    parser.add_argument("--figures", metavar="DIR", default=None,
+                        help="save figures as PNG files in DIR instead of showing them")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[3],
+                        help="pattern lengths, all counted in one scan (default: 3)")
+    parser.add_argument("--approximate", metavar="EPSILON", type=float, nargs="?", const=1e-5,
+                        default=None, help="top patterns from fixed-memory heavy-hitter "
+                                           "summaries, counts within EPSILON * length (default 1e-5)")
+    parser.add_argument("--index", action="store_true",
+                        help="keep a k-mer count index per strain and compare the strains with it")
+    parser.add_argument("--distances", action="store_true",
+                        help="MinHash all strains and cluster them by Mash distance")
+    parser.add_argument("--profile", action="store_true",
+                        help="report per-stage timings and memory (runs serially)")
+    args = parser.parse_args(argv)
+    
+    if args.profile:
+        enable()
+        args.workers = 1
+    
+    if args.figures:
+        set_figures_dir(args.figures)
+    
+    if args.strains:
+        filenames = expand_inputs(args.strains)
+    else:
+        filenames = [f"sequence ({strain_num}).fasta" for strain_num in range(1, 11)]
+    
     print("=" * 60)
     print("PATTERN ANALYSIS FOR INFLUENZA STRAINS")
     print("=" * 60)
     print()
     
-    fig = plt.figure(figsize=(20, 12))
+    # one strain: split its counting over the workers instead of the strains
+    workers = args.workers or default_workers()
+    chunk_workers = workers if len(filenames) == 1 else 1
+    if args.index:
+        analyze = functools.partial(analyze_strain_indexed, pattern_lengths=tuple(args.lengths),
+                                    workers=chunk_workers)
+    else:
+        analyze = functools.partial(analyze_strain, pattern_lengths=tuple(args.lengths),
+                                    epsilon=args.approximate, workers=chunk_workers)
+    results = run_batch(analyze, filenames, workers)
+    
+    if args.figures:
+        chart_jobs = [(top_patterns, strain_num, length)
+                      for strain_num, result in enumerate(results, 1) if 'error' not in result
+                      for length, top_patterns in result['top_by_length'].items()]
+        render_figures(plot_top_patterns, chart_jobs, args.workers)
     
-    for strain_num in range(1, 11):
-        filename = f"sequence ({strain_num}).fasta"
+    columns = 5
+    rows = max(1, ceil(len(filenames) / columns))
+    fig = plt.figure(figsize=(20, 6 * rows))
+    
+    for strain_num, result in enumerate(results, 1):
+        filename = result['filename']
         
         print(f"Analyzing strain {strain_num}: {filename}")
         
-        try:
-            sequence = read_fasta(filename)
-            print(f"  Sequence length: {len(sequence)} base pairs")
-            
-            pattern_counts = count_all_patterns(sequence, pattern_length=3)
-            print(f"  Unique patterns found: {len(pattern_counts)}")
-            
-            top_20 = get_top_patterns(pattern_counts, top_n=20)
-            print(f"  Top pattern: {top_20[0][0]} with {top_20[0][1]} occurrences")
-            print()
-            
-            patterns = [item[0] for item in top_20]
-            counts = [item[1] for item in top_20]
-            
-            ax = plt.subplot(2, 5, strain_num)
-            ax.bar(range(len(patterns)), counts, color='steelblue')
-            ax.set_xlabel('Pattern', fontsize=8)
-            ax.set_ylabel('Repetitions', fontsize=8)
-            ax.set_title(f'Strain {strain_num}', fontsize=10, fontweight='bold')
-            ax.set_xticks(range(len(patterns)))
-            ax.set_xticklabels(patterns, rotation=90, ha='right', fontsize=6)
-            ax.tick_params(axis='y', labelsize=7)
-            ax.grid(axis='y', alpha=0.3)
-            
-        except FileNotFoundError:
+        if 'error' in result:
             print(f"  Error: {filename} not found!")
             print()
+            continue
+        
+        print(f"  Sequence length: {result['length']} base pairs")
+        for length, top_patterns in result['top_by_length'].items():
+            label = f"  Length {length} - " if len(args.lengths) > 1 else "  "
+            if result['unique_by_length'][length] is not None:
+                print(f"{label}Unique patterns found: {result['unique_by_length'][length]}")
+            if top_patterns:
+                print(f"{label}Top pattern: {top_patterns[0][0]} with {top_patterns[0][1]} occurrences")
+        print()
+        
+        top_20 = result['top_patterns']
+        
+        patterns = [item[0] for item in top_20]
+        counts = [item[1] for item in top_20]
+        
+        ax = plt.subplot(rows, columns, strain_num)
+        ax.bar(range(len(patterns)), counts, color='steelblue')
+        ax.set_xlabel('Pattern', fontsize=8)
+        ax.set_ylabel('Repetitions', fontsize=8)
+        ax.set_title(f'Strain {strain_num}', fontsize=10, fontweight='bold')
+        ax.set_xticks(range(len(patterns)))
+        ax.set_xticklabels(patterns, rotation=90, ha='right', fontsize=6)
+        ax.tick_params(axis='y', labelsize=7)
+        ax.grid(axis='y', alpha=0.3)
     
     plt.suptitle('Top 20 Most Repeated Patterns - All Strains', fontsize=16, fontweight='bold')
     plt.tight_layout()
-    plt.show()
+    show_figure("top_patterns_all_strains")
+    
+    found = [result['filename'] for result in results if 'error' not in result]
+    if args.distances and len(found) > 1:
+        compare_strains(found, workers)
+    
+    if args.index and len(found) > 1:
+        shared_count, shared_top = shared_patterns(found, args.lengths[0])
+        print(f"Patterns of length {args.lengths[0]} shared by all {len(found)} strains: {shared_count}")
+        for pattern, total in shared_top:
+            print(f"  {pattern}: {total} occurrences in total")
+        print()
     
     print("=" * 60)
     print("Analysis complete!")
@@ -1,14 +1,15 @@
 #1. Make an artificial DNA sequence of 200-400b in length, in which to simulate 3-4 transposable elements.
 
+import os
 import random
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from common.synthetic import random_text
 
 # Create a random DNA sequence
 dna_length = 300
-dna = ""
-bases = ['A', 'T', 'G', 'C']
-
-for i in range(dna_length):
-    dna += random.choice(bases)
+dna = random_text(dna_length)
 
 print("Original DNA sequence:")
 print(dna)
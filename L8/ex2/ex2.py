@@ -1,14 +1,15 @@
 #2. Implement a software application to detect the positions of these transposable elements (start, end) within the created DNA sequence.
 
+import os
 import random
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from common.synthetic import random_text
 
 # Create a random DNA sequence
 dna_length = 300
-dna = ""
-bases = ['A', 'T', 'G', 'C']
-
-for i in range(dna_length):
-    dna += random.choice(bases)
+dna = random_text(dna_length)
 
 # Define 3 transposable elements
 transposon1 = "ATCGATCG"  # 8 bp
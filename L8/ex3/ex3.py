@@ -6,19 +6,13 @@ Note: The following cases must be taken into consideration: transposone embeddin
 # we need to use 2 sliding windows to search downstream
 # so you will scan with sliding window 1 from beginning to the end but at each pos we make an entire scan with sliding window 2 
 
+import os
+import sys
 
-def read_fasta(filename):
-    """Read DNA sequence from FASTA file"""
-    with open(filename, 'r') as file:
-        lines = file.readlines()
-    
-    sequence = ""
-    for line in lines:
-        if line.startswith('>'):
-            continue
-        sequence += line.strip().upper()
-    
-    return sequence
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from common.fasta import read_fasta
+from common.instrument import count, enable_from_argv, stage, timed
+from common.packed import as_text
 
 
 def get_reverse_complement(seq):
@@ -36,11 +30,15 @@ def get_reverse_complement(seq):
     return rev_comp
 
 
+@timed("itr_scan")
 def find_transposons(dna_sequence, min_itr=5, max_itr=6, min_internal=10, max_internal=100):
     """
     Find transposable elements with inverted terminal repeats (ITRs)
     Structure: [ITR]---internal sequence---[inverted ITR]
+    dna_sequence may be a str or a PackedSequence; the scan compares
+    text slices, so a PackedSequence is decoded once up front
     """
+    dna_sequence = as_text(dna_sequence)
     transposons = []
     seq_length = len(dna_sequence)
     
@@ -92,9 +90,11 @@ def find_transposons(dna_sequence, min_itr=5, max_itr=6, min_internal=10, max_in
                         'sequence': transposon_seq
                     })
     
+    count("transposons", len(transposons))
     return transposons
 
 
+@timed("overlap_check", sequence_arg=None)
 def check_overlapping_or_embedding(transposons):
     """Check for overlapping or embedded transposons"""
     overlapping_pairs = []
@@ -158,6 +158,7 @@ def display_results(filename, transposons):
 
 
 def main():
+    enable_from_argv()
     print("=" * 80)
     print("TRANSPOSABLE ELEMENTS DETECTION IN BACTERIAL GENOMES")
     print("Detecting TEs with Inverted Terminal Repeats (ITRs: 5-6 bp)")
@@ -174,7 +175,8 @@ def main():
     for filename in fasta_files:
         try:
             # Read DNA sequence
-            dna = read_fasta(filename)
+            with stage("read_fasta"):
+                dna = read_fasta(filename).upper()
             
             # Find transposons
             # For small bacterial genomes (200-600 bp), use appropriate internal length ranges
@@ -1,9 +1,16 @@
 #!/usr/bin/env python3
 
+import os
+import sys
 import matplotlib.pyplot as plt
 import numpy as np
 from typing import Dict, List, Tuple
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from common.packed import as_text
+from common.figures import show_figure
+from common.instrument import enable_from_argv, timed
+
 DNA_SEQUENCE = """
 GGCCACTCCACCCCGAGGGCCACCGTGGCCGCCGACGCCGACGCCGCCATGGCCGCCGAAGTCGGCCTTCACCGACGCCAAGGAGCTGCGCGAG
 ACCTTCGAGAACGACGCCGCCTTCTTCCCCGCCTTCCCCGGCGACGCCGCCGCCGTCTACGCCGACGACGCCGCCGCCACCGCCGACGCCGCC
@@ -58,9 +65,10 @@ class RestrictionEnzyme:
         self.recognition_seq = recognition_seq
         self.cleavage_position = cleavage_position
     
-    def find_cleavage_sites(self, dna_seq: str) -> List[int]:
+    def find_cleavage_sites(self, dna_seq) -> List[int]:
         sites = []
-        seq_upper = dna_seq.upper()
+        # a PackedSequence is decoded here; the site scan works on text
+        seq_upper = as_text(dna_seq).upper()
         recog_upper = self.recognition_seq.upper()
         
         for i in range(len(seq_upper) - len(recog_upper) + 1):
@@ -69,7 +77,7 @@ class RestrictionEnzyme:
         
         return sorted(sites)
     
-    def digest(self, dna_seq: str) -> Tuple[List[int], List[int]]:
+    def digest(self, dna_seq) -> Tuple[List[int], List[int]]:
         cleavage_sites = self.find_cleavage_sites(dna_seq)
         
         if not cleavage_sites:
@@ -98,7 +106,8 @@ class RestrictionAnalyzer:
         }
         self.results = {}
     
-    def analyze(self, dna_seq: str) -> Dict:
+    @timed("restriction_analysis", sequence_arg=1)
+    def analyze(self, dna_seq) -> Dict:
         self.results = {}
         
         for enzyme_name, enzyme in self.enzymes.items():
@@ -207,7 +216,7 @@ class RestrictionAnalyzer:
         plt.tight_layout()
         plt.savefig(output_file, dpi=300, bbox_inches='tight')
         print(f"\nGel electrophoresis visualization saved to: {output_file}")
-        plt.show()
+        show_figure()
     
     def visualize_fragment_distribution(self, output_file: str = 'fragment_distribution.png'):
         enzyme_names = ['EcoRI', 'BamHI', 'HindIII', 'TaqI', 'HaeIII']
@@ -257,10 +266,11 @@ class RestrictionAnalyzer:
         plt.tight_layout()
         plt.savefig(output_file, dpi=300, bbox_inches='tight')
         print(f"Fragment distribution chart saved to: {output_file}")
-        plt.show()
+        show_figure()
 
 
 def main():
+    enable_from_argv()
     print("\n" + "=" * 90)
     print("DNA RESTRICTION ENZYME ANALYSIS - BIOINFORMATICS LAB 9")
     print("=" * 90)
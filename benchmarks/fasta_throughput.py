@@ -0,0 +1,59 @@
+'''
+Throughput of the shared FASTA reader on a synthetic multi-record file.
+
+Usage: python benchmarks/fasta_throughput.py [size_mb] [records]
+
+The file is written to a temporary directory and removed afterwards.
+'''
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.fasta import iter_fasta
+
+
+def write_synthetic_fasta(path, total_bases, records, line_width=70, seed=1):
+    rng = random.Random(seed)
+    per_record = total_bases // records
+    block = "".join(rng.choice("ACGT") for _ in range(1 << 16))
+    with open(path, "w") as handle:
+        for r in range(records):
+            handle.write(f">record_{r} synthetic\n")
+            offset = rng.randrange(len(block))
+            written = 0
+            while written < per_record:
+                width = min(line_width, per_record - written)
+                start = (offset + written) % (len(block) - line_width)
+                handle.write(block[start:start + width])
+                handle.write("\n")
+                written += width
+
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    records = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "synthetic.fasta")
+        write_synthetic_fasta(path, size_mb * 1_000_000, records)
+        file_size = os.path.getsize(path)
+
+        start = time.perf_counter()
+        bases = 0
+        count = 0
+        for _, sequence in iter_fasta(path):
+            bases += len(sequence)
+            count += 1
+        elapsed = time.perf_counter() - start
+
+    print(f"File size: {file_size / 1e6:.1f} MB, {count} records, {bases} bases")
+    print(f"Elapsed: {elapsed:.2f} s")
+    print(f"Throughput: {file_size / 1e6 / elapsed:.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+'''
+Benchmark suite for the analysis hot paths of the labs.
+
+Every benchmark runs on synthetic genomes (default 10 kb, 1 Mb and 50 Mb),
+is timed without tracing and then run once more under tracemalloc to get
+the peak memory. Pure-Python paths that are quadratic or close to it have a
+max_size; larger genomes are recorded as skipped unless --no-limits is
+given.
+
+Usage:
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --sizes 10k 1M --only kmer tandem
+    python benchmarks/run_benchmarks.py --history benchmarks/history.json
+
+Each run is appended to the JSON history file together with the git commit,
+and compared with the previous run recorded there.
+'''
+
+import argparse
+import contextlib
+import gc
+import importlib.util
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+from common.synthetic import random_text  # noqa: E402
+
+SIZES = {"10k": 10_000, "1M": 1_000_000, "50M": 50_000_000}
+TRACE_BUDGET = 20.0
+DEFAULT_HISTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "history.json")
+
+
+def load_lab(relative_path, name):
+    """
+    Import a lab file under a unique module name. The lab directory goes
+    first on sys.path and any cached sibling 'ex1' is dropped, because
+    several labs have an ex1.py that their ex2.py imports.
+    """
+    path = os.path.join(ROOT, relative_path)
+    directory = os.path.dirname(path)
+    sys.path.insert(0, directory)
+    sys.modules.pop("ex1", None)
+    try:
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+            spec.loader.exec_module(module)
+    finally:
+        sys.path.remove(directory)
+    return module
+
+
+def synthetic_genome(size, seed=7):
+    return random_text(size, rng=np.random.default_rng(seed))
+
+
+def _l2_brute_force(lab, seq):
+    lab.brute_force_engine(seq, 2, lab.di)
+    lab.brute_force_engine(seq, 3, lab.tri)
+
+
+def _l2_from_the_beginning(lab, seq):
+    lab.from_the_beginning(seq, 3)
+
+
+def _l7_count_patterns(lab, seq):
+    lab.count_all_patterns(seq, pattern_length=3)
+
+
+def _l2_windows(lab, seq):
+    lab.compute_freqs(seq, 30, 1)
+
+
+def _l3_windows(lab, seq):
+    lab.calculate_melting_temps(seq)
+
+
+def _l10_windows(lab, seq):
+    lab.sliding_window_analysis(seq, 30)
+
+
+def _l5_reconstruction(lab, seq):
+    lab.random.seed(1)
+    samples = lab.generate_random_samples(seq, num_samples=2000, sample_length=150)
+    lab.simple_reconstruct(samples, seq, overlap_size=40)
+
+
+def _l6_digest(lab, seq):
+    lab.digest_with_ecori(seq)
+
+
+def _l9_digest(lab, seq):
+    lab.RestrictionAnalyzer().analyze(seq)
+
+
+def _l7_tandem(lab, seq):
+    for pattern_size in range(3, 7):
+        lab.find_tandem_repeats(seq, pattern_size, min_repetitions=3)
+
+
+def _l8_itr(lab, seq):
+    lab.find_transposons(seq, min_itr=5, max_itr=6, min_internal=15, max_internal=50)
+
+
+# name -> (group, lab file, function, max_size or None)
+BENCHMARKS = {
+    "kmer_l2_brute_force": ("kmer", "L2/lab2_solution.py", _l2_brute_force, None),
+    "kmer_l2_from_the_beginning": ("kmer", "L2/lab2_ex2_solution.py", _l2_from_the_beginning, 1_000_000),
+    "kmer_l7_count_all_patterns": ("kmer", "L7/ex2.py", _l7_count_patterns, None),
+    "window_l2_compute_freqs": ("window", "L2/lab2_ex3_solution.py", _l2_windows, 1_000_000),
+    "window_l3_melting_temps": ("window", "L3/lab3_ex2_solution.py", _l3_windows, 1_000_000),
+    "window_l10_cg_kappa": ("window", "L10/L10/ex1.py", _l10_windows, 10_000),
+    "greedy_l5_reconstruction": ("greedy", "L5/lab5.py", _l5_reconstruction, 10_000),
+    "digest_l6_ecori": ("digest", "L6/ex2.py", _l6_digest, None),
+    "digest_l9_analyzer": ("digest", "L9/L9/restriction_enzyme_analysis.py", _l9_digest, 1_000_000),
+    "tandem_l7_repeats": ("tandem", "L7/ex1.py", _l7_tandem, 1_000_000),
+    "itr_l8_transposons": ("itr", "L8/ex3/ex3.py", _l8_itr, 10_000),
+}
+
+
+def measure(func, lab, seq, trace_budget=TRACE_BUDGET):
+    """
+    Return (seconds, peak_bytes) for one call of func(lab, seq). The traced
+    second run is skipped (peak None) when the timed run took longer than
+    trace_budget seconds, since tracemalloc slows pure Python down severalfold.
+    """
+    gc.collect()
+    with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+        start = time.perf_counter()
+        func(lab, seq)
+        seconds = time.perf_counter() - start
+
+        peak = None
+        if seconds <= trace_budget:
+            gc.collect()
+            tracemalloc.start()
+            func(lab, seq)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+    return seconds, peak
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path):
+    try:
+        with open(path, "r") as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return []
+
+
+def compare(previous, current):
+    before = {(r["name"], r["size"]): r for r in previous["results"] if r.get("seconds")}
+    print()
+    print(f"Compared with run of {previous['timestamp']} (commit {previous.get('commit')}):")
+    for result in current["results"]:
+        old = before.get((result["name"], result["size"]))
+        if not old or not result.get("seconds"):
+            continue
+        ratio = result["seconds"] / old["seconds"]
+        flag = "  <-- slower" if ratio > 1.2 else ""
+        print(f"  {result['name']:32} {result['size']:>10}  x{ratio:5.2f}{flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the lab hot paths")
+    parser.add_argument("--sizes", nargs="+", default=list(SIZES), choices=list(SIZES))
+    parser.add_argument("--only", nargs="+", default=None,
+                        help="benchmark groups or names to run (kmer, window, greedy, digest, tandem, itr)")
+    parser.add_argument("--no-limits", action="store_true",
+                        help="also run slow benchmarks on genomes above their max_size")
+    parser.add_argument("--history", default=DEFAULT_HISTORY, help="JSON history file")
+    args = parser.parse_args(argv)
+
+    selected = {name: spec for name, spec in BENCHMARKS.items()
+                if not args.only or name in args.only or spec[0] in args.only}
+    labs = {name: load_lab(spec[1], "bench_" + name) for name, spec in selected.items()}
+
+    run = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "results": [],
+    }
+
+    for size_label in args.sizes:
+        size = SIZES[size_label]
+        seq = synthetic_genome(size)
+        for name, (group, _, func, max_size) in selected.items():
+            if max_size is not None and size > max_size and not args.no_limits:
+                run["results"].append({"name": name, "group": group, "size": size, "skipped": True})
+                print(f"{name:32} {size:>10}  skipped (max_size {max_size})", flush=True)
+                continue
+            seconds, peak = measure(func, labs[name], seq)
+            run["results"].append({
+                "name": name, "group": group, "size": size,
+                "seconds": round(seconds, 6),
+                "bases_per_second": round(size / seconds) if seconds > 0 else None,
+                "peak_bytes": peak,
+            })
+            peak_text = f"peak {peak / 1e6:8.1f} MB" if peak is not None else "peak not traced"
+            print(f"{name:32} {size:>10}  {seconds:9.3f} s  {size / seconds / 1e6:8.2f} Mb/s  "
+                  f"{peak_text}", flush=True)
+
+    history = load_history(args.history)
+    if history:
+        compare(history[-1], run)
+    history.append(run)
+    with open(args.history, "w") as handle:
+        json.dump(history, handle, indent=1)
+    print(f"\nResults appended to {args.history}")
+
+
+if __name__ == "__main__":
+    main()
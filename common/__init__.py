@@ -0,0 +1,5 @@
+"""
+Helpers shared by the lab solutions (FASTA input, sequence containers,
+counting engines). Each lab adds the repository root to sys.path and
+imports from here instead of keeping its own copy.
+"""
@@ -0,0 +1,80 @@
+"""
+Process-pool batch runner for per-genome work.
+
+The labs process each genome independently (parse, digest, count), so a
+collection of genomes is fanned out over a ProcessPoolExecutor and the
+results come back in input order.
+"""
+
+import glob
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator, List
+
+from common import instrument
+
+
+def expand_inputs(items: Iterable[str]) -> List[str]:
+    """
+    Turn a list of paths and glob patterns into a list of paths.
+    Glob matches are sorted; the order of the arguments is kept and
+    duplicates are dropped.
+    """
+    paths = []
+    seen = set()
+    for item in items:
+        matches = sorted(glob.glob(item)) if glob.has_magic(item) else [item]
+        for path in matches:
+            if path not in seen:
+                seen.add(path)
+                paths.append(path)
+    return paths
+
+
+def default_workers() -> int:
+    return int(os.environ.get("BATCH_WORKERS", os.cpu_count() or 1))
+
+
+def _pool_size(workers: int = None) -> int:
+    # stages recorded in a worker process would never reach the report
+    if instrument.enabled():
+        return 1
+    return workers or default_workers()
+
+
+def run_batch(func: Callable, items: Iterable, workers: int = None, chunksize: int = 1) -> list:
+    """
+    Apply func to every item on a process pool and return the results in
+    input order. func must be a module-level (picklable) function.
+    With workers == 1, a single item, or instrumentation enabled (see
+    common.instrument), everything runs in this process.
+    """
+    items = list(items)
+    workers = _pool_size(workers)
+    workers = min(workers, len(items))
+    if workers <= 1:
+        return [func(item) for item in items]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(func, items, chunksize=chunksize))
+
+
+def iter_batch(func: Callable, items: Iterable, workers: int = None, prefetch: int = 2) -> Iterator:
+    """
+    Like run_batch, but yields results in input order as they complete and
+    keeps at most workers * prefetch items in flight, so a long stream of
+    large items (e.g. sequence chunks) never sits in memory all at once.
+    """
+    workers = _pool_size(workers)
+    if workers <= 1:
+        for item in items:
+            yield func(item)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for item in items:
+            pending.append(pool.submit(func, item))
+            if len(pending) >= workers * prefetch:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
@@ -0,0 +1,194 @@
+"""
+Persistent binary cache of parsed FASTA files.
+
+The first read of a FASTA parses it, packs every record to 2 bits per base
+and writes the result to the cache directory. Later reads mmap that file
+and wrap the packed bytes in PackedSequence objects without copying.
+
+Entries are named by a BLAKE2 digest of the FASTA content. A small
+manifest remembers (size, mtime, digest) per source path so an unchanged
+file is not rehashed; a changed size or mtime triggers a rehash and, if the
+content really changed, a rebuild. The directory is capped in bytes and
+the least recently used entries are evicted first.
+
+Environment variables:
+    SEQ_CACHE_DIR        cache directory (default ~/.cache/bioinformatics-labs)
+    SEQ_CACHE_MAX_BYTES  size cap (default 2 GB)
+    SEQ_CACHE_DISABLE    set to 1 to bypass the cache
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+from typing import List, Tuple
+
+import numpy as np
+
+from common.fasta import iter_fasta
+from common.packed import PackedSequence
+
+MAGIC = b"SEQCACHE1\n"
+MANIFEST = "manifest.json"
+# entry files sharing the size cap (.kidx are k-mer indexes, common.kmer_index)
+ENTRY_SUFFIXES = (".seqc", ".kidx")
+
+
+def cache_dir() -> str:
+    default = os.path.join(os.path.expanduser("~"), ".cache", "bioinformatics-labs")
+    return os.environ.get("SEQ_CACHE_DIR", default)
+
+
+def max_cache_bytes() -> int:
+    return int(os.environ.get("SEQ_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_manifest(directory: str) -> dict:
+    try:
+        with open(os.path.join(directory, MANIFEST), "r") as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_atomic(directory: str, name: str, data: bytes):
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    with os.fdopen(fd, "wb") as handle:
+        handle.write(data)
+    os.replace(tmp_path, os.path.join(directory, name))
+
+
+def source_digest(path: str, directory: str) -> str:
+    """Digest of the FASTA at path, reusing the manifest when size and mtime match."""
+    stat = os.stat(path)
+    key = os.path.abspath(path)
+    manifest = _read_manifest(directory)
+    known = manifest.get(key)
+    if known and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+        return known["digest"]
+    digest = file_digest(path)
+    manifest[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "digest": digest}
+    _write_atomic(directory, MANIFEST, json.dumps(manifest).encode())
+    return digest
+
+
+def _entry_path(directory: str, digest: str) -> str:
+    return os.path.join(directory, digest + ".seqc")
+
+
+def write_entry(entry_path: str, records: List[Tuple[str, PackedSequence]]):
+    meta = []
+    offset = 0
+    for header, packed in records:
+        meta.append({"header": header, "length": packed.length, "offset": offset,
+                     "nbytes": packed.packed.nbytes, "mask": packed.mask})
+        offset += (packed.packed.nbytes + 7) // 8 * 8
+    meta_bytes = json.dumps(meta).encode()
+    preamble = MAGIC + struct.pack("<Q", len(meta_bytes)) + meta_bytes
+    preamble += b"\0" * (-len(preamble) % 8)
+
+    directory = os.path.dirname(entry_path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    with os.fdopen(fd, "wb") as handle:
+        handle.write(preamble)
+        for _, packed in records:
+            data = packed.packed.tobytes()
+            handle.write(data + b"\0" * (-len(data) % 8))
+    os.replace(tmp_path, entry_path)
+
+
+def read_entry(entry_path: str) -> List[Tuple[str, PackedSequence]]:
+    """mmap a cache entry; the returned sequences share its pages."""
+    with open(entry_path, "rb") as handle:
+        data = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{entry_path}: not a sequence cache file")
+    (meta_length,) = struct.unpack("<Q", data[len(MAGIC):len(MAGIC) + 8])
+    meta_start = len(MAGIC) + 8
+    meta = json.loads(data[meta_start:meta_start + meta_length])
+    base = meta_start + meta_length
+    base += -base % 8
+
+    records = []
+    for item in meta:
+        packed = np.frombuffer(data, dtype=np.uint8, count=item["nbytes"],
+                               offset=base + item["offset"])
+        mask = [(s, e, c) for s, e, c in item["mask"]]
+        records.append((item["header"], PackedSequence(packed, item["length"], mask)))
+    return records
+
+
+def evict(directory: str, limit: int, keep: str = None):
+    """Delete least recently used entries until the directory fits in limit bytes."""
+    entries = []
+    for name in os.listdir(directory):
+        if name.endswith(ENTRY_SUFFIXES):
+            path = os.path.join(directory, name)
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= limit:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+
+
+def cached_records(path: str) -> List[Tuple[str, PackedSequence]]:
+    """
+    All records of a FASTA file as (header, PackedSequence), served from
+    the cache when possible. Falls back to parsing if the cache directory
+    cannot be used.
+    """
+    if os.environ.get("SEQ_CACHE_DISABLE") == "1":
+        return [(header, PackedSequence.from_text(seq)) for header, seq in iter_fasta(path)]
+
+    directory = cache_dir()
+    try:
+        os.makedirs(directory, exist_ok=True)
+        entry_path = _entry_path(directory, source_digest(path, directory))
+        if os.path.exists(entry_path):
+            os.utime(entry_path)
+            return read_entry(entry_path)
+    except (OSError, ValueError):
+        return [(header, PackedSequence.from_text(seq)) for header, seq in iter_fasta(path)]
+
+    records = [(header, PackedSequence.from_text(seq)) for header, seq in iter_fasta(path)]
+    try:
+        write_entry(entry_path, records)
+        evict(directory, max_cache_bytes(), keep=entry_path)
+    except OSError:
+        pass
+    return records
+
+
+def cached_first_record(path: str) -> Tuple[str, str]:
+    """
+    Cached equivalent of common.fasta.read_first_record. Like everything
+    coming out of a PackedSequence, the bases are upper-case.
+    """
+    records = cached_records(path)
+    if not records:
+        return "", ""
+    header, packed = records[0]
+    return header, packed.decode()
+
+
+def cached_read_fasta(path: str) -> str:
+    """Cached equivalent of common.fasta.read_fasta (records concatenated)."""
+    return "".join(packed.decode() for _, packed in cached_records(path))
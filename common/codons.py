@@ -0,0 +1,222 @@
+"""
+Codon usage of all six reading frames in one pass.
+
+Every codon is the integer 16 * b0 + 4 * b1 + b2 of its 2-bit bases
+(A=0, C=1, G=2, T/U=3, as in common.kmers), so the 64 codons index a table
+directly and "AAA" is 0, "UUU" 63. The codes of all windows are built at
+once with shifted array slices; one np.bincount over (phase, codon) keys
+then counts the three forward frames together, and the reverse-strand
+frames are the same counts read through the 64-entry reverse complement
+table, since the codon of the reverse strand at a window is the reverse
+complement of the forward codon there. Codons with a non-ACGTU base are
+not counted.
+
+Rows of a usage matrix are the frames +1, +2, +3 (starting at base 0, 1,
+2) and -1, -2, -3 (the same on the reverse complement).
+
+Translation maps the same codon codes through a 65-byte lookup table
+(entry 64 is X, for codons with an unknown base) to one-letter amino acids,
+with * for stops. A frame is a strided slice of the codon codes, so one
+table gather translates it; translate_batch gathers all six frames of many
+short sequences at once and returns them as bytes. Tables are NCBI
+translation table ids (1 standard, 2 vertebrate mitochondrial, ...) or a
+codon -> amino acid dict such as L4's genetic_code.
+"""
+
+import functools
+from typing import Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+
+from common.batch import iter_batch
+from common.kmers import CHUNK, _as_collection
+from common.packed import PackedSequence, _ENCODE, as_codes
+
+FRAMES = ("+1", "+2", "+3", "-1", "-2", "-3")
+RNA_BASES = "ACGU"
+
+# the DNA table plus U/u, so RNA needs no T -> U copy
+_ENCODE_RNA = _ENCODE.copy()
+_ENCODE_RNA[ord("U")] = _ENCODE_RNA[ord("u")] = 3
+
+_CODONS = np.arange(64)
+REVERSE_COMPLEMENT = (3 - (_CODONS & 3)) << 4 | (3 - (_CODONS >> 2 & 3)) << 2 | (3 - (_CODONS >> 4))
+# with the unknown codon 64 mapped to itself
+_REVERSE_COMPLEMENT_65 = np.append(REVERSE_COMPLEMENT, 64)
+
+# NCBI translation tables, codons in TCAG order (TTT, TTC, TTA, TTG, TCT, ...)
+NCBI_TABLES = {
+    1: "FFLLSSSSYY**CC*WLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG",
+    2: "FFLLSSSSYY**CCWWLLLLPPPPHHQQRRRRIIMMTTTTNNKKSS**VVVVAAAADDEEGGGG",
+    3: "FFLLSSSSYY**CCWWTTTTPPPPHHQQRRRRIIMMTTTTNNKKSSRRVVVVAAAADDEEGGGG",
+    4: "FFLLSSSSYY**CCWWLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG",
+    5: "FFLLSSSSYY**CCWWLLLLPPPPHHQQRRRRIIMMTTTTNNKKSSSSVVVVAAAADDEEGGGG",
+    6: "FFLLSSSSYYQQCC*WLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG",
+    11: "FFLLSSSSYY**CC*WLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG",
+}
+
+AMINO_ACID_NAMES = {
+    "A": "Ala", "R": "Arg", "N": "Asn", "D": "Asp", "C": "Cys", "Q": "Gln", "E": "Glu",
+    "G": "Gly", "H": "His", "I": "Ile", "L": "Leu", "K": "Lys", "M": "Met", "F": "Phe",
+    "P": "Pro", "S": "Ser", "T": "Thr", "W": "Trp", "Y": "Tyr", "V": "Val", "*": "Stop",
+}
+_ONE_LETTER = {name: letter for letter, name in AMINO_ACID_NAMES.items()}
+
+
+def base_codes(sequence) -> np.ndarray:
+    """2-bit codes of a DNA or RNA sequence, 255 for any other character."""
+    if isinstance(sequence, PackedSequence):
+        return as_codes(sequence)
+    if isinstance(sequence, str):
+        sequence = sequence.encode("ascii")
+    return _ENCODE_RNA[np.frombuffer(sequence, dtype=np.uint8)]
+
+
+def codon_codes(bases: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(codes, valid) of the codons starting at every position of a base-code array."""
+    n = len(bases) - 2
+    if n <= 0:
+        return np.zeros(0, dtype=np.uint8), np.zeros(0, dtype=bool)
+    first, second, third = bases[:n], bases[1:n + 1], bases[2:]
+    valid = (first != 255) & (second != 255) & (third != 255)
+    return (first & 3) << 4 | (second & 3) << 2 | (third & 3), valid
+
+
+def codon_string(code: int) -> str:
+    return RNA_BASES[code >> 4] + RNA_BASES[code >> 2 & 3] + RNA_BASES[code & 3]
+
+
+def codon_usage(sequences, chunk_size: int = CHUNK) -> np.ndarray:
+    """
+    6 x 64 matrix of codon counts (rows in FRAMES order, columns by codon
+    code) of one sequence or summed over a collection of records.
+    """
+    usage = np.zeros((6, 64), dtype=np.int64)
+    step = max(3, chunk_size - chunk_size % 3)
+    for sequence in _as_collection(sequences):
+        length = len(sequence)
+        by_phase = np.zeros(3 * 65, dtype=np.int64)
+        # chunks start at multiples of 3, so phase = position % 3 in every chunk
+        for start in range(0, max(1, length - 2), step):
+            codes, valid = codon_codes(base_codes(sequence[start:start + step + 2]))
+            keys = np.where(valid, codes, 64).astype(np.int16)
+            keys[1::3] += 65
+            keys[2::3] += 130
+            by_phase += np.bincount(keys, minlength=3 * 65)
+        by_phase = by_phase.reshape(3, 65)[:, :64]
+        usage[:3] += by_phase
+        for frame in range(3):
+            # codon `frame` of the reverse strand, read 3' to 5', starts at
+            # forward position length - 3 - frame
+            usage[3 + frame] += by_phase[(length - 3 - frame) % 3][REVERSE_COMPLEMENT]
+    return usage
+
+
+def usage_counts(row: np.ndarray) -> Dict[str, int]:
+    """Codon -> count of one usage row (or a sum of rows), codons that occur only."""
+    return {codon_string(code): int(row[code]) for code in np.flatnonzero(row).tolist()}
+
+
+# T, C, A, G -> codes A=0, C=1, G=2, T=3
+_TCAG_CODES = np.array([3, 1, 0, 2])
+
+
+@functools.lru_cache(maxsize=None)
+def _ncbi_table(table_id: int) -> np.ndarray:
+    if table_id not in NCBI_TABLES:
+        raise ValueError(f"unknown translation table {table_id}; known: {sorted(NCBI_TABLES)}")
+    lut = np.full(65, ord("X"), dtype=np.uint8)
+    order = _CODONS
+    codes = _TCAG_CODES[order >> 4] << 4 | _TCAG_CODES[order >> 2 & 3] << 2 | _TCAG_CODES[order & 3]
+    lut[codes] = np.frombuffer(NCBI_TABLES[table_id].encode("ascii"), dtype=np.uint8)
+    return lut
+
+
+def translation_table(table: Union[int, Dict[str, str]] = 1) -> np.ndarray:
+    """
+    65-entry uint8 lookup table codon code -> one-letter amino acid, from an
+    NCBI table id or a codon -> amino acid dict (one- or three-letter names,
+    'Stop' for stops). Codons missing from a dict translate to X.
+    """
+    if isinstance(table, int):
+        return _ncbi_table(table)
+    lut = np.full(65, ord("X"), dtype=np.uint8)
+    for codon, amino_acid in table.items():
+        codes = base_codes(codon)
+        if len(codes) != 3 or (codes == 255).any():
+            raise ValueError(f"not a codon: {codon!r}")
+        lut[int(codes[0]) << 4 | int(codes[1]) << 2 | int(codes[2])] = ord(_ONE_LETTER.get(amino_acid, amino_acid))
+    return lut
+
+
+def _codon_keys(bases: np.ndarray) -> np.ndarray:
+    """Codon code at every position of a base-code array, 64 where unknown."""
+    codes, valid = codon_codes(bases)
+    return np.where(valid, codes, 64).astype(np.uint8)
+
+
+def translate(sequence, table=1) -> bytes:
+    """Frame +1 translation of a DNA or RNA sequence (stops included as *)."""
+    return translation_table(table)[_codon_keys(base_codes(sequence))[::3]].tobytes()
+
+
+def translate_frames(sequence, table=1) -> Tuple[bytes, ...]:
+    """Translations of the six frames, in FRAMES order."""
+    lut = translation_table(table)
+    keys = _codon_keys(base_codes(sequence))
+    reverse_lut = lut[_REVERSE_COMPLEMENT_65]
+    forward = [lut[keys[frame::3]].tobytes() for frame in range(3)]
+    # frame -f reads the reverse strand from forward position len - 3 - f backwards
+    reverse = [reverse_lut[keys[len(keys) - 1 - frame::-3]].tobytes() if len(keys) > frame else b""
+               for frame in range(3)]
+    return tuple(forward + reverse)
+
+
+def _translate_group(job) -> List[Tuple[bytes, ...]]:
+    sequences, table = job
+    lut = translation_table(table)
+    lengths = np.array([len(sequence) for sequence in sequences], dtype=np.int64)
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    keys = _codon_keys(np.concatenate([base_codes(sequence) for sequence in sequences]))
+
+    # start, step and codon count of every (sequence, frame) run
+    frame = np.arange(3)
+    counts = np.maximum(0, (lengths[:, None] - frame - 3) // 3 + 1)
+    counts = np.hstack((counts, counts)).ravel()
+    starts = np.hstack((offsets[:, None] + frame, offsets[:, None] + lengths[:, None] - 3 - frame)).ravel()
+    steps = np.tile([3, 3, 3, -3, -3, -3], len(sequences))
+    run_start = np.cumsum(counts) - counts
+    within = np.arange(counts.sum()) - np.repeat(run_start, counts)
+    positions = np.repeat(starts, counts) + within * np.repeat(steps, counts)
+
+    codons = keys[positions]
+    reverse = np.repeat(steps < 0, counts)
+    codons[reverse] = _REVERSE_COMPLEMENT_65[codons[reverse]]
+    data = lut[codons].tobytes()
+    bounds = np.concatenate((run_start, [len(data)])).tolist()
+    return [tuple(data[bounds[6 * i + f]:bounds[6 * i + f + 1]] for f in range(6))
+            for i in range(len(sequences))]
+
+
+def translate_batch(sequences: Sequence, table=1, batch_bases: int = CHUNK,
+                    workers: int = 1) -> List[Tuple[bytes, ...]]:
+    """
+    Six-frame translations of many sequences, in input order. Sequences are
+    grouped up to batch_bases bases and each group is translated with one
+    table gather (a longer sequence is a group of its own); groups run on
+    worker processes when workers > 1.
+    """
+    jobs, group, size = [], [], 0
+    for sequence in sequences:
+        if group and size + len(sequence) > batch_bases:
+            jobs.append((group, table))
+            group, size = [], 0
+        group.append(sequence)
+        size += len(sequence)
+    if group:
+        jobs.append((group, table))
+
+    results = []
+    for translated in iter_batch(_translate_group, jobs, workers):
+        results.extend(translated)
+    return results
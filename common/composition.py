@@ -0,0 +1,77 @@
+"""
+Base composition of sliding windows from prefix sums.
+
+Composition counts the A, C, G and T of a sequence cumulatively once
+(prefix[i] = counts of the first i bases), after which the counts of any
+window [start, start + size) are prefix[start + size] - prefix[start]: one
+subtraction per window whatever the window size, done for all windows at
+once with array slicing. Changing the window size or step only repeats the
+slicing, never the scan. Non-ACGT bases count towards no base, so a
+window's frequencies then add up to less than 1.
+"""
+
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+from common.packed import as_codes
+
+BASES = "ACGT"
+
+
+class Composition:
+    """Cumulative A/C/G/T counts of one sequence."""
+
+    def __init__(self, sequence):
+        codes = as_codes(sequence)
+        dtype = np.int32 if len(codes) < 2 ** 31 else np.int64
+        self.prefix = np.zeros((len(codes) + 1, 4), dtype=dtype)
+        for base in range(4):
+            np.cumsum(codes == base, out=self.prefix[1:, base])
+
+    def __len__(self) -> int:
+        return len(self.prefix) - 1
+
+    def starts(self, window_size: int, step: int = 1) -> np.ndarray:
+        if window_size < 1 or step < 1:
+            raise ValueError("window size and step must be at least 1")
+        return np.arange(0, len(self) - window_size + 1, step)
+
+    def counts(self, window_size: int, step: int = 1) -> np.ndarray:
+        """(windows, 4) base counts of every window, columns in ACGT order."""
+        return self.counts_at(self.starts(window_size, step), window_size)
+
+    def counts_at(self, starts: np.ndarray, window_size: int) -> np.ndarray:
+        """Base counts of the windows of window_size bases at the given starts."""
+        return self.prefix[starts + window_size] - self.prefix[starts]
+
+    def frequencies(self, window_size: int, step: int = 1) -> np.ndarray:
+        """(windows, 4) relative base frequencies of every window."""
+        return self.counts(window_size, step) / float(window_size)
+
+    def range_counts(self, start: int, end: int) -> np.ndarray:
+        """Base counts of sequence[start:end]."""
+        return self.prefix[end] - self.prefix[start]
+
+
+def window_frequencies(sequence, window_size: int, step: int = 1,
+                       is_stale: Callable[[], bool] = None,
+                       block: int = 1 << 20) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Column arrays window_index, start, end (inclusive) and A, C, G, T
+    frequencies for every window. Pass a Composition to reuse its prefix
+    sums across window sizes. Windows are computed in blocks; with
+    is_stale, None is returned as soon as is_stale() is true.
+    """
+    composition = sequence if isinstance(sequence, Composition) else Composition(sequence)
+    starts = composition.starts(window_size, step)
+    freqs = np.empty((len(starts), 4))
+    for first in range(0, len(starts), block):
+        if is_stale is not None and is_stale():
+            return None
+        part = starts[first:first + block]
+        freqs[first:first + len(part)] = composition.counts_at(part, window_size) / float(window_size)
+    columns = {"window_index": np.arange(len(starts)), "start": starts, "end": starts + window_size - 1}
+    for base, letter in enumerate(BASES):
+        columns[letter] = freqs[:, base]
+    return columns
@@ -0,0 +1,140 @@
+"""
+Transparent gzip / BGZF input for the FASTA readers.
+
+Plain gzip is streamed through the gzip module. BGZF (the blocked gzip
+written by bgzip) is split into its independent deflate blocks, which are
+inflated in batches on a worker pool while the file is read, and the
+output is handed back in order. Nothing is written to disk.
+"""
+
+import gzip
+import os
+import struct
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List
+
+GZIP_MAGIC = b"\x1f\x8b"
+BGZF_MAX_BLOCK = 0xFF00
+BGZF_EOF = bytes.fromhex("1f8b08040000000000ff0600424302001b0003000000000000000000")
+# every format decodes alike; stray bytes in headers become U+FFFD
+ENCODING = "utf-8"
+ERRORS = "replace"
+
+
+def is_gzip(path: str) -> bool:
+    with open(path, "rb") as handle:
+        return handle.read(2) == GZIP_MAGIC
+
+
+def _bsize(extra: bytes):
+    pos = 0
+    while pos + 4 <= len(extra):
+        si1, si2 = extra[pos], extra[pos + 1]
+        (slen,) = struct.unpack("<H", extra[pos + 2:pos + 4])
+        if si1 == 66 and si2 == 67 and slen == 2:
+            return struct.unpack("<H", extra[pos + 4:pos + 6])[0]
+        pos += 4 + slen
+    return None
+
+
+def is_bgzf(path: str) -> bool:
+    with open(path, "rb") as handle:
+        header = handle.read(12)
+        if len(header) < 12 or header[:4] != b"\x1f\x8b\x08\x04":
+            return False
+        (xlen,) = struct.unpack("<H", header[10:12])
+        return _bsize(handle.read(xlen)) is not None
+
+
+def iter_bgzf_blocks(handle) -> Iterator[bytes]:
+    """Yield the raw BGZF blocks of an open binary file, header included."""
+    while True:
+        header = handle.read(12)
+        if not header:
+            return
+        if len(header) < 12 or header[:4] != b"\x1f\x8b\x08\x04":
+            raise ValueError("not a BGZF block")
+        (xlen,) = struct.unpack("<H", header[10:12])
+        extra = handle.read(xlen)
+        bsize = _bsize(extra)
+        if bsize is None:
+            raise ValueError("BGZF block without a BC field")
+        rest = handle.read(bsize - xlen - 11)
+        yield header + extra + rest
+
+
+def inflate_blocks(blocks: List[bytes]) -> bytes:
+    """Decompress a list of BGZF blocks and check their CRC32."""
+    parts = []
+    for block in blocks:
+        (xlen,) = struct.unpack("<H", block[10:12])
+        data = zlib.decompress(block[12 + xlen:-8], -15)
+        crc, size = struct.unpack("<II", block[-8:])
+        if size != len(data) or crc != zlib.crc32(data):
+            raise ValueError("BGZF block failed its CRC check")
+        parts.append(data)
+    return b"".join(parts)
+
+
+def iter_bgzf_chunks(path: str, workers: int = None, batch_blocks: int = 64) -> Iterator[bytes]:
+    """
+    Yield the decompressed content of a BGZF file in order.
+    Batches of blocks are inflated on `workers` threads (zlib releases the
+    GIL), with at most 2 * workers batches in flight.
+    """
+    workers = workers or os.cpu_count() or 1
+    with open(path, "rb") as handle, ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        batch = []
+        for block in iter_bgzf_blocks(handle):
+            batch.append(block)
+            if len(batch) == batch_blocks:
+                pending.append(pool.submit(inflate_blocks, batch))
+                batch = []
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().result()
+        if batch:
+            pending.append(pool.submit(inflate_blocks, batch))
+        while pending:
+            yield pending.popleft().result()
+
+
+def _lines_from_chunks(chunks: Iterator[bytes]) -> Iterator[str]:
+    pending = b""
+    for chunk in chunks:
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line.decode(ENCODING, ERRORS) + "\n"
+    if pending:
+        yield pending.decode(ENCODING, ERRORS)
+
+
+def open_lines(path: str, workers: int = None) -> Iterator[str]:
+    """
+    Iterate over the text lines of a plain, gzip or BGZF file.
+    BGZF files are decompressed in parallel unless workers == 1.
+    """
+    if not is_gzip(path):
+        with open(path, "r", encoding=ENCODING, errors=ERRORS) as handle:
+            yield from handle
+    elif is_bgzf(path) and workers != 1:
+        yield from _lines_from_chunks(iter_bgzf_chunks(path, workers))
+    else:
+        with gzip.open(path, "rt", encoding=ENCODING, errors=ERRORS) as handle:
+            yield from handle
+
+
+def write_bgzf(path: str, data: bytes, level: int = 6):
+    """Write data as a BGZF file (gzip-compatible, readable by bgzip -d)."""
+    with open(path, "wb") as handle:
+        for start in range(0, len(data), BGZF_MAX_BLOCK):
+            chunk = data[start:start + BGZF_MAX_BLOCK]
+            compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+            cdata = compressor.compress(chunk) + compressor.flush()
+            header = struct.pack("<4BIBBHBBHH", 0x1F, 0x8B, 8, 4, 0, 0, 0xFF, 6,
+                                 66, 67, 2, len(cdata) + 25)
+            handle.write(header + cdata + struct.pack("<II", zlib.crc32(chunk), len(chunk)))
+        handle.write(BGZF_EOF)
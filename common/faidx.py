@@ -0,0 +1,228 @@
+"""
+Indexed, memory-mapped access to FASTA files.
+
+The index follows the samtools .fai layout (name, length, offset,
+line_bases, line_width), so a slice of a record maps straight to a byte
+range of the file. Only the pages covering that range are read, which lets
+the samplers and scanners work on genomes much larger than memory.
+"""
+
+import mmap
+import os
+from typing import Dict, Iterator, List, NamedTuple, Tuple
+
+from common.compressed import is_gzip
+
+
+class FaiEntry(NamedTuple):
+    name: str
+    length: int
+    offset: int
+    line_bases: int
+    line_width: int
+
+
+def build_index(path: str) -> List[FaiEntry]:
+    """
+    Scan a FASTA file once and return one FaiEntry per record.
+    Every sequence line except the last one of a record must have the same
+    length, otherwise positions cannot be computed and ValueError is raised.
+    Compressed files cannot be memory-mapped and are rejected.
+    """
+    if is_gzip(path):
+        raise ValueError(f"{path}: compressed FASTA cannot be indexed, decompress it first")
+    entries = []
+    name = None
+    length = offset = line_bases = line_width = 0
+    short_line_seen = False
+    position = 0
+
+    with open(path, "rb") as handle:
+        for raw in handle:
+            line_start = position
+            position += len(raw)
+            if raw.startswith(b">"):
+                if name is not None:
+                    entries.append(FaiEntry(name, length, offset, line_bases, line_width))
+                header = raw[1:].decode().strip()
+                name = header.split()[0] if header else ""
+                length = line_bases = line_width = 0
+                offset = position
+                short_line_seen = False
+                continue
+            if name is None:
+                raise ValueError(f"{path}: sequence data before the first header")
+            bases = len(raw.rstrip(b"\r\n"))
+            if bases == 0:
+                short_line_seen = True
+                continue
+            if line_bases == 0:
+                line_bases = bases
+                line_width = len(raw)
+                offset = line_start
+            elif short_line_seen or bases > line_bases:
+                raise ValueError(f"{path}: record '{name}' has uneven line lengths")
+            elif bases < line_bases:
+                short_line_seen = True
+            length += bases
+
+    if name is not None:
+        entries.append(FaiEntry(name, length, offset, line_bases, line_width))
+    return entries
+
+
+def write_index(entries: List[FaiEntry], index_path: str):
+    with open(index_path, "w") as handle:
+        for entry in entries:
+            handle.write("\t".join(str(value) for value in entry) + "\n")
+
+
+def read_index(index_path: str) -> List[FaiEntry]:
+    entries = []
+    with open(index_path, "r") as handle:
+        for line in handle:
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) < 5:
+                continue
+            entries.append(FaiEntry(fields[0], *(int(value) for value in fields[1:5])))
+    return entries
+
+
+def load_index(path: str) -> List[FaiEntry]:
+    """
+    Return the index of a FASTA file, reusing <path>.fai when it is newer
+    than the FASTA and rebuilding (and saving) it otherwise.
+    """
+    index_path = path + ".fai"
+    if os.path.exists(index_path) and os.path.getmtime(index_path) >= os.path.getmtime(path):
+        return read_index(index_path)
+    entries = build_index(path)
+    try:
+        write_index(entries, index_path)
+    except OSError:
+        pass
+    return entries
+
+
+class IndexedSequence:
+    """
+    Read-only view of one record. Supports len(), integer indexing and
+    slicing like a str; every access decodes only the bytes it covers.
+    """
+
+    def __init__(self, data, entry: FaiEntry):
+        self._data = data
+        self.entry = entry
+        self.name = entry.name
+
+    def __len__(self) -> int:
+        return self.entry.length
+
+    def _byte_offset(self, position: int) -> int:
+        entry = self.entry
+        line, column = divmod(position, entry.line_bases)
+        return entry.offset + line * entry.line_width + column
+
+    def fetch(self, start: int, end: int) -> str:
+        """Return bases [start, end) of the record as a str."""
+        start = max(0, start)
+        end = min(self.entry.length, end)
+        if start >= end:
+            return ""
+        raw = self._data[self._byte_offset(start):self._byte_offset(end - 1) + 1]
+        return raw.replace(b"\n", b"").replace(b"\r", b"").decode("ascii")
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.entry.length)
+            if step == 1:
+                return self.fetch(start, stop)
+            if step > 0:
+                return self.fetch(start, stop)[::step]
+            return self.fetch(stop + 1, start + 1)[::step]
+        if key < 0:
+            key += self.entry.length
+        if not 0 <= key < self.entry.length:
+            raise IndexError("sequence index out of range")
+        return self.fetch(key, key + 1)
+
+    def iter_chunks(self, chunk_size: int = 1 << 20, overlap: int = 0) -> Iterator[Tuple[int, str]]:
+        """
+        Yield (start, text) pieces covering the record. Consecutive pieces
+        share `overlap` bases so that a pattern of length overlap + 1 is
+        never split across two pieces.
+        """
+        for start in range(0, self.entry.length, chunk_size):
+            yield start, self.fetch(start, start + chunk_size + overlap)
+            if start + chunk_size + overlap >= self.entry.length:
+                break
+
+
+class IndexedFasta:
+    """
+    Memory-mapped FASTA file addressed through its .fai index.
+
+        with IndexedFasta("genome.fasta") as fasta:
+            chrom = fasta.first()
+            window = chrom[1_000_000:1_000_150]
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, FaiEntry] = {entry.name: entry for entry in load_index(path)}
+        self._handle = open(path, "rb")
+        if os.path.getsize(path) > 0:
+            self._data = mmap.mmap(self._handle.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._data = b""
+
+    def names(self) -> List[str]:
+        return list(self.entries)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.entries
+
+    def __getitem__(self, name: str) -> IndexedSequence:
+        return IndexedSequence(self._data, self.entries[name])
+
+    def first(self) -> IndexedSequence:
+        return self[next(iter(self.entries))]
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._handle.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def find_all(sequence, pattern: str, chunk_size: int = 1 << 20) -> List[int]:
+    """
+    Start positions of every (possibly overlapping) occurrence of pattern,
+    ignoring case (soft-masked lowercase bases match too). Works on a str
+    or on an IndexedSequence, which is scanned chunk by chunk.
+    """
+    if not pattern:
+        return []
+    pattern = pattern.upper()
+    if isinstance(sequence, str):
+        chunks = [(0, sequence)]
+        chunk_size = len(sequence) + 1
+    else:
+        chunks = sequence.iter_chunks(chunk_size, len(pattern) - 1)
+
+    positions = []
+    for chunk_start, text in chunks:
+        text = text.upper()
+        i = text.find(pattern)
+        while i != -1 and i < chunk_size:
+            positions.append(chunk_start + i)
+            i = text.find(pattern, i + 1)
+    return positions
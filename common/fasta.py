@@ -0,0 +1,53 @@
+"""
+Streaming FASTA reader shared by all labs.
+
+Records are yielded one at a time and each sequence is built with a single
+"".join over its lines, so reading is linear in the file size no matter how
+many lines or records the file has. Gzip and BGZF compressed files
+(.fa.gz) are recognised by their magic bytes and decompressed on the fly.
+"""
+
+from typing import Iterator, Tuple
+
+from common.compressed import open_lines
+
+
+def iter_fasta(path: str, workers: int = None) -> Iterator[Tuple[str, str]]:
+    """
+    Yield (header, sequence) for every record in a FASTA file.
+    The header is the text after '>' without the newline. Sequence lines
+    found before the first header are returned under an empty header.
+    workers sets the BGZF decompression pool size (1 disables it).
+    """
+    header = None
+    parts = []
+    for line in open_lines(path, workers):
+        if line.startswith(">"):
+            if header is not None or parts:
+                yield header or "", "".join(parts)
+            header = line[1:].strip()
+            parts = []
+            continue
+        line = line.strip()
+        if line and not line.startswith(";"):
+            parts.append(line)
+    if header is not None or parts:
+        yield header or "", "".join(parts)
+
+
+def read_first_record(path: str) -> Tuple[str, str]:
+    """Return (header, sequence) of the first record, or ("", "") if empty."""
+    records = iter_fasta(path)
+    for header, sequence in records:
+        records.close()
+        return header, sequence
+    return "", ""
+
+
+def read_fasta(path: str, workers: int = None) -> str:
+    """
+    Return the sequence of a FASTA file as one string.
+    For multi-record files the records are concatenated in file order,
+    which is what the original per-lab readers did.
+    """
+    return "".join(sequence for _, sequence in iter_fasta(path, workers))
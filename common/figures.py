@@ -0,0 +1,84 @@
+"""
+Headless figure output for the plotting code.
+
+Every plotting function ends with show_figure(name) instead of plt.show().
+Interactively that still opens a window. When FIGURES_DIR is set (in the
+environment or with set_figures_dir) matplotlib runs on the Agg backend and
+the figure is written to FIGURES_DIR/<name>.png and closed, so batch jobs
+never block on a GUI. render_figures draws many figures in worker
+processes.
+"""
+
+import os
+import re
+from typing import Callable, Iterable, List
+
+import matplotlib
+
+NON_INTERACTIVE = {"agg", "pdf", "ps", "svg", "cairo", "pgf", "template"}
+
+
+def figures_dir():
+    return os.environ.get("FIGURES_DIR") or None
+
+
+if figures_dir():
+    matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt  # noqa: E402  (backend must be chosen first)
+
+from common.batch import run_batch  # noqa: E402
+
+
+def set_figures_dir(path: str):
+    """Switch to the Agg backend and save all further figures under path."""
+    os.makedirs(path, exist_ok=True)
+    os.environ["FIGURES_DIR"] = os.path.abspath(path)
+    plt.switch_backend("Agg")
+
+
+def headless() -> bool:
+    return figures_dir() is not None or matplotlib.get_backend().lower() in NON_INTERACTIVE
+
+
+def figure_path(name: str) -> str:
+    directory = figures_dir()
+    os.makedirs(directory, exist_ok=True)
+    safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", name).strip("_")
+    return os.path.join(directory, safe_name + ".png")
+
+
+def show_figure(name: str = None, fig=None, dpi: int = 150):
+    """
+    Show the figure, or in headless mode save it as <name>.png (when a
+    name is given) and close it. Returns the saved path or None.
+    """
+    fig = fig or plt.gcf()
+    if not headless():
+        plt.show()
+        return None
+    path = None
+    if name and figures_dir():
+        path = figure_path(name)
+        fig.savefig(path, dpi=dpi)
+    plt.close(fig)
+    return path
+
+
+def _render_job(job):
+    func, args = job
+    plt.switch_backend("Agg")
+    func(*args)
+    plt.close("all")
+
+
+def render_figures(func: Callable, argument_tuples: Iterable[tuple], workers: int = None) -> None:
+    """
+    Call func(*args) for every argument tuple on a process pool. func must
+    be a module-level plotting function that ends with show_figure(name);
+    FIGURES_DIR has to be set so the workers save instead of showing.
+    """
+    if not figures_dir():
+        raise ValueError("render_figures needs FIGURES_DIR (see set_figures_dir)")
+    jobs: List[tuple] = [(func, tuple(args)) for args in argument_tuples]
+    run_batch(_render_job, jobs, workers)
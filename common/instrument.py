@@ -0,0 +1,173 @@
+"""
+Per-stage timing, counters and memory peaks for the analysis functions.
+
+Analysis code wraps its phases in `with stage("name", bases=n):` and bumps
+counters with count("name"). Nothing is recorded unless instrumentation
+is enabled, either with PROFILE_STAGES=1 in the environment, --profile on
+the command line of a lab script, or enable() from code; disabled stages
+cost one function call.
+
+When enabled, tracemalloc runs as well (unless PROFILE_STAGES=time) and
+every stage reports its wall time, bases per second, peak traced memory
+and net allocated bytes. The report is printed to stderr at exit, and
+written as JSON to PROFILE_REPORT if that is set.
+
+Stages recorded inside worker processes would stay in those processes,
+so while instrumentation is enabled common.batch runs every job in this
+process instead of on a pool.
+"""
+
+import atexit
+import functools
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+_enabled = False
+_trace_memory = False
+_stages = {}
+_counters = {}
+_stack = []
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def enable(trace_memory: bool = True):
+    global _enabled, _trace_memory
+    if _enabled:
+        return
+    _enabled = True
+    _trace_memory = trace_memory
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    atexit.register(_report_at_exit)
+
+
+def enable_from_argv(argv=None) -> bool:
+    """Enable when --profile is on the command line (and remove it)."""
+    argv = sys.argv if argv is None else argv
+    if "--profile" in argv:
+        argv.remove("--profile")
+        enable()
+    return _enabled
+
+
+def reset():
+    _stages.clear()
+    _counters.clear()
+
+
+def count(name: str, n: int = 1):
+    if _enabled:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+@contextmanager
+def _timed_stage(name: str, bases: int):
+    frame = {"child_peak": 0}
+    if _trace_memory:
+        current, peak = tracemalloc.get_traced_memory()
+        if _stack:
+            _stack[-1]["child_peak"] = max(_stack[-1]["child_peak"], peak)
+        tracemalloc.reset_peak()
+        frame["start_bytes"] = current
+    _stack.append(frame)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        _stack.pop()
+        record = _stages.setdefault(name, {"calls": 0, "seconds": 0.0, "bases": 0,
+                                           "peak_bytes": 0, "net_bytes": 0})
+        record["calls"] += 1
+        record["seconds"] += seconds
+        record["bases"] += bases
+        if _trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            peak = max(peak, frame["child_peak"])
+            record["peak_bytes"] = max(record["peak_bytes"], peak - frame["start_bytes"])
+            record["net_bytes"] += current - frame["start_bytes"]
+            if _stack:
+                _stack[-1]["child_peak"] = max(_stack[-1]["child_peak"], peak)
+
+
+def stage(name: str, bases: int = 0):
+    """Context manager timing one stage; bases is the input size it covers."""
+    if not _enabled:
+        return nullcontext()
+    return _timed_stage(name, bases)
+
+
+def timed(name: str, sequence_arg: int = 0):
+    """
+    Decorator form of stage(). The length of positional argument
+    sequence_arg is reported as the stage's bases (None to report none).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            bases = 0
+            if sequence_arg is not None and len(args) > sequence_arg:
+                bases = len(args[sequence_arg])
+            with _timed_stage(name, bases):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def report() -> dict:
+    stages = {}
+    for name, record in _stages.items():
+        entry = dict(record)
+        entry["bases_per_second"] = (record["bases"] / record["seconds"]
+                                     if record["bases"] and record["seconds"] > 0 else None)
+        if not _trace_memory:
+            entry.pop("peak_bytes")
+            entry.pop("net_bytes")
+        stages[name] = entry
+    return {"stages": stages, "counters": dict(_counters)}
+
+
+def format_report(data: dict = None) -> str:
+    data = data or report()
+    lines = ["=" * 86,
+             f"{'Stage':28} {'calls':>6} {'seconds':>10} {'Mb/s':>9} {'peak MB':>10} {'net MB':>10}",
+             "-" * 86]
+    for name, entry in data["stages"].items():
+        rate = entry["bases_per_second"]
+        rate_text = f"{rate / 1e6:9.2f}" if rate else f"{'-':>9}"
+        peak = entry.get("peak_bytes")
+        net = entry.get("net_bytes")
+        peak_text = f"{peak / 1e6:10.2f}" if peak is not None else f"{'-':>10}"
+        net_text = f"{net / 1e6:10.2f}" if net is not None else f"{'-':>10}"
+        lines.append(f"{name:28} {entry['calls']:>6} {entry['seconds']:>10.3f} "
+                     f"{rate_text} {peak_text} {net_text}")
+    if data["counters"]:
+        lines.append("-" * 86)
+        for name, value in data["counters"].items():
+            lines.append(f"{name:28} {value:>6}")
+    lines.append("=" * 86)
+    return "\n".join(lines)
+
+
+def _report_at_exit():
+    if not _stages and not _counters:
+        return
+    data = report()
+    print(format_report(data), file=sys.stderr)
+    path = os.environ.get("PROFILE_REPORT")
+    if path:
+        with open(path, "w") as handle:
+            json.dump(data, handle, indent=1)
+
+
+if os.environ.get("PROFILE_STAGES") in ("1", "time"):
+    enable(trace_memory=os.environ.get("PROFILE_STAGES") != "time")
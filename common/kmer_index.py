@@ -0,0 +1,197 @@
+"""
+Persistent, memory-mapped k-mer count index of a genome.
+
+An index is the sorted array of the distinct k-mer codes of a genome (see
+common.kmers for the encoding) and a parallel array of their counts,
+written to one file:
+
+    MAGIC | u64 meta length | JSON meta | pad to 8 | codes | pad | counts
+
+Loading mmaps the file, so opening an index is instant and lookups touch
+only the pages they need. Point lookups are binary searches; intersections,
+unions and top-N work on the sorted arrays without going back to the
+sequence.
+
+index_for_fasta keeps one index per (genome, k, options) next to the
+sequence cache (common.cache), keyed by the FASTA's content digest.
+"""
+
+import json
+import mmap
+import os
+import struct
+import tempfile
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from common.cache import cache_dir, cached_records, evict, max_cache_bytes, source_digest
+from common.kmers import (_as_collection, _code_dtype, count_kmers_sparse, kmer_code, kmer_string,
+                          reduce_counts, window_codes)
+from common.topn import top_codes
+
+MAGIC = b"KMERIDX1\n"
+
+
+class KmerIndex:
+    """Sorted k-mer codes and their counts, optionally backed by a file."""
+
+    def __init__(self, codes: np.ndarray, counts: np.ndarray, k: int,
+                 canonical: bool = False, step: int = 1, meta: dict = None):
+        self.codes = codes
+        self.counts = counts
+        self.k = k
+        self.canonical = canonical
+        self.step = step
+        self.meta = meta or {}
+
+    @classmethod
+    def build(cls, sequences, k: int, canonical: bool = False, step: int = 1,
+              workers: int = 1) -> "KmerIndex":
+        """
+        Count the k-mers of one sequence or a collection of records.
+        step=3 counts only the windows at 0, 3, 6, ... of each record
+        (codons in frame 0).
+        """
+        if step == 1:
+            codes, counts = count_kmers_sparse(sequences, k, canonical=canonical, workers=workers)
+        else:
+            tables = []
+            for sequence in _as_collection(sequences):
+                window, valid = window_codes(sequence, k, canonical)
+                tables.append(window[::step][valid[::step]])
+            codes, counts = reduce_counts(np.concatenate(tables) if tables
+                                          else np.zeros(0, dtype=_code_dtype(k)))
+        return cls(codes, counts, k, canonical, step)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @property
+    def total(self) -> int:
+        return int(self.counts.sum())
+
+    def _code(self, kmer) -> int:
+        return kmer_code(kmer.replace("U", "T")) if isinstance(kmer, str) else int(kmer)
+
+    def lookup(self, codes: np.ndarray) -> np.ndarray:
+        """Counts of an array of codes (0 for absent ones)."""
+        codes = np.asarray(codes, dtype=self.codes.dtype)
+        if len(self.codes) == 0:
+            return np.zeros(len(codes), dtype=np.int64)
+        where = np.minimum(np.searchsorted(self.codes, codes), len(self.codes) - 1)
+        return np.where(self.codes[where] == codes, self.counts[where], 0)
+
+    def get(self, kmer, default: int = 0) -> int:
+        """Count of a k-mer given as a string or a code."""
+        code = self._code(kmer)
+        where = int(np.searchsorted(self.codes, code))
+        if where < len(self.codes) and int(self.codes[where]) == code:
+            return int(self.counts[where])
+        return default
+
+    def __getitem__(self, kmer) -> int:
+        return self.get(kmer)
+
+    def __contains__(self, kmer) -> bool:
+        return self.get(kmer, None) is not None
+
+    def kmers(self) -> List[str]:
+        return [kmer_string(code, self.k) for code in self.codes.tolist()]
+
+    def to_dict(self) -> Dict[str, int]:
+        return dict(zip(self.kmers(), self.counts.tolist()))
+
+    def top(self, n: int) -> List[Tuple[str, int]]:
+        """The n most frequent k-mers with their counts, ties by code."""
+        codes, counts = top_codes(self.codes, self.counts, n)
+        return [(kmer_string(code, self.k), count) for code, count in zip(codes.tolist(), counts.tolist())]
+
+    def _check_compatible(self, other: "KmerIndex"):
+        if (self.k, self.canonical, self.step) != (other.k, other.canonical, other.step):
+            raise ValueError("indexes were built with different k, canonical or step")
+
+    def intersect(self, other: "KmerIndex") -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(codes present in both, counts here, counts in other)."""
+        self._check_compatible(other)
+        codes, mine, theirs = np.intersect1d(self.codes, other.codes, assume_unique=True,
+                                             return_indices=True)
+        return codes, self.counts[mine], other.counts[theirs]
+
+    def union(self, other: "KmerIndex") -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(codes present in either, counts here, counts in other; 0 if absent)."""
+        self._check_compatible(other)
+        codes = np.union1d(self.codes, other.codes)
+        return codes, self.lookup(codes), other.lookup(codes)
+
+    def save(self, path: str):
+        meta = dict(self.meta, k=self.k, canonical=self.canonical, step=self.step,
+                    distinct=len(self.codes), code_dtype=self.codes.dtype.str)
+        meta_bytes = json.dumps(meta).encode()
+        preamble = MAGIC + struct.pack("<Q", len(meta_bytes)) + meta_bytes
+        preamble += b"\0" * (-len(preamble) % 8)
+        codes = self.codes.tobytes()
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(preamble)
+            handle.write(codes + b"\0" * (-len(codes) % 8))
+            handle.write(self.counts.astype(np.int64).tobytes())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "KmerIndex":
+        """mmap an index file; the arrays share its pages."""
+        with open(path, "rb") as handle:
+            data = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path}: not a k-mer index file")
+        (meta_length,) = struct.unpack("<Q", data[len(MAGIC):len(MAGIC) + 8])
+        meta_start = len(MAGIC) + 8
+        meta = json.loads(data[meta_start:meta_start + meta_length])
+        base = meta_start + meta_length
+        base += -base % 8
+        distinct = meta["distinct"]
+        codes = np.frombuffer(data, dtype=np.dtype(meta["code_dtype"]), count=distinct, offset=base)
+        base += codes.nbytes + (-codes.nbytes % 8)
+        counts = np.frombuffer(data, dtype=np.int64, count=distinct, offset=base)
+        return cls(codes, counts, meta["k"], meta["canonical"], meta["step"], meta)
+
+
+def index_for_fasta(path: str, k: int, canonical: bool = False, step: int = 1,
+                    workers: int = 1) -> KmerIndex:
+    """
+    The k-mer index of a FASTA file (records counted separately), loaded
+    from the cache directory when it was built before and rebuilt when the
+    file's content changed.
+    """
+    if os.environ.get("SEQ_CACHE_DISABLE") == "1":
+        return _build_for_fasta(path, k, canonical, step, workers)
+
+    directory = cache_dir()
+    try:
+        os.makedirs(directory, exist_ok=True)
+        name = f"{source_digest(path, directory)}.k{k}{'c' if canonical else ''}s{step}.kidx"
+        index_path = os.path.join(directory, name)
+        if os.path.exists(index_path):
+            os.utime(index_path)
+            return KmerIndex.load(index_path)
+    except (OSError, ValueError):
+        # unusable cache directory: build in memory, as cached_records does
+        return _build_for_fasta(path, k, canonical, step, workers)
+
+    index = _build_for_fasta(path, k, canonical, step, workers)
+    index.meta["source"] = os.path.abspath(path)
+    try:
+        index.save(index_path)
+        evict(directory, max_cache_bytes(), keep=index_path)
+    except OSError:
+        pass
+    return index
+
+
+def _build_for_fasta(path: str, k: int, canonical: bool, step: int, workers: int) -> KmerIndex:
+    records = [packed for _, packed in cached_records(path)]
+    index = KmerIndex.build(records, k, canonical, step, workers)
+    index.meta["bases"] = sum(len(packed) for packed in records)
+    return index
@@ -0,0 +1,371 @@
+"""
+Single-pass k-mer counting on integer codes.
+
+Every base becomes a 2-bit code (A=0, C=1, G=2, T=3) and every k-mer the
+integer formed by its k codes, most significant first, so "ACG" is
+0b000110 = 6. The codes of all windows are built with the rolling update
+code = (code << 2) | next_base applied to whole arrays at once, and the
+counts come out of one np.bincount. Windows containing a non-ACGT base are
+not counted.
+
+Dense count arrays have 4**k entries, so they are limited to
+k <= MAX_DENSE_K (16.7 million bins at k = 12). Larger k, up to 31 with
+64-bit codes, go through count_kmers_sparse: sort-and-count tables of
+(code, count) that are merged chunk by chunk and, past a memory budget,
+spilled to disk in code-range partitions and merged one partition at a
+time. Canonical counting folds each k-mer with its reverse complement
+onto the smaller of the two codes.
+
+Every counter takes a workers argument. Chunks overlap by k - 1 bases and
+each window belongs to the chunk it starts in, so with workers > 1 the
+chunks are counted in worker processes and their tables merged without
+losing or double-counting the k-mers that cross a chunk boundary.
+
+Environment variables:
+    KMER_MEMORY_BYTES  memory budget of count_kmers_sparse (default 512 MB)
+"""
+
+import os
+import tempfile
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+from common.batch import iter_batch
+from common.packed import PackedSequence, as_codes
+
+BASES = "ACGT"
+MAX_DENSE_K = 12
+MAX_K = 31
+CHUNK = 1 << 24
+PARALLEL_CHUNK = 1 << 22
+
+
+def _check_k(k: int, limit: int = MAX_DENSE_K):
+    if not 1 <= k <= limit:
+        raise ValueError(f"k must be between 1 and {limit}, got {k}")
+
+
+def _code_dtype(k: int):
+    return np.uint32 if k <= 16 else np.uint64
+
+
+def window_codes(sequence, k: int, canonical: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (codes, valid) for the len(sequence) - k + 1 windows of the sequence,
+    in order. codes[i] is meaningless where valid[i] is False. With
+    canonical=True each code is the smaller of the k-mer and its reverse
+    complement.
+    """
+    _check_k(k, MAX_K)
+    bases = as_codes(sequence)
+    n = len(bases) - k + 1
+    dtype = _code_dtype(k)
+    if n <= 0:
+        return np.zeros(0, dtype=dtype), np.zeros(0, dtype=bool)
+
+    invalid = bases == 255
+    bases = (bases & 3).astype(dtype)
+    two = dtype(2)
+    codes = np.zeros(n, dtype=dtype)
+    for offset in range(k):
+        codes <<= two
+        codes |= bases[offset:offset + n]
+    if canonical:
+        # reverse complement: complemented bases (3 - b) read right to left
+        reverse = np.zeros(n, dtype=dtype)
+        for offset in range(k - 1, -1, -1):
+            reverse <<= two
+            reverse |= dtype(3) - bases[offset:offset + n]
+        np.minimum(codes, reverse, out=codes)
+
+    # a window is valid when no invalid base falls inside it
+    invalid_before = np.concatenate(([0], np.cumsum(invalid, dtype=np.int64)))
+    valid = invalid_before[k:] == invalid_before[:n]
+    return codes, valid
+
+
+def kmer_codes(sequence, k: int, canonical: bool = False) -> np.ndarray:
+    """Codes of the valid windows only."""
+    codes, valid = window_codes(sequence, k, canonical)
+    return codes if valid.all() else codes[valid]
+
+
+def _chunks(sequence, k: int, chunk_size: int):
+    """Pieces holding the windows starting in [start, start + chunk_size)."""
+    for start in range(0, max(1, len(sequence) - k + 1), chunk_size):
+        yield sequence[start:start + chunk_size + k - 1]
+
+
+def _chunk_size(chunk_size: int, workers: int) -> int:
+    if chunk_size is None:
+        return PARALLEL_CHUNK if workers > 1 else CHUNK
+    return chunk_size
+
+
+def _count_chunk(job) -> Tuple[np.ndarray, np.ndarray]:
+    piece, k, canonical = job
+    return reduce_counts(kmer_codes(piece, k, canonical))
+
+
+def count_kmers(sequence, k: int, chunk_size: int = None, workers: int = 1) -> np.ndarray:
+    """
+    Counts of all 4**k k-mers (index = k-mer code). Long sequences are
+    encoded chunk by chunk, consecutive chunks sharing k - 1 bases.
+    """
+    _check_k(k)
+    counts = np.zeros(4 ** k, dtype=np.int64)
+    if workers <= 1:
+        for piece in _chunks(sequence, k, _chunk_size(chunk_size, workers)):
+            counts += np.bincount(kmer_codes(piece, k), minlength=4 ** k)
+        return counts
+    jobs = ((piece, k, False) for piece in _chunks(sequence, k, _chunk_size(chunk_size, workers)))
+    for codes, chunk_counts in iter_batch(_count_chunk, jobs, workers):
+        counts[codes] += chunk_counts
+    return counts
+
+
+def kmer_string(code: int, k: int) -> str:
+    return "".join(BASES[(code >> (2 * (k - 1 - i))) & 3] for i in range(k))
+
+
+def kmer_code(kmer: str) -> int:
+    code = 0
+    for base in kmer.upper():
+        code = (code << 2) | BASES.index(base)
+    return code
+
+
+def all_kmers(k: int) -> List[str]:
+    """The 4**k k-mers in code order (AA, AC, AG, ... for k = 2)."""
+    return [kmer_string(code, k) for code in range(4 ** k)]
+
+
+def kmer_counts(sequence, k: int, canonical: bool = False, workers: int = 1) -> Dict[str, int]:
+    """
+    {k-mer: count} for the k-mers that occur, in code order. Uses the dense
+    table up to MAX_DENSE_K and count_kmers_sparse above it.
+    """
+    if k > MAX_DENSE_K or canonical:
+        codes, counts = count_kmers_sparse(sequence, k, canonical=canonical, workers=workers)
+        return {kmer_string(int(code), k): int(n) for code, n in zip(codes.tolist(), counts.tolist())}
+    counts = count_kmers(sequence, k, workers=workers)
+    return {kmer_string(int(code), k): int(counts[code]) for code in np.flatnonzero(counts)}
+
+
+def _count_chunk_multi(job):
+    """Sparse tables of one chunk: kmax windows, and shorter windows they miss."""
+    piece, ks = job
+    kmax = ks[-1]
+    codes, valid = window_codes(piece, kmax)
+    longest = reduce_counts(codes[valid])
+    missed = {}
+    if not valid.all():
+        invalid_before = np.concatenate(([0], np.cumsum(as_codes(piece) == 255, dtype=np.int64)))
+        for k in ks[:-1]:
+            short_valid = invalid_before[k:k + len(codes)] == invalid_before[:len(codes)]
+            missed[k] = reduce_counts(codes[short_valid & ~valid] >> (2 * (kmax - k)))
+    return longest, missed
+
+
+def count_kmers_multi(sequence, ks: Iterable[int], chunk_size: int = None,
+                      workers: int = 1) -> Dict[int, np.ndarray]:
+    """
+    Dense counts for several k from one traversal: {k: counts of 4**k}.
+    Only the largest k is encoded and counted; a shorter k-mer is the
+    prefix of the longer one starting at the same position, so its counts
+    are sums over blocks of the long table. Windows the long table misses
+    (the last kmax - k positions, and short windows next to an N that the
+    long window at the same position contains) are added back directly.
+    """
+    ks = sorted(set(ks))
+    if not ks:
+        return {}
+    kmax = ks[-1]
+    _check_k(ks[0])
+    _check_k(kmax)
+    n = len(sequence)
+    longest = np.zeros(4 ** kmax, dtype=np.int64)
+    missed = {k: np.zeros(4 ** k, dtype=np.int64) for k in ks[:-1]}
+
+    jobs = ((piece, ks) for piece in _chunks(sequence, kmax, _chunk_size(chunk_size, workers))
+            if len(piece) >= kmax)
+    for (codes, chunk_counts), chunk_missed in iter_batch(_count_chunk_multi, jobs, workers):
+        longest[codes] += chunk_counts
+        for k, (lost, lost_counts) in chunk_missed.items():
+            missed[k][lost] += lost_counts
+
+    tail = sequence[max(0, n - kmax + 1):]
+    counts = {kmax: longest}
+    for k in ks[:-1]:
+        derived = longest.reshape(4 ** k, -1).sum(axis=1)
+        counts[k] = derived + missed[k] + np.bincount(kmer_codes(tail, k), minlength=4 ** k)
+    return counts
+
+
+def multi_kmer_counts(sequence, ks: Iterable[int], workers: int = 1) -> Dict[int, Dict[str, int]]:
+    """{k: {k-mer: count}} for every k, sharing one scan for k <= MAX_DENSE_K."""
+    ks = sorted(set(ks))
+    dense = [k for k in ks if k <= MAX_DENSE_K]
+    result = {}
+    for k, counts in count_kmers_multi(sequence, dense, workers=workers).items():
+        result[k] = {kmer_string(int(code), k): int(counts[code]) for code in np.flatnonzero(counts)}
+    for k in ks:
+        if k not in result:
+            result[k] = kmer_counts(sequence, k, workers=workers)
+    return {k: result[k] for k in ks}
+
+
+
+def kmer_tables(sequence, ks: Iterable[int], canonical: bool = False,
+                workers: int = 1) -> Dict[int, Iterable[Tuple[np.ndarray, np.ndarray]]]:
+    """
+    {k: (codes, counts) tables} for every k, without building strings:
+    one shared dense scan for k <= MAX_DENSE_K, and the (possibly spilled)
+    partitions of iter_kmers_sparse, counted lazily, above it.
+    """
+    ks = sorted(set(ks))
+    dense = [] if canonical else [k for k in ks if k <= MAX_DENSE_K]
+    result = {}
+    for k, counts in count_kmers_multi(sequence, dense, workers=workers).items():
+        codes = np.flatnonzero(counts)
+        result[k] = [(codes, counts[codes])]
+    for k in ks:
+        if k not in result:
+            result[k] = iter_kmers_sparse(sequence, k, canonical=canonical, workers=workers)
+    return {k: result[k] for k in ks}
+
+def canonical_kmer(kmer: str) -> str:
+    """The smaller (in code order) of kmer and its reverse complement."""
+    kmer = kmer.upper()
+    reverse = kmer[::-1].translate(str.maketrans("ACGT", "TGCA"))
+    return min(kmer, reverse)
+
+
+def memory_budget() -> int:
+    return int(os.environ.get("KMER_MEMORY_BYTES", 512 * 1024 ** 2))
+
+
+def reduce_counts(codes: np.ndarray, counts: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Sort-and-count: (unique codes ascending, summed counts)."""
+    if counts is None:
+        unique, totals = np.unique(codes, return_counts=True)
+        return unique, totals.astype(np.int64)
+    if len(codes) == 0:
+        return codes, counts.astype(np.int64)
+    order = np.argsort(codes, kind="stable")
+    codes = codes[order]
+    counts = counts[order]
+    starts = np.flatnonzero(np.concatenate(([True], codes[1:] != codes[:-1])))
+    return codes[starts], np.add.reduceat(counts, starts).astype(np.int64)
+
+
+class _SpillFiles:
+    """Code-range partitions of (code, count) pairs appended to disk."""
+
+    def __init__(self, directory: str, k: int, partitions: int):
+        self.directory = directory
+        self.dtype = _code_dtype(k)
+        # partition p holds codes in [bounds[p], bounds[p + 1])
+        self.bounds = [(4 ** k * p) // partitions for p in range(partitions + 1)]
+        self.partitions = partitions
+
+    def _paths(self, p: int) -> Tuple[str, str]:
+        return (os.path.join(self.directory, f"part{p:04d}.codes"),
+                os.path.join(self.directory, f"part{p:04d}.counts"))
+
+    def append(self, codes: np.ndarray, counts: np.ndarray):
+        cuts = np.searchsorted(codes, np.array(self.bounds[1:-1], dtype=self.dtype))
+        for p, (lo, hi) in enumerate(zip(np.concatenate(([0], cuts)),
+                                         np.concatenate((cuts, [len(codes)])))):
+            if hi > lo:
+                code_path, count_path = self._paths(p)
+                with open(code_path, "ab") as handle:
+                    codes[lo:hi].tofile(handle)
+                with open(count_path, "ab") as handle:
+                    counts[lo:hi].tofile(handle)
+
+    def merged(self) -> Iterable[Tuple[np.ndarray, np.ndarray]]:
+        for p in range(self.partitions):
+            code_path, count_path = self._paths(p)
+            if os.path.exists(code_path):
+                yield reduce_counts(np.fromfile(code_path, dtype=self.dtype),
+                                    np.fromfile(count_path, dtype=np.int64))
+
+
+def _as_collection(sequences) -> Iterable:
+    if isinstance(sequences, (str, bytes, PackedSequence)) or hasattr(sequences, "iter_chunks"):
+        return [sequences]
+    return sequences
+
+
+def iter_kmers_sparse(sequences, k: int, canonical: bool = True,
+                      memory_bytes: int = None, chunk_size: int = None,
+                      spill_dir: str = None, partitions: int = 64,
+                      workers: int = 1) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Count k-mers (k <= 31) over one sequence or an iterable of sequences and
+    yield (codes, counts) tables covering disjoint, ascending code ranges.
+    Tables are kept in memory up to memory_bytes (see memory_budget()) and
+    come out as one table; beyond that they are spilled to partition files
+    in a temporary directory under spill_dir and yielded partition by
+    partition, so only one partition is in memory at a time.
+    """
+    _check_k(k, MAX_K)
+    budget = memory_budget() if memory_bytes is None else memory_bytes
+    pending = []
+    pending_bytes = 0
+    spill = None
+    temporary = None
+
+    chunk_size = _chunk_size(chunk_size, workers)
+    jobs = ((piece, k, canonical) for sequence in _as_collection(sequences)
+            for piece in _chunks(sequence, k, chunk_size))
+
+    try:
+        for table in iter_batch(_count_chunk, jobs, workers):
+            pending.append(table)
+            pending_bytes += table[0].nbytes + table[1].nbytes
+            if pending_bytes <= budget:
+                continue
+            merged = reduce_counts(np.concatenate([c for c, _ in pending]),
+                                   np.concatenate([n for _, n in pending]))
+            pending = [merged]
+            pending_bytes = merged[0].nbytes + merged[1].nbytes
+            if pending_bytes > budget // 2:
+                if spill is None:
+                    temporary = tempfile.TemporaryDirectory(prefix="kmers-", dir=spill_dir)
+                    spill = _SpillFiles(temporary.name, k, partitions)
+                spill.append(*merged)
+                pending = []
+                pending_bytes = 0
+
+        if pending:
+            merged = reduce_counts(np.concatenate([c for c, _ in pending]),
+                                   np.concatenate([n for _, n in pending]))
+        else:
+            merged = (np.zeros(0, dtype=_code_dtype(k)), np.zeros(0, dtype=np.int64))
+        if spill is None:
+            yield merged
+            return
+        spill.append(*merged)
+        yield from spill.merged()
+    finally:
+        if temporary is not None:
+            temporary.cleanup()
+
+
+def count_kmers_sparse(sequences, k: int, canonical: bool = True,
+                       memory_bytes: int = None, chunk_size: int = None,
+                       spill_dir: str = None, partitions: int = 64,
+                       workers: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    The whole (codes, counts) table of iter_kmers_sparse, distinct codes in
+    ascending order. The result has to fit in memory even when counting
+    spilled to disk; use iter_kmers_sparse to go partition by partition.
+    """
+    parts = list(iter_kmers_sparse(sequences, k, canonical, memory_bytes, chunk_size,
+                                   spill_dir, partitions, workers))
+    if len(parts) == 1:
+        return parts[0]
+    return np.concatenate([c for c, _ in parts]), np.concatenate([n for _, n in parts])
@@ -0,0 +1,110 @@
+"""
+Melting-temperature tracks of sliding windows.
+
+The composition formulas only need the base counts of each window, which
+come from the prefix sums of common.composition:
+
+    wallace_tm          4 (G + C) + 2 (A + T)
+    salt_adjusted_tm    81.5 + 16.6 log10([Na+]) + 0.41 %GC - 600 / N
+
+The nearest-neighbour model (SantaLucia 1998, unified parameters) sums an
+enthalpy and an entropy for every dinucleotide step of the window. Those
+parameters have one decimal, so they are stored as integers of tenths and
+summed into exact int64 prefix sums once per sequence. A window's totals
+are then two subtractions, plus the initiation terms of its two end bases
+and a salt correction:
+
+    Tm = 1000 dH / (dS + 0.368 (N - 1) ln[Na+] + R ln(C / 4)) - 273.15
+
+with C the total strand concentration and the duplex assumed not
+self-complementary. Windows containing a non-ACGT base get NaN.
+"""
+
+import math
+
+import numpy as np
+
+from common.composition import Composition
+from common.packed import as_codes
+
+GAS_CONSTANT = 1.987  # cal / (K mol)
+
+# (dH kcal/mol, dS cal/(K mol)) of the 5'-XY-3' step; XY and its reverse
+# complement share parameters
+NN_PARAMETERS = {
+    "AA": (-7.9, -22.2), "TT": (-7.9, -22.2),
+    "AT": (-7.2, -20.4), "TA": (-7.2, -21.3),
+    "CA": (-8.5, -22.7), "TG": (-8.5, -22.7),
+    "GT": (-8.4, -22.4), "AC": (-8.4, -22.4),
+    "CT": (-7.8, -21.0), "AG": (-7.8, -21.0),
+    "GA": (-8.2, -22.2), "TC": (-8.2, -22.2),
+    "CG": (-10.6, -27.2), "GC": (-9.8, -24.4),
+    "GG": (-8.0, -19.9), "CC": (-8.0, -19.9),
+}
+# initiation with a terminal G.C or A.T pair, applied at each end
+INIT_GC = (0.1, -2.8)
+INIT_AT = (2.3, 4.1)
+
+
+def _step_tables():
+    enthalpy = np.zeros(16, dtype=np.int64)
+    entropy = np.zeros(16, dtype=np.int64)
+    for step, (dh, ds) in NN_PARAMETERS.items():
+        code = "ACGT".index(step[0]) * 4 + "ACGT".index(step[1])
+        enthalpy[code], entropy[code] = round(dh * 10), round(ds * 10)
+    return enthalpy, entropy
+
+
+_STEP_ENTHALPY, _STEP_ENTROPY = _step_tables()
+# by base code: A and T end in an A.T pair, C and G in a G.C pair
+_END_ENTHALPY = np.array([INIT_AT[0], INIT_GC[0], INIT_GC[0], INIT_AT[0]])
+_END_ENTROPY = np.array([INIT_AT[1], INIT_GC[1], INIT_GC[1], INIT_AT[1]])
+
+
+def wallace_tm(composition: Composition, window_size: int, step: int = 1) -> np.ndarray:
+    """Wallace rule Tm of every window."""
+    counts = composition.counts(window_size, step)
+    return 4.0 * (counts[:, 1] + counts[:, 2]) + 2.0 * (counts[:, 0] + counts[:, 3])
+
+
+def salt_adjusted_tm(composition: Composition, window_size: int, step: int = 1,
+                     na: float = 0.001) -> np.ndarray:
+    """GC-content (Marmur-Doty style, salt adjusted) Tm of every window."""
+    counts = composition.counts(window_size, step)
+    gc_percent = (counts[:, 1] + counts[:, 2]) / window_size * 100
+    return 81.5 + 16.6 * math.log10(na) + 0.41 * gc_percent - 600 / window_size
+
+
+class NearestNeighborTm:
+    """Prefix sums of the nearest-neighbour enthalpy and entropy of one sequence."""
+
+    def __init__(self, sequence):
+        codes = as_codes(sequence)
+        self.codes = codes
+        valid = codes != 255
+        steps = (codes[:-1] & 3).astype(np.intp) * 4 + (codes[1:] & 3)
+        step_valid = valid[:-1] & valid[1:]
+        self.enthalpy = np.concatenate(([0], np.cumsum(np.where(step_valid, _STEP_ENTHALPY[steps], 0))))
+        self.entropy = np.concatenate(([0], np.cumsum(np.where(step_valid, _STEP_ENTROPY[steps], 0))))
+        self.invalid = np.concatenate(([0], np.cumsum(~valid, dtype=np.int64)))
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def tm(self, window_size: int, step: int = 1, na: float = 0.05,
+           strand_concentration: float = 250e-9) -> np.ndarray:
+        """Tm in degrees C of every window of window_size (>= 2) bases."""
+        if window_size < 2 or step < 1:
+            raise ValueError("window size must be at least 2 and step at least 1")
+        starts = np.arange(0, len(self) - window_size + 1, step)
+        ends = starts + window_size - 1
+        # the window's dinucleotide steps start at starts .. ends - 1
+        dh = (self.enthalpy[ends] - self.enthalpy[starts]) / 10.0
+        ds = (self.entropy[ends] - self.entropy[starts]) / 10.0
+        first, last = self.codes[starts] & 3, self.codes[ends] & 3
+        dh = dh + _END_ENTHALPY[first] + _END_ENTHALPY[last]
+        ds = ds + _END_ENTROPY[first] + _END_ENTROPY[last]
+        ds = ds + 0.368 * (window_size - 1) * math.log(na)
+        tm = dh * 1000 / (ds + GAS_CONSTANT * math.log(strand_concentration / 4)) - 273.15
+        valid = self.invalid[starts + window_size] == self.invalid[starts]
+        return np.where(valid, tm, np.nan)
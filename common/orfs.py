@@ -0,0 +1,161 @@
+"""
+Six-frame open reading frame (ORF) scanner.
+
+The codon code of every position is built once per chunk (common.codons)
+and mapped through boolean start and stop tables, so the positions of all
+start and stop codons of the six frames come out of one pass. Pairing them
+is then a matter of sorted arrays:
+
+    forward frames  an ORF runs from the first start after a stop to the
+                    next stop of the same frame
+    reverse frames  read right to left, so an ORF runs from the last start
+                    before a stop (in forward coordinates) back to the
+                    previous stop of the same frame
+
+Chunks start at multiples of 3 and overlap by 2 bases; the one start (or
+stop) of each frame that is still waiting for its partner is carried to
+the next chunk, so ORFs are found across chunk boundaries and whole
+genomes stream through in linear time and fixed memory. ORFs are yielded
+as dicts with 0-based start and inclusive end in forward coordinates,
+stop codon included, and their length in amino acids (without the stop).
+Forward ORFs that never reach a stop are not reported.
+
+    python -m common.orfs genome.fasta --min-length 100 --table 11 --starts ATG,GTG,TTG
+"""
+
+import argparse
+from typing import Dict, Iterator, Sequence
+
+import numpy as np
+
+from common.cache import cached_records
+from common.codons import (FRAMES, _REVERSE_COMPLEMENT_65, _codon_keys, base_codes, translate,
+                           translation_table)
+from common.kmers import CHUNK
+
+
+def _codon_table(codons: Sequence[str]) -> np.ndarray:
+    table = np.zeros(65, dtype=bool)
+    for codon in codons:
+        codes = base_codes(codon)
+        if len(codes) != 3 or (codes == 255).any():
+            raise ValueError(f"not a codon: {codon!r}")
+        table[int(codes[0]) << 4 | int(codes[1]) << 2 | int(codes[2])] = True
+    return table
+
+
+def _orf(start: int, end: int, frame: int) -> Dict:
+    return {"start": start, "end": end, "strand": "+" if frame < 3 else "-",
+            "frame": FRAMES[frame], "length": (end - start + 1) // 3 - 1}
+
+
+def iter_orfs(sequence, min_length: int = 100, table=1, starts: Sequence[str] = ("ATG",),
+              chunk_size: int = CHUNK) -> Iterator[Dict]:
+    """
+    Yield the ORFs of at least min_length amino acids in all six frames of
+    one sequence, each as soon as it is complete. For every stop codon only
+    the longest ORF (from the outermost start) is reported.
+    """
+    is_stop = translation_table(table) == ord("*")
+    is_start = _codon_table(starts)
+    is_stop[64] = is_start[64] = False
+    reverse_stop = is_stop[_REVERSE_COMPLEMENT_65]
+    reverse_start = is_start[_REVERSE_COMPLEMENT_65]
+
+    length = len(sequence)
+    open_start = [None] * 3                 # forward: first start after the last stop
+    last_stop = [None] * 3                  # reverse: last stop and the last start after it
+    last_start = [None] * 3
+    step = max(3, chunk_size - chunk_size % 3)
+    for offset in range(0, max(1, length - 2), step):
+        keys = _codon_keys(base_codes(sequence[offset:offset + step + 2]))
+        found = []
+        for strand, stop_table, start_table in ((0, is_stop, is_start), (1, reverse_stop, reverse_start)):
+            stop_positions = np.flatnonzero(stop_table[keys]) + offset
+            start_positions = np.flatnonzero(start_table[keys]) + offset
+            for phase in range(3):
+                stops = stop_positions[stop_positions % 3 == phase]
+                begins = start_positions[start_positions % 3 == phase]
+                if strand == 0:
+                    found.extend(_pair_forward(stops, begins, open_start, phase))
+                else:
+                    frame = 3 + (length - 3 - phase) % 3
+                    found.extend(_pair_reverse(stops, begins, last_stop, last_start, frame))
+        for start, end, frame in sorted(found):
+            if (end - start + 1) // 3 - 1 >= min_length:
+                yield _orf(start, end, frame)
+
+    # a reverse ORF after the last stop ends at its outermost start, which is known now
+    for frame in range(3, 6):
+        if last_stop[frame - 3] is not None and last_start[frame - 3] is not None:
+            start, end = last_stop[frame - 3], last_start[frame - 3] + 2
+            if (end - start + 1) // 3 - 1 >= min_length:
+                yield _orf(start, end, frame)
+
+
+def _pair_forward(stops: np.ndarray, begins: np.ndarray, open_start: list, phase: int):
+    if open_start[phase] is not None:
+        begins = np.concatenate(([open_start[phase]], begins))
+    # the stop closing each start; the first start of each stop makes the ORF
+    closing = np.searchsorted(stops, begins)
+    closing, first = np.unique(closing, return_index=True)
+    open_start[phase] = None
+    if len(closing) and closing[-1] == len(stops):
+        open_start[phase] = int(begins[first[-1]])
+        closing, first = closing[:-1], first[:-1]
+    return [(int(begin), int(stop) + 2, phase)
+            for begin, stop in zip(begins[first].tolist(), stops[closing].tolist())]
+
+
+def _pair_reverse(stops: np.ndarray, begins: np.ndarray, last_stop: list, last_start: list, frame: int):
+    index = frame - 3
+    if last_stop[index] is not None:
+        stops = np.concatenate(([last_stop[index]], stops))
+    if last_start[index] is not None:
+        begins = np.concatenate(([last_start[index]], begins))
+    if len(stops) == 0:
+        return []
+    # the stop each start reads back to; the last start of each stop makes the ORF
+    previous = np.searchsorted(stops, begins) - 1
+    begins, previous = begins[previous >= 0], previous[previous >= 0]
+    groups, last = np.unique(previous[::-1], return_index=True)
+    last = len(previous) - 1 - last
+    last_stop[index], last_start[index] = int(stops[-1]), None
+    if len(groups) and groups[-1] == len(stops) - 1:
+        last_start[index] = int(begins[last[-1]])
+        groups, last = groups[:-1], last[:-1]
+    return [(int(stop), int(begin) + 2, frame)
+            for stop, begin in zip(stops[groups].tolist(), begins[last].tolist())]
+
+
+def orf_protein(sequence, orf: Dict, table=1) -> bytes:
+    """Amino acids of an ORF (one letter each, stop included as *)."""
+    piece = sequence[orf["start"]:orf["end"] + 1]
+    if orf["strand"] == "-":
+        piece = piece.reverse_complement() if hasattr(piece, "reverse_complement") else \
+            str(piece)[::-1].translate(str.maketrans("ACGTUacgtu", "TGCAAtgcaa"))
+    return translate(piece, table)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="List the open reading frames of every record of a FASTA file")
+    parser.add_argument("fasta")
+    parser.add_argument("--min-length", type=int, default=100, help="amino acids, stop not counted")
+    parser.add_argument("--table", type=int, default=1, help="NCBI translation table id")
+    parser.add_argument("--starts", default="ATG", help="comma-separated start codons")
+    parser.add_argument("--proteins", action="store_true", help="add the translated protein")
+    args = parser.parse_args(argv)
+
+    columns = ["record", "start", "end", "strand", "frame", "length"]
+    print("\t".join(columns + (["protein"] if args.proteins else [])))
+    for header, packed in cached_records(args.fasta):
+        record = header.split()[0] if header else ""
+        for orf in iter_orfs(packed, args.min_length, args.table, args.starts.upper().split(",")):
+            fields = [record] + [str(orf[column]) for column in columns[1:]]
+            if args.proteins:
+                fields.append(orf_protein(packed, orf, args.table).decode("ascii"))
+            print("\t".join(fields))
+
+
+if __name__ == "__main__":
+    main()
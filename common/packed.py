@@ -0,0 +1,223 @@
+"""
+2-bit packed nucleotide container.
+
+A, C, G and T are stored as the codes 0..3, four bases per byte. Anything
+else (N, IUPAC ambiguity codes) is kept in a side mask of runs
+(start, end, character) and decoded back on the way out, so a genome costs
+about a quarter of a byte per base plus a few bytes per ambiguous run.
+"""
+
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+from common.fasta import iter_fasta
+
+BASES = b"ACGT"
+
+_ENCODE = np.full(256, 255, dtype=np.uint8)
+for _code, _base in enumerate(BASES):
+    _ENCODE[_base] = _code
+    _ENCODE[ord(chr(_base).lower())] = _code
+
+_DECODE = np.frombuffer(BASES, dtype=np.uint8)
+
+IUPAC_COMPLEMENT = {
+    "N": "N", "R": "Y", "Y": "R", "S": "S", "W": "W", "K": "M", "M": "K",
+    "B": "V", "V": "B", "D": "H", "H": "D",
+}
+
+
+def encode(text) -> np.ndarray:
+    """
+    Map a str/bytes of bases to an array of codes 0..3.
+    Non-ACGT characters get the code 255.
+    """
+    if isinstance(text, str):
+        text = text.encode("ascii")
+    return _ENCODE[np.frombuffer(text, dtype=np.uint8)]
+
+
+def _pack_codes(codes: np.ndarray) -> np.ndarray:
+    padded = np.zeros((len(codes) + 3) // 4 * 4, dtype=np.uint8)
+    padded[:len(codes)] = codes
+    quads = padded.reshape(-1, 4)
+    return (quads[:, 0] << 6) | (quads[:, 1] << 4) | (quads[:, 2] << 2) | quads[:, 3]
+
+
+def _unpack_codes(packed: np.ndarray, start: int, end: int) -> np.ndarray:
+    first, last = start // 4, (end + 3) // 4
+    chunk = packed[first:last]
+    codes = np.empty((len(chunk), 4), dtype=np.uint8)
+    codes[:, 0] = chunk >> 6
+    codes[:, 1] = (chunk >> 4) & 3
+    codes[:, 2] = (chunk >> 2) & 3
+    codes[:, 3] = chunk & 3
+    offset = start - first * 4
+    return codes.reshape(-1)[offset:offset + end - start]
+
+
+def _mask_runs(raw: np.ndarray, codes: np.ndarray) -> List[Tuple[int, int, str]]:
+    invalid = np.flatnonzero(codes == 255)
+    if len(invalid) == 0:
+        return []
+    chars = raw[invalid]
+    # fold case so that "nN" is one run, like "NN"
+    chars = np.where((chars >= ord("a")) & (chars <= ord("z")), chars - 32, chars)
+    breaks = np.flatnonzero((np.diff(invalid) != 1) | (np.diff(chars) != 0)) + 1
+    starts = np.concatenate(([0], breaks))
+    ends = np.concatenate((breaks, [len(invalid)]))
+    return [(int(invalid[s]), int(invalid[e - 1]) + 1, chr(chars[s]).upper())
+            for s, e in zip(starts, ends)]
+
+
+class PackedSequence:
+    """
+    Immutable 2-bit packed DNA sequence.
+
+    Slicing returns another PackedSequence, str() decodes it, and codes()
+    gives the bases as a NumPy uint8 array (A=0, C=1, G=2, T=3) for array
+    kernels. Masked (non-ACGT) positions read as 0 in codes(); use mask
+    or valid() to exclude them.
+    """
+
+    __slots__ = ("packed", "length", "mask")
+
+    def __init__(self, packed: np.ndarray, length: int, mask=None):
+        self.packed = packed
+        self.length = length
+        self.mask = mask or []
+
+    @classmethod
+    def from_text(cls, text) -> "PackedSequence":
+        if isinstance(text, str):
+            text = text.encode("ascii")
+        raw = np.frombuffer(text, dtype=np.uint8)
+        codes = _ENCODE[raw]
+        mask = _mask_runs(raw, codes)
+        if mask:
+            codes = np.where(codes == 255, 0, codes).astype(np.uint8)
+        return cls(_pack_codes(codes), len(codes), mask)
+
+    @classmethod
+    def from_codes(cls, codes: np.ndarray) -> "PackedSequence":
+        codes = np.asarray(codes, dtype=np.uint8)
+        return cls(_pack_codes(codes), len(codes))
+
+    def __len__(self) -> int:
+        return self.length
+
+    @property
+    def nbytes(self) -> int:
+        return self.packed.nbytes + 24 * len(self.mask)
+
+    def codes(self, start: int = 0, end: int = None) -> np.ndarray:
+        end = self.length if end is None else min(end, self.length)
+        if start >= end:
+            return np.empty(0, dtype=np.uint8)
+        return _unpack_codes(self.packed, start, end)
+
+    def valid(self, start: int = 0, end: int = None) -> np.ndarray:
+        """Boolean array, False where the base is masked (N or IUPAC)."""
+        end = self.length if end is None else min(end, self.length)
+        result = np.ones(max(0, end - start), dtype=bool)
+        for run_start, run_end, _ in self.mask:
+            lo, hi = max(run_start, start), min(run_end, end)
+            if lo < hi:
+                result[lo - start:hi - start] = False
+        return result
+
+    def _mask_slice(self, start: int, end: int):
+        return [(max(s, start) - start, min(e, end) - start, c)
+                for s, e, c in self.mask if s < end and e > start]
+
+    def decode(self, start: int = 0, end: int = None) -> str:
+        end = self.length if end is None else min(end, self.length)
+        if start >= end:
+            return ""
+        text = _DECODE[self.codes(start, end)]
+        for s, e, c in self._mask_slice(start, end):
+            text[s:e] = ord(c)
+        return text.tobytes().decode("ascii")
+
+    def __str__(self) -> str:
+        return self.decode()
+
+    def __repr__(self) -> str:
+        preview = self.decode(0, 20)
+        return f"PackedSequence({preview}{'...' if self.length > 20 else ''}, length={self.length})"
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.length)
+            if step != 1:
+                return PackedSequence.from_text(self.decode()[key])
+            stop = max(start, stop)
+            if start % 4 == 0:
+                packed = self.packed[start // 4:(stop + 3) // 4]
+            else:
+                packed = _pack_codes(self.codes(start, stop))
+            return PackedSequence(packed, stop - start, self._mask_slice(start, stop))
+        if key < 0:
+            key += self.length
+        if not 0 <= key < self.length:
+            raise IndexError("sequence index out of range")
+        return self.decode(key, key + 1)
+
+    def __eq__(self, other):
+        if isinstance(other, PackedSequence):
+            return (self.length == other.length and self.mask == other.mask
+                    and np.array_equal(self.codes(), other.codes()))
+        if isinstance(other, str):
+            return self.decode() == other.upper()
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.decode())
+
+    def upper(self) -> "PackedSequence":
+        return self
+
+    def base_counts(self) -> np.ndarray:
+        """Counts of A, C, G, T (masked positions excluded)."""
+        codes = self.codes()
+        if self.mask:
+            codes = codes[self.valid()]
+        return np.bincount(codes, minlength=4)[:4]
+
+    def count(self, sub: str) -> int:
+        if len(sub) == 1 and sub.upper() in "ACGT":
+            return int(self.base_counts()["ACGT".index(sub.upper())])
+        return self.decode().count(sub)
+
+    def reverse_complement(self) -> "PackedSequence":
+        codes = 3 - self.codes()[::-1]
+        mask = [(self.length - e, self.length - s, IUPAC_COMPLEMENT.get(c, c))
+                for s, e, c in reversed(self.mask)]
+        for s, e, _ in mask:
+            # masked positions read as 0, as from_text leaves them
+            codes[s:e] = 0
+        return PackedSequence(_pack_codes(codes), self.length, mask)
+
+
+def as_text(sequence) -> str:
+    """Return sequence as a str, decoding it if it is a PackedSequence."""
+    if isinstance(sequence, PackedSequence):
+        return sequence.decode()
+    return sequence
+
+
+def as_codes(sequence) -> np.ndarray:
+    """Return sequence as an array of codes 0..3, with 255 for non-ACGT bases."""
+    if isinstance(sequence, PackedSequence):
+        codes = sequence.codes()
+        if sequence.mask:
+            codes = np.where(sequence.valid(), codes, 255).astype(np.uint8)
+        return codes
+    return encode(sequence)
+
+
+def iter_fasta_packed(path: str) -> Iterator[Tuple[str, PackedSequence]]:
+    """Like iter_fasta, but every record is packed as soon as it is read."""
+    for header, sequence in iter_fasta(path):
+        yield header, PackedSequence.from_text(sequence)
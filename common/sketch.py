@@ -0,0 +1,188 @@
+"""
+MinHash sketches, Mash distances and UPGMA trees for genome collections.
+
+A sketch keeps the `size` smallest 64-bit hashes of a genome's canonical
+k-mers (bottom-k MinHash). Two genomes are compared on the bottom `size`
+hashes of the union of their sketches: the fraction of those present in
+both estimates the Jaccard index J of the k-mer sets, and the Mash distance
+-ln(2J / (1 + J)) / k estimates the per-base mutation rate.
+
+Sketching streams the genome chunk by chunk through common.kmers, keeping
+only `size` hashes, and genomes are sketched in parallel with run_batch.
+distance_matrix replaces the hashes by their ranks in the whole
+collection, compares one sketch against all later ones at once with a
+table lookup and only does further work on the shared hashes, splitting
+the rows over worker processes.
+"""
+
+import functools
+from typing import List, NamedTuple, Sequence, Tuple
+
+import numpy as np
+
+from common.batch import run_batch
+from common.cache import cached_records
+from common.kmers import CHUNK, _as_collection, kmer_codes
+
+
+class Sketch(NamedTuple):
+    name: str
+    hashes: np.ndarray
+    k: int
+    size: int
+    bases: int
+
+
+def hash_codes(codes: np.ndarray) -> np.ndarray:
+    """splitmix64 finaliser: spreads k-mer codes evenly over 64 bits."""
+    x = codes.astype(np.uint64)
+    with np.errstate(over="ignore"):
+        x = x + np.uint64(0x9E3779B97F4A7C15)
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def sketch_sequence(sequences, k: int = 21, size: int = 1000, name: str = "",
+                    chunk_size: int = CHUNK) -> Sketch:
+    """Bottom-`size` MinHash sketch of one sequence or a collection of records."""
+    hashes = np.zeros(0, dtype=np.uint64)
+    bases = 0
+    for sequence in _as_collection(sequences):
+        bases += len(sequence)
+        for start in range(0, max(1, len(sequence) - k + 1), chunk_size):
+            piece = sequence[start:start + chunk_size + k - 1]
+            chunk = np.unique(hash_codes(kmer_codes(piece, k, canonical=True)))[:size]
+            hashes = np.union1d(hashes, chunk)[:size]
+    return Sketch(name, hashes, k, size, bases)
+
+
+def sketch_fasta(path: str, k: int = 21, size: int = 1000) -> Sketch:
+    records = [packed for _, packed in cached_records(path)]
+    return sketch_sequence(records, k, size, name=path)
+
+
+def sketch_files(paths: Sequence[str], k: int = 21, size: int = 1000, workers: int = None) -> List[Sketch]:
+    """Sketch many FASTA files on a process pool, in input order."""
+    return run_batch(functools.partial(sketch_fasta, k=k, size=size), paths, workers)
+
+
+def mash_distance(jaccard: np.ndarray, k: int) -> np.ndarray:
+    jaccard = np.asarray(jaccard, dtype=float)
+    with np.errstate(divide="ignore"):
+        distance = np.log((1 + jaccard) / (2 * jaccard)) / k
+    return np.where(jaccard > 0, distance, 1.0)
+
+
+def _rank_matrix(sketches: Sequence[Sketch]) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    Replace every hash by its rank among all distinct hashes of the
+    collection, so that membership in a sketch is a lookup in a bool table
+    indexed by rank. Rows are padded with the rank `distinct`, which no
+    sketch contains.
+    """
+    lengths = np.array([len(s.hashes) for s in sketches])
+    everything = np.concatenate([s.hashes for s in sketches])
+    distinct = np.unique(everything)
+    ranks = np.full((len(sketches), max(1, lengths.max())), len(distinct), dtype=np.int32)
+    offset = 0
+    for row, length in enumerate(lengths.tolist()):
+        ranks[row, :length] = np.searchsorted(distinct, everything[offset:offset + length])
+        offset += length
+    return ranks, lengths, len(distinct)
+
+
+def _jaccard_row(ranks: np.ndarray, others: np.ndarray, lengths: np.ndarray,
+                 size: int, present: np.ndarray) -> np.ndarray:
+    """
+    Bottom-`size` union Jaccard of one sketch (as sorted ranks) against each
+    row of others. present is a zeroed bool buffer over all ranks.
+    """
+    present[ranks] = True
+    rows, cols = np.nonzero(present[others])
+    present[ranks] = False
+    total_shared = np.bincount(rows, minlength=len(others))
+    # a shared hash's rank in the union of the two sketches: its position in
+    # each sketch, minus the shared hashes up to it, which were counted twice
+    row_start = np.concatenate(([0], np.cumsum(total_shared)[:-1]))
+    shared_up_to = np.arange(1, len(rows) + 1) - row_start[rows]
+    position_here = np.searchsorted(ranks, others[rows, cols]) + 1
+    union_rank = (cols + 1) + position_here - shared_up_to
+    shared = np.bincount(rows[union_rank <= size], minlength=len(others))
+    union = np.minimum(size, len(ranks) + lengths - total_shared)
+    return np.where(union > 0, shared / np.maximum(union, 1), 0.0)
+
+
+def _jaccard_rows(job) -> List[np.ndarray]:
+    ranks, lengths, size, distinct, rows = job
+    present = np.zeros(distinct + 1, dtype=bool)
+    return [_jaccard_row(ranks[i, :lengths[i]], ranks[i + 1:], lengths[i + 1:], size, present)
+            for i in rows]
+
+
+def jaccard_matrix(sketches: Sequence[Sketch], workers: int = 1) -> np.ndarray:
+    """Symmetric matrix of estimated Jaccard indexes (1 on the diagonal)."""
+    if len({(s.k, s.size) for s in sketches}) > 1:
+        raise ValueError("sketches were built with different k or size")
+    n = len(sketches)
+    result = np.eye(n)
+    if n < 2:
+        return result
+    ranks, lengths, distinct = _rank_matrix(sketches)
+    size = sketches[0].size
+    # interleave rows so that every worker gets a similar number of pairs
+    groups = max(1, min(n - 1, (workers or 1) * 4))
+    jobs = [(ranks, lengths, size, distinct, list(range(g, n - 1, groups))) for g in range(groups)]
+    for job, values in zip(jobs, run_batch(_jaccard_rows, jobs, workers)):
+        for i, row in zip(job[-1], values):
+            result[i, i + 1:] = row
+            result[i + 1:, i] = row
+    return result
+
+
+def distance_matrix(sketches: Sequence[Sketch], workers: int = 1) -> np.ndarray:
+    """Pairwise Mash distances (0 on the diagonal)."""
+    distances = mash_distance(jaccard_matrix(sketches, workers), sketches[0].k)
+    np.fill_diagonal(distances, 0.0)
+    return distances
+
+
+def upgma(distances: np.ndarray) -> List[Tuple[int, int, float, int]]:
+    """
+    Average-linkage (UPGMA) clustering. Returns n - 1 merges (a, b, height,
+    size) in the scipy linkage layout: clusters 0..n-1 are the inputs and
+    merge i creates cluster n + i.
+    """
+    n = len(distances)
+    d = np.array(distances, dtype=float)
+    np.fill_diagonal(d, np.inf)
+    ids = list(range(n))
+    sizes = np.ones(n)
+    active = np.ones(n, dtype=bool)
+    merges = []
+    for step in range(n - 1):
+        masked = np.where(active[:, None] & active[None, :], d, np.inf)
+        a, b = np.unravel_index(np.argmin(masked), d.shape)
+        a, b = min(a, b), max(a, b)
+        merged = (d[a] * sizes[a] + d[b] * sizes[b]) / (sizes[a] + sizes[b])
+        merges.append((ids[a], ids[b], float(d[a, b]) / 2, int(sizes[a] + sizes[b])))
+        d[a, :] = merged
+        d[:, a] = merged
+        d[a, a] = np.inf
+        active[b] = False
+        sizes[a] += sizes[b]
+        ids[a] = n + step
+    return merges
+
+
+def newick(merges: List[Tuple[int, int, float, int]], names: Sequence[str]) -> str:
+    """Newick string of a UPGMA tree, branch lengths from merge heights."""
+    n = len(names)
+    if n == 1:
+        return f"{names[0]};"
+    nodes = {i: (name, 0.0) for i, name in enumerate(names)}
+    for step, (a, b, height, _) in enumerate(merges):
+        (text_a, height_a), (text_b, height_b) = nodes.pop(a), nodes.pop(b)
+        nodes[n + step] = (f"({text_a}:{height - height_a:.6f},{text_b}:{height - height_b:.6f})", height)
+    return nodes[n + len(merges) - 1][0] + ";"
+
@@ -0,0 +1,204 @@
+"""
+Synthetic genomes with planted features, for testing the detectors at scale.
+
+The background is drawn with NumPy in chunks, straight into one uint8
+buffer of ASCII bases, so a gigabase genome takes seconds and about one
+byte per base. Features are then written over the background at random,
+non-overlapping positions:
+
+    transposon       ITR + internal sequence + reverse complement of the ITR
+    tandem_repeat    a 3-6 base unit repeated several times
+    restriction_site a given recognition site (e.g. GAATTC)
+
+Every planted feature is returned in a truth table with 0-based start and
+inclusive end, the convention used by the lab detectors. Sites that occur
+by chance in the random background are not in the table.
+
+    python common/synthetic.py genome.fasta --length 100M --transposons 500 \\
+        --tandem-repeats 500 --site GAATTC:1000
+"""
+
+import argparse
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+ALPHABET = np.frombuffer(b"ACGT", dtype=np.uint8)
+COMPLEMENT = bytes.maketrans(b"ACGT", b"TGCA")
+CHUNK = 1 << 24
+
+
+def random_bases(length: int, gc: float = 0.5, rng=None) -> np.ndarray:
+    """
+    uint8 array of `length` random ASCII bases with the given G+C fraction.
+    Generated in chunks so the temporaries stay small.
+    """
+    if not 0.0 <= gc <= 1.0:
+        raise ValueError("gc must be between 0 and 1")
+    rng = rng if rng is not None else np.random.default_rng()
+    # cumulative thresholds for A, C, G (T takes the rest)
+    thresholds = np.array([(1 - gc) / 2, 0.5, 0.5 + gc / 2])
+    out = np.empty(length, dtype=np.uint8)
+    for start in range(0, length, CHUNK):
+        end = min(length, start + CHUNK)
+        codes = np.searchsorted(thresholds, rng.random(end - start), side="right")
+        out[start:end] = ALPHABET[codes]
+    return out
+
+
+def random_text(length: int, gc: float = 0.5, rng=None) -> str:
+    return random_bases(length, gc, rng).tobytes().decode("ascii")
+
+
+def reverse_complement(seq: str) -> str:
+    return seq.encode("ascii").translate(COMPLEMENT)[::-1].decode("ascii")
+
+
+def _transposon(rng, gc, itr_range, internal_range) -> Tuple[str, dict]:
+    itr = random_text(int(rng.integers(itr_range[0], itr_range[1] + 1)), gc, rng)
+    internal = random_text(int(rng.integers(internal_range[0], internal_range[1] + 1)), gc, rng)
+    right_itr = reverse_complement(itr)
+    return itr + internal + right_itr, {"left_itr": itr, "right_itr": right_itr}
+
+
+def _tandem_repeat(rng, gc, unit_range, repetition_range) -> Tuple[str, dict]:
+    unit = random_text(int(rng.integers(unit_range[0], unit_range[1] + 1)), gc, rng)
+    repetitions = int(rng.integers(repetition_range[0], repetition_range[1] + 1))
+    return unit * repetitions, {"pattern": unit, "repetitions": repetitions}
+
+
+def plant_features(genome: np.ndarray, features: List[Tuple[str, str, dict]], rng=None) -> List[dict]:
+    """
+    Write (kind, sequence, details) features over the genome in place at
+    random non-overlapping positions, and return the truth table sorted by
+    start. Raises ValueError if the features do not fit.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    lengths = np.array([len(seq) for _, seq, _ in features], dtype=np.int64)
+    free = len(genome) - int(lengths.sum())
+    if free < 0:
+        raise ValueError("planted features are longer than the genome")
+    if not features:
+        return []
+
+    # sorted gap offsets plus the lengths of the features placed before
+    order = rng.permutation(len(features))
+    gaps = np.sort(rng.integers(0, free + 1, len(features)))
+    starts = gaps + np.concatenate(([0], np.cumsum(lengths[order])[:-1]))
+
+    truth = []
+    for start, index in zip(starts.tolist(), order.tolist()):
+        kind, seq, details = features[index]
+        genome[start:start + len(seq)] = np.frombuffer(seq.encode("ascii"), dtype=np.uint8)
+        entry = {"type": kind, "start": start, "end": start + len(seq) - 1, "length": len(seq)}
+        entry.update(details)
+        truth.append(entry)
+    return truth
+
+
+def synthetic_genome(length: int, gc: float = 0.5, seed: int = None,
+                     transposons: int = 0, tandem_repeats: int = 0,
+                     sites: Dict[str, int] = None,
+                     itr_range=(5, 6), internal_range=(15, 50),
+                     unit_range=(3, 6), repetition_range=(3, 10)) -> Tuple[np.ndarray, List[dict]]:
+    """
+    Random genome of `length` bases with planted transposons, tandem
+    repeats and restriction sites (site -> number of copies).
+    Returns (uint8 array of ASCII bases, truth table).
+    """
+    rng = np.random.default_rng(seed)
+    genome = random_bases(length, gc, rng)
+
+    features = []
+    for _ in range(transposons):
+        seq, details = _transposon(rng, gc, itr_range, internal_range)
+        features.append(("transposon", seq, details))
+    for _ in range(tandem_repeats):
+        seq, details = _tandem_repeat(rng, gc, unit_range, repetition_range)
+        features.append(("tandem_repeat", seq, details))
+    for site, copies in (sites or {}).items():
+        features.extend(("restriction_site", site, {"site": site}) for _ in range(copies))
+
+    truth = plant_features(genome, features, rng)
+    return genome, truth
+
+
+def write_fasta(path: str, header: str, genome: np.ndarray, line_width: int = 60):
+    """Write a uint8 base array as FASTA, formatting whole blocks of lines at once."""
+    block = line_width * (CHUNK // line_width)
+    with open(path, "wb") as handle:
+        handle.write(b">" + header.encode() + b"\n")
+        for start in range(0, len(genome), block):
+            piece = genome[start:start + block]
+            full = len(piece) // line_width * line_width
+            if full:
+                lines = np.empty((full // line_width, line_width + 1), dtype=np.uint8)
+                lines[:, :line_width] = piece[:full].reshape(-1, line_width)
+                lines[:, line_width] = ord("\n")
+                handle.write(lines.tobytes())
+            if full < len(piece):
+                handle.write(piece[full:].tobytes() + b"\n")
+
+
+TRUTH_COLUMNS = ["type", "start", "end", "length", "left_itr", "right_itr",
+                 "pattern", "repetitions", "site"]
+
+
+def write_truth_table(path: str, truth: List[dict]):
+    """Tab-separated truth table, one planted feature per line."""
+    with open(path, "w") as handle:
+        handle.write("\t".join(TRUTH_COLUMNS) + "\n")
+        for entry in truth:
+            handle.write("\t".join(str(entry.get(column, "")) for column in TRUTH_COLUMNS) + "\n")
+
+
+def read_truth_table(path: str) -> List[dict]:
+    truth = []
+    with open(path, "r") as handle:
+        columns = handle.readline().rstrip("\n").split("\t")
+        for line in handle:
+            entry = {}
+            for column, value in zip(columns, line.rstrip("\n").split("\t")):
+                if value == "":
+                    continue
+                entry[column] = int(value) if column in ("start", "end", "length", "repetitions") else value
+            truth.append(entry)
+    return truth
+
+
+def parse_size(text: str) -> int:
+    """'250k', '10M', '1.5G' -> number of bases."""
+    units = {"k": 10 ** 3, "m": 10 ** 6, "g": 10 ** 9}
+    text = text.strip().lower()
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic genome and its truth table")
+    parser.add_argument("output", help="FASTA file to write; the truth table goes to <output>.truth.tsv")
+    parser.add_argument("--length", type=parse_size, default=1_000_000, help="bases, e.g. 500k, 10M, 1G")
+    parser.add_argument("--gc", type=float, default=0.5, help="G+C fraction of the background")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--transposons", type=int, default=0)
+    parser.add_argument("--tandem-repeats", type=int, default=0)
+    parser.add_argument("--site", action="append", default=[], metavar="SITE:COPIES",
+                        help="plant a restriction site, e.g. GAATTC:100 (repeatable)")
+    args = parser.parse_args(argv)
+
+    sites = {}
+    for item in args.site:
+        site, _, copies = item.partition(":")
+        sites[site.upper()] = int(copies or 1)
+
+    genome, truth = synthetic_genome(args.length, args.gc, args.seed, args.transposons,
+                                     args.tandem_repeats, sites)
+    write_fasta(args.output, f"synthetic length={args.length} gc={args.gc} seed={args.seed}", genome)
+    write_truth_table(args.output + ".truth.tsv", truth)
+    print(f"Wrote {args.length} bases to {args.output} and {len(truth)} features "
+          f"to {args.output}.truth.tsv")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,534 @@
+import numpy as np
+
+from common.fasta import iter_fasta, read_fasta, read_first_record
+
+
+def write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text)
+    return str(path)
+
+
+def test_iter_fasta_multi_record(tmp_path):
+    path = write(tmp_path, "multi.fasta",
+                 ">first one\nACGT\nAC\n\n>second\nGGG\n>empty\n>third\nT\n")
+    records = list(iter_fasta(path))
+    assert records == [("first one", "ACGTAC"), ("second", "GGG"),
+                       ("empty", ""), ("third", "T")]
+    assert read_first_record(path) == ("first one", "ACGTAC")
+    assert read_fasta(path) == "ACGTACGGGT"
+
+
+def test_iter_fasta_without_header(tmp_path):
+    path = write(tmp_path, "plain.fasta", "ACG\nTTA\n")
+    assert list(iter_fasta(path)) == [("", "ACGTTA")]
+
+
+def test_indexed_fasta_slices_match_reader(tmp_path):
+    import random
+    from common.faidx import IndexedFasta, find_all
+
+    rng = random.Random(3)
+    records = [("chr1", "".join(rng.choice("ACGT") for _ in range(1003))),
+               ("chr2", "".join(rng.choice("ACGTN") for _ in range(61)))]
+    text = ""
+    for name, sequence in records:
+        text += f">{name} description\n"
+        text += "".join(sequence[i:i + 60] + "\n" for i in range(0, len(sequence), 60))
+    path = write(tmp_path, "indexed.fasta", text)
+
+    with IndexedFasta(path) as fasta:
+        assert fasta.names() == ["chr1", "chr2"]
+        for name, sequence in records:
+            view = fasta[name]
+            assert len(view) == len(sequence)
+            for start, end in [(0, 10), (55, 125), (59, 61), (0, len(sequence)), (-7, None)]:
+                assert view[start:end] == sequence[start:end]
+            assert view[-1] == sequence[-1]
+        chr1 = fasta["chr1"]
+        site = records[0][1][500:504]
+        expected = [i for i in range(len(records[0][1]) - 3) if records[0][1][i:i + 4] == site]
+        assert find_all(chr1, site, chunk_size=97) == expected
+        assert find_all(chr1, site.lower(), chunk_size=97) == expected
+    assert find_all("aGAATTCgaattc", "GAATTC") == [1, 7]
+    assert (tmp_path / "indexed.fasta.fai").exists()
+
+
+def test_packed_sequence_round_trip():
+    from common.packed import PackedSequence, as_codes
+
+    text = "ACGTNNNACGRYTTGCAnnACGTACGTA"
+    packed = PackedSequence.from_text(text)
+    assert len(packed) == len(text)
+    assert str(packed) == text.upper()
+    for start, end in [(0, 5), (1, 9), (3, 4), (5, 27), (-6, None), (10, 3)]:
+        assert str(packed[start:end]) == text.upper()[start:end]
+    assert packed[::3] == text.upper()[::3]
+    assert packed[4] == "N"
+
+    complement = {"A": "T", "C": "G", "G": "C", "T": "A", "N": "N", "R": "Y", "Y": "R"}
+    expected = "".join(complement[base] for base in reversed(text.upper()))
+    assert str(packed.reverse_complement()) == expected
+    reverse = PackedSequence.from_text("ACGNNNT").reverse_complement()
+    assert list(reverse.base_counts()) == [1, 1, 1, 1] and reverse.count("A") == 1
+    assert PackedSequence.from_text("nN") == PackedSequence.from_text("NN")
+
+    codes = as_codes(packed)
+    assert list(codes[:4]) == [0, 1, 2, 3] and codes[4] == 255
+    assert packed.count("A") == text.upper().count("A")
+    assert PackedSequence.from_text("ACGT" * 1000).nbytes == 1000
+
+
+def test_iter_fasta_gzip_and_bgzf(tmp_path):
+    import gzip
+    import random
+    from common.compressed import is_bgzf, write_bgzf
+
+    rng = random.Random(5)
+    records = [(f"r{i}", "".join(rng.choice("ACGT") for _ in range(rng.randrange(1, 40000))))
+               for i in range(12)]
+    text = "".join(f">{name}\n" + "".join(seq[i:i + 70] + "\n" for i in range(0, len(seq), 70))
+                   for name, seq in records)
+
+    gz_path = tmp_path / "plain.fa.gz"
+    with gzip.open(gz_path, "wt") as handle:
+        handle.write(text)
+    bgzf_path = str(tmp_path / "blocked.fa.gz")
+    write_bgzf(bgzf_path, text.encode())
+
+    assert is_bgzf(bgzf_path) and not is_bgzf(str(gz_path))
+    assert list(iter_fasta(str(gz_path))) == records
+    assert list(iter_fasta(bgzf_path, workers=4)) == records
+
+    # a stray non-UTF-8 header byte parses the same way in every format
+    raw = b">caf\xe9 strain\nACGT\n"
+    (tmp_path / "odd.fa").write_bytes(raw)
+    with gzip.open(tmp_path / "odd.fa.gz", "wb") as handle:
+        handle.write(raw)
+    write_bgzf(str(tmp_path / "odd.bgz"), raw)
+    parsed = [list(iter_fasta(str(tmp_path / name), workers=2)) for name in ("odd.fa", "odd.fa.gz", "odd.bgz")]
+    assert parsed[0] == parsed[1] == parsed[2] == [("caf\ufffd strain", "ACGT")]
+    assert list(iter_fasta(bgzf_path, workers=1)) == records
+    with gzip.open(bgzf_path, "rt") as handle:
+        assert handle.read() == text
+
+
+def test_sequence_cache_hit_invalidate_and_evict(tmp_path, monkeypatch):
+    import os
+    from common import cache
+
+    monkeypatch.setenv("SEQ_CACHE_DIR", str(tmp_path / "cache"))
+    path = write(tmp_path, "cached.fasta", ">a first\nACGTNNAC\nGT\n>b\nTTTT\n")
+    expected = [("a first", "ACGTNNACGT"), ("b", "TTTT")]
+
+    first = cache.cached_records(path)
+    second = cache.cached_records(path)
+    assert [(h, str(s)) for h, s in first] == expected
+    assert [(h, str(s)) for h, s in second] == expected
+    assert cache.cached_first_record(path) == expected[0]
+    assert len([n for n in os.listdir(tmp_path / "cache") if n.endswith(".seqc")]) == 1
+
+    write(tmp_path, "cached.fasta", ">a\nGGGG\n")
+    os.utime(path, ns=(0, 12345))
+    assert cache.cached_read_fasta(path) == "GGGG"
+
+    monkeypatch.setenv("SEQ_CACHE_MAX_BYTES", "0")
+    other = write(tmp_path, "other.fasta", ">c\nCCCC\n")
+    assert cache.cached_read_fasta(other) == "CCCC"
+    assert [n for n in os.listdir(tmp_path / "cache") if n.endswith(".seqc")] == \
+        [cache.source_digest(other, str(tmp_path / "cache")) + ".seqc"]
+
+
+def test_run_batch_keeps_input_order(tmp_path):
+    from common.batch import expand_inputs, run_batch
+
+    for name in ["b.fasta", "a.fasta", "c.txt"]:
+        write(tmp_path, name, ">x\nA\n")
+    pattern = str(tmp_path / "*.fasta")
+    assert expand_inputs([str(tmp_path / "c.txt"), pattern, pattern]) == \
+        [str(tmp_path / name) for name in ["c.txt", "a.fasta", "b.fasta"]]
+
+    items = ["a" * n for n in range(20, 0, -1)]
+    assert run_batch(len, items, workers=3) == list(range(20, 0, -1))
+    assert run_batch(len, items, workers=1) == list(range(20, 0, -1))
+
+
+def test_instrument_stages_and_counters():
+    from common import instrument
+    from common.batch import run_batch
+
+    @instrument.timed("scan")
+    def scan(sequence):
+        instrument.count("hits", sequence.count("A"))
+        return len(sequence)
+
+    assert scan("AAC") == 3
+    assert instrument.report()["stages"] == {}
+
+    instrument.enable(trace_memory=False)
+    try:
+        scan("AACGA")
+        with instrument.stage("outer", bases=10):
+            scan("AAAA")
+        data = instrument.report()
+        # profiled batches run in this process (scan is not even picklable)
+        assert run_batch(scan, ["AC", "GT"], workers=2) == [2, 2]
+        assert instrument.report()["stages"]["scan"]["calls"] == 4
+    finally:
+        instrument._enabled = False
+        instrument.reset()
+    assert data["stages"]["scan"]["calls"] == 2
+    assert data["stages"]["scan"]["bases"] == 9
+    assert data["stages"]["outer"]["bases"] == 10
+    assert data["counters"] == {"hits": 7}
+    assert "scan" in instrument.format_report(data)
+
+
+
+def _plot_values(name, values):
+    import matplotlib.pyplot as plt
+    from common.figures import show_figure
+
+    plt.figure()
+    plt.plot(values)
+    show_figure(name)
+
+
+def test_figures_are_saved_headless(tmp_path, monkeypatch):
+    from common.figures import render_figures, set_figures_dir, show_figure
+
+    monkeypatch.delenv("FIGURES_DIR", raising=False)
+    set_figures_dir(str(tmp_path / "figs"))
+    _plot_values("DNA Pattern: (C+G)% vs Kappa IC", [1, 3, 2])
+    assert (tmp_path / "figs" / "DNA_Pattern_C_G_vs_Kappa_IC.png").exists()
+    assert show_figure() is None
+
+    render_figures(_plot_values, [(f"lane {i}", [i, i + 1]) for i in range(3)], workers=2)
+    saved = sorted(path.name for path in (tmp_path / "figs").iterdir())
+    assert saved == ["DNA_Pattern_C_G_vs_Kappa_IC.png", "lane_0.png", "lane_1.png", "lane_2.png"]
+    assert all(path.read_bytes()[:8] == b"\x89PNG\r\n\x1a\n" for path in (tmp_path / "figs").iterdir())
+
+def test_synthetic_genome_truth_table(tmp_path):
+    from common.synthetic import (read_truth_table, reverse_complement, synthetic_genome,
+                                  write_fasta, write_truth_table)
+
+    genome, truth = synthetic_genome(5000, gc=0.6, seed=3, transposons=5,
+                                     tandem_repeats=5, sites={"GAATTC": 4})
+    assert len(truth) == 14
+    starts = [entry["start"] for entry in truth]
+    assert starts == sorted(starts)
+    assert all(a["end"] < b["start"] for a, b in zip(truth, truth[1:]))
+
+    path = str(tmp_path / "synthetic.fasta")
+    write_fasta(path, "synthetic", genome, line_width=70)
+    write_truth_table(path + ".tsv", truth)
+    (header, seq), = iter_fasta(path)
+    assert header == "synthetic" and len(seq) == 5000
+    for entry in read_truth_table(path + ".tsv"):
+        planted = seq[entry["start"]:entry["end"] + 1]
+        if entry["type"] == "transposon":
+            assert planted.startswith(entry["left_itr"])
+            assert planted.endswith(reverse_complement(entry["left_itr"]))
+        elif entry["type"] == "tandem_repeat":
+            assert planted == entry["pattern"] * entry["repetitions"]
+        else:
+            assert planted == "GAATTC"
+
+
+def test_count_kmers_matches_naive_count():
+    from collections import Counter
+    from common.kmers import count_kmers, kmer_code, kmer_counts, kmer_string
+
+    seq = "TACGTGCGCGCGAGCTATNNCTACTGACTTACGACTAGTGTAGCTGCATCATCGATCGA"
+    for k in (1, 2, 3, 5):
+        expected = Counter(seq[i:i + k] for i in range(len(seq) - k + 1))
+        expected = {kmer: n for kmer, n in expected.items() if "N" not in kmer}
+        assert kmer_counts(seq, k) == expected
+        assert count_kmers(seq, k, chunk_size=7).sum() == sum(expected.values())
+    assert kmer_code("ACG") == 6 and kmer_string(6, 3) == "ACG"
+
+
+def test_sparse_canonical_counts_spill_to_disk(tmp_path):
+    from collections import Counter
+    from common.kmers import canonical_kmer, count_kmers_sparse, iter_kmers_sparse, kmer_counts, kmer_string
+    from common.synthetic import random_text
+    from common.topn import top_codes, top_tables
+
+    seq = random_text(3000, rng=np.random.default_rng(5))
+    k = 21
+    expected = Counter(canonical_kmer(seq[i:i + k]) for i in range(len(seq) - k + 1))
+    assert kmer_counts(seq, k, canonical=True) == dict(expected)
+
+    codes, counts = count_kmers_sparse([seq[:1500], seq[1500:]], k, memory_bytes=2000,
+                                       chunk_size=300, spill_dir=str(tmp_path), partitions=8)
+    assert list(codes) == sorted(codes)
+    halves = Counter(canonical_kmer(part[i:i + k]) for part in (seq[:1500], seq[1500:])
+                     for i in range(len(part) - k + 1))
+    assert {kmer_string(int(c), k): int(n) for c, n in zip(codes, counts)} == dict(halves)
+    assert list(tmp_path.iterdir()) == []
+
+    # spilled partitions come out one by one; the top N never needs them all
+    parts = iter_kmers_sparse([seq[:1500], seq[1500:]], k, memory_bytes=2000,
+                              chunk_size=300, spill_dir=str(tmp_path), partitions=8)
+    top, top_counts, distinct = top_tables(parts, 5)
+    assert distinct == len(codes)
+    assert [(c, n) for c, n in zip(top.tolist(), top_counts.tolist())] == \
+        [(c, n) for c, n in zip(*(a.tolist() for a in top_codes(codes, counts, 5)))]
+
+
+def test_multi_k_counts_match_single_k():
+    from common.kmers import count_kmers, count_kmers_multi
+
+    seq = "TACGTGCGCGCGAGCTATNCTACTGACTTACGACTNNAGTGTAGCTGCATCATCGATCGA"
+    tables = count_kmers_multi(seq, range(1, 7), chunk_size=11)
+    for k in range(1, 7):
+        assert (tables[k] == count_kmers(seq, k)).all()
+    assert count_kmers_multi("ACG", [2, 5])[2].sum() == 2
+
+
+def test_top_items_and_heavy_hitters():
+    from collections import Counter
+    from common.topn import HeavyHitters, heavy_hitter_kmers, top_items
+
+    counts = {"a": 3, "b": 5, "c": 3, "d": 1}
+    assert top_items(counts, 3) == sorted(counts.items(), key=lambda x: x[1], reverse=True)[:3]
+
+    rng = np.random.default_rng(2)
+    stream = np.concatenate([rng.integers(0, 5000, 20000), np.repeat([7, 11, 13], [3000, 2000, 1000])])
+    rng.shuffle(stream)
+    exact = Counter(stream.tolist())
+    summary = HeavyHitters(capacity=50)
+    for batch in np.array_split(stream, 9):
+        summary.update(batch)
+    assert summary.total == len(stream)
+    assert summary.error_bound <= len(stream) / 51
+    top = summary.top(3)
+    assert [code for code, _, _ in top] == [7, 11, 13]
+    assert all(lower <= exact[code] <= upper for code, lower, upper in top)
+
+    seq = "ACGTTGCA" * 200 + "GATTACA" * 300
+    rotations = {("GATTACA" * 2)[i:i + 7] for i in range(7)}
+    assert {kmer for kmer, _, _ in heavy_hitter_kmers(seq, 7, n=7, epsilon=0.01)} == rotations
+
+
+def test_parallel_kmer_counts_match_serial():
+    from common.kmers import count_kmers, count_kmers_multi, count_kmers_sparse
+    from common.synthetic import random_text
+
+    seq = random_text(5000, rng=np.random.default_rng(9))
+    seq = seq[:1234] + "N" + seq[1235:]
+    serial = count_kmers(seq, 5)
+    assert (count_kmers(seq, 5, chunk_size=333, workers=2) == serial).all()
+    multi = count_kmers_multi(seq, (2, 5), chunk_size=333, workers=2)
+    assert (multi[5] == serial).all() and multi[2].sum() == len(seq) - 1 - 2
+    codes, counts = count_kmers_sparse(seq, 21, chunk_size=333, workers=2)
+    serial_codes, serial_counts = count_kmers_sparse(seq, 21)
+    assert (codes == serial_codes).all() and (counts == serial_counts).all()
+    assert counts.sum() == len(seq) - 20 - 21
+
+
+def test_kmer_index_round_trip_and_queries(tmp_path, monkeypatch):
+    from common.kmer_index import KmerIndex, index_for_fasta
+
+    monkeypatch.setenv("SEQ_CACHE_DIR", str(tmp_path / "cache"))
+    path = write(tmp_path, "a.fasta", ">a\nACGTACGTTT\n>b\nGGGACG\n")
+    index = index_for_fasta(path, 3)
+    assert index.get("ACG") == 3 and index["TTT"] == 1 and "GTG" not in index
+    assert index.top(1) == [("ACG", 3)]
+    reloaded = index_for_fasta(path, 3)
+    assert reloaded.meta["source"].endswith("a.fasta")
+    assert reloaded.to_dict() == index.to_dict()
+
+    other = KmerIndex.build("ACGAAA", 3)
+    codes, mine, theirs = index.intersect(other)
+    assert [int(c) for c in codes] == [6] and list(mine) == [3] and list(theirs) == [1]
+    codes, mine, theirs = index.union(other)
+    assert len(codes) == len(set(index.kmers()) | set(other.kmers()))
+    codons = KmerIndex.build("AUGAAAUGA".replace("U", "T"), 3, step=3)
+    assert codons.to_dict() == {"AAA": 1, "ATG": 1, "TGA": 1}
+
+    # a cache directory under a regular file falls back to an in-memory build
+    monkeypatch.setenv("SEQ_CACHE_DIR", path + "/cache")
+    assert index_for_fasta(path, 3).to_dict() == index.to_dict()
+
+
+def test_sketch_distances_and_upgma():
+    from common.sketch import distance_matrix, jaccard_matrix, newick, sketch_sequence, upgma
+    from common.synthetic import random_text
+
+    rng = np.random.default_rng(5)
+    base = random_text(20000, rng=rng)
+    mutated = list(base)
+    for position in rng.choice(len(base), 200, replace=False).tolist():
+        mutated[position] = "A" if base[position] != "A" else "C"
+    mutated = "".join(mutated)
+    sketches = [sketch_sequence(seq, k=15, size=500, name=name)
+                for name, seq in (("base", base), ("copy", base), ("mutated", mutated),
+                                  ("other", random_text(20000, rng=rng)))]
+    assert len(sketches[0].hashes) == 500
+
+    jaccard = jaccard_matrix(sketches)
+    assert (jaccard == jaccard.T).all() and jaccard[0, 1] == 1.0
+    distances = distance_matrix(sketches, workers=2)
+    assert distances[0, 1] == 0.0 and 0.0 < distances[0, 2] < 0.05 and distances[0, 3] == 1.0
+
+    merges = upgma(distances)
+    assert merges[0][:2] == (0, 1) and merges[-1][3] == 4
+    assert newick(merges, ["base", "copy", "mutated", "other"]).startswith("(((base:0.000000,copy:0.000000)")
+
+
+def test_codon_usage_six_frames():
+    from common.codons import FRAMES, codon_string, codon_usage, usage_counts
+    from common.synthetic import random_text
+
+    seq = random_text(1000, rng=np.random.default_rng(6))
+    seq = seq[:500] + "N" + seq[501:]
+    usage = codon_usage(seq, chunk_size=97)
+    assert usage.shape == (len(FRAMES), 64)
+    for frame in range(6):
+        strand = seq if frame < 3 else seq[::-1].translate(str.maketrans("ACGTN", "TGCAN"))
+        expected = {}
+        for i in range(frame % 3, len(strand) - 2, 3):
+            codon = strand[i:i + 3].replace("T", "U")
+            if "N" not in codon:
+                expected[codon] = expected.get(codon, 0) + 1
+        assert usage_counts(usage[frame]) == expected
+    assert codon_string(0) == "AAA" and codon_string(63) == "UUU"
+    assert (codon_usage(seq.replace("T", "U")) == codon_usage(seq)).all()
+
+
+def test_translation_tables_and_six_frames():
+    from common.codons import translate, translate_batch, translate_frames, translation_table
+
+    assert translate("AUGUUUUAAGGN") == b"MF*X" and translate("ATGTTTTAAGGN") == b"MF*X"
+    assert translate("ATGTGAAGA", table=2) == b"MW*"
+    assert (translation_table({"UUU": "Phe", "UAA": "Stop"})[[63, 48, 0]] == np.frombuffer(b"F*X", np.uint8)).all()
+    frames = translate_frames("ATGAAACCCTAG")
+    assert frames[0] == b"MKP*" and frames[3] == b"LGFH" and frames[5] == b"RVS"
+    sequences = ["ATGAAACCCTAG", "", "GC", "ATGC" * 10]
+    assert translate_batch(sequences, batch_bases=20) == [translate_frames(seq) for seq in sequences]
+
+
+def test_six_frame_orfs_across_chunks():
+    from common.orfs import iter_orfs, orf_protein
+    from common.synthetic import random_text
+
+    seq = random_text(5000, rng=np.random.default_rng(7))
+    whole = list(iter_orfs(seq, min_length=10))
+    assert {orf["strand"] for orf in whole} == {"+", "-"}
+    assert sorted(whole, key=lambda orf: orf["start"]) == \
+        sorted(iter_orfs(seq, min_length=10, chunk_size=100), key=lambda orf: orf["start"])
+    for orf in whole:
+        protein = orf_protein(seq, orf)
+        assert protein[:1] == b"M" and protein.find(b"*") == len(protein) - 1 == orf["length"]
+        offset = orf["start"] if orf["strand"] == "+" else len(seq) - 1 - orf["end"]
+        assert offset % 3 == int(orf["frame"][1]) - 1
+    assert list(iter_orfs("CCATGAAATAGCC", min_length=1)) == [
+        {"start": 2, "end": 10, "strand": "+", "frame": "+3", "length": 2}]
+
+
+def test_composition_windows_match_direct_counts():
+    from common.composition import Composition, window_frequencies
+
+    seq = "ACGTNACCGGTTAAAC"
+    composition = Composition(seq)
+    counts = composition.counts(5, step=2)
+    for row, start in zip(counts, range(0, len(seq) - 4, 2)):
+        assert list(row) == [seq[start:start + 5].count(base) for base in "ACGT"]
+    columns = window_frequencies(composition, 4, 3)
+    assert list(columns["start"]) == [0, 3, 6, 9, 12] and list(columns["end"]) == [3, 6, 9, 12, 15]
+    assert columns["G"][2] == 0.5 and len(window_frequencies(seq, 17)["A"]) == 0
+    assert window_frequencies(composition, 2, is_stale=lambda: True) is None
+
+
+
+def test_latest_worker_delivers_only_the_newest_job():
+    import threading
+    import time
+    from common.worker import LatestWorker
+
+    def wait_for(worker):
+        for _ in range(500):
+            result = worker.poll()
+            if result is not None:
+                return result
+            time.sleep(0.01)
+
+    worker = LatestWorker()
+    started, release = threading.Event(), threading.Event()
+
+    def slow(is_stale):
+        started.set()
+        release.wait(5)
+        return "slow" if not is_stale() else None
+
+    # a running job superseded by a newer one is dropped; a waiting one never runs
+    worker.submit(slow)
+    started.wait(5)
+    worker.submit(lambda is_stale: "never")
+    worker.submit(lambda is_stale: "newest")
+    release.set()
+    assert wait_for(worker) == "newest"
+
+    # cancel() drops pending work and makes the running result stale
+    started.clear(), release.clear()
+    worker.submit(lambda is_stale: (started.set(), release.wait(5), "stale")[-1])
+    started.wait(5)
+    worker.submit(lambda is_stale: "pending")
+    worker.cancel()
+    release.set()
+    time.sleep(0.1)
+    assert worker.poll() is None
+
+    # a failing job is reported and the thread keeps serving
+    worker.submit(lambda is_stale: 1 // 0)
+    assert isinstance(wait_for(worker), ZeroDivisionError)
+    worker.submit(lambda is_stale: "after")
+    assert wait_for(worker) == "after"
+
+def test_moving_average_and_minmax_decimation():
+    from common.tracks import minmax_decimate, moving_average
+
+    values = [1.0, 2.0, 6.0, 3.0, 8.0]
+    assert list(moving_average(values, 3)) == [1.5, 3.0, 11 / 3, 17 / 3, 5.5]
+    assert list(moving_average(values, 1)) == values
+    x = np.arange(1001)
+    y = np.sin(x / 50.0)
+    y[333] = 5.0
+    xs, ys = minmax_decimate(x, y, 100)
+    assert len(xs) <= 202 and (np.diff(xs) >= 0).all()
+    assert ys.max() == 5.0 and xs[ys.argmax()] == 333 and ys.min() == y.min()
+
+
+def test_melting_temperature_tracks():
+    import math
+
+    from common.composition import Composition
+    from common.melting import NearestNeighborTm, salt_adjusted_tm, wallace_tm
+
+    seq = "ATTTCGCCGATANGCGC"
+    composition = Composition(seq)
+    assert wallace_tm(composition, 12)[0] == 4 * 5 + 2 * 7
+    assert math.isclose(salt_adjusted_tm(composition, 12)[0],
+                        81.5 + 16.6 * math.log10(0.001) + 0.41 * 5 / 12 * 100 - 600 / 12)
+    tm = NearestNeighborTm(seq).tm(5, step=2)
+    assert len(tm) == 7 and np.isnan(tm[4]) and not np.isnan(tm[:4]).any()
+    # GCGC: steps GC + CG + GC, two G.C ends, 50 mM Na+, 250 nM strands
+    dh = -9.8 - 10.6 - 9.8 + 0.2
+    ds = -24.4 - 27.2 - 24.4 - 5.6 + 0.368 * 3 * math.log(0.05)
+    expected = dh * 1000 / (ds + 1.987 * math.log(250e-9 / 4)) - 273.15
+    assert math.isclose(NearestNeighborTm(seq).tm(4)[-1], expected)
+
+
+def test_threshold_runs_and_bed_export(tmp_path):
+    from common.tracks import runs_to_bases, threshold_runs, write_bed
+
+    signal = [1.0, 5.0, 6.0, 2.0, np.nan, 7.0, 7.0, 7.0]
+    runs = threshold_runs(signal, 5.0)
+    assert runs.tolist() == [[1, 3], [5, 8]]
+    assert threshold_runs(signal, 5.0, mode="below").tolist() == [[0, 1], [3, 4]]
+    assert threshold_runs([], 1.0).shape == (0, 2)
+    regions = runs_to_bases(runs, window_size=9, step=2)
+    assert regions.tolist() == [[2, 13], [10, 23]]
+    write_bed(str(tmp_path / "r.bed"), "chr1", regions, name="high")
+    assert (tmp_path / "r.bed").read_text() == "chr1\t2\t13\thigh\nchr1\t10\t23\thigh\n"
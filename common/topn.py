@@ -0,0 +1,132 @@
+"""
+Top-N selection without sorting everything, and a fixed-memory
+heavy-hitter summary for inputs too large to count exactly.
+
+top_items / top_codes pick the N largest counts with a heap or
+np.argpartition and sort only those N. top_tables does the same over the
+disjoint tables of a spilled count, one table at a time.
+
+HeavyHitters is a Misra-Gries summary (the deterministic twin of
+SpaceSaving) kept as NumPy arrays of at most `capacity` codes. Batches of
+codes are counted exactly, merged into the summary and pruned by
+subtracting the (capacity + 1)-th largest count, so memory never grows past
+capacity entries plus one batch. After N items every count is low by at
+most N / (capacity + 1), and every item occurring more often than that is
+guaranteed to be in the summary. Choose capacity = ceil(1 / epsilon) for
+an error of at most epsilon * N.
+"""
+
+import heapq
+import math
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from common.kmers import CHUNK, _as_collection, kmer_codes, kmer_string, reduce_counts
+
+
+def top_items(item_count: Dict, n: int) -> List[Tuple]:
+    """
+    The n (item, count) pairs with the largest counts, largest first.
+    Same result as sorting all items, ties kept in insertion order.
+    """
+    return heapq.nlargest(n, item_count.items(), key=lambda item: item[1])
+
+
+def top_codes(codes: np.ndarray, counts: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """The n largest counts (and their codes), largest first, ties by code."""
+    if n <= 0:
+        return codes[:0], counts[:0]
+    if n < len(counts):
+        chosen = np.argpartition(-counts, n - 1)[:n]
+        # keep every entry tied with the n-th count so the tie order is stable
+        cutoff = counts[chosen].min()
+        chosen = np.flatnonzero(counts >= cutoff)
+    else:
+        chosen = np.arange(len(counts))
+    order = np.lexsort((codes[chosen], -counts[chosen]))[:n]
+    return codes[chosen[order]], counts[chosen[order]]
+
+
+
+def top_tables(tables: Iterable[Tuple[np.ndarray, np.ndarray]],
+               n: int) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    top_codes over (codes, counts) tables with disjoint codes, such as the
+    partitions of common.kmers.iter_kmers_sparse, plus the number of
+    distinct codes. Only the running top n is kept between tables.
+    """
+    best_codes, best_counts, distinct = None, None, 0
+    for codes, counts in tables:
+        distinct += len(codes)
+        codes, counts = top_codes(codes, counts, n)
+        if best_codes is not None:
+            codes, counts = top_codes(np.concatenate((best_codes, codes)),
+                                      np.concatenate((best_counts, counts)), n)
+        best_codes, best_counts = codes, counts
+    if best_codes is None:
+        return np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.int64), 0
+    return best_codes, best_counts, distinct
+
+class HeavyHitters:
+    """Mergeable Misra-Gries summary of integer codes in fixed memory."""
+
+    def __init__(self, capacity: int = None, epsilon: float = None):
+        if capacity is None:
+            if not epsilon or epsilon <= 0:
+                raise ValueError("give a capacity or an epsilon > 0")
+            capacity = math.ceil(1 / epsilon)
+        self.capacity = capacity
+        self.codes = np.zeros(0, dtype=np.uint64)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.total = 0
+        self.decrement = 0
+
+    @property
+    def error_bound(self) -> int:
+        """Most any count can be below the true count."""
+        return self.decrement
+
+    def _merge_table(self, codes: np.ndarray, counts: np.ndarray):
+        codes, counts = reduce_counts(np.concatenate((self.codes, codes.astype(np.uint64))),
+                                      np.concatenate((self.counts, counts)))
+        if len(counts) > self.capacity:
+            threshold = np.partition(counts, len(counts) - self.capacity - 1)[len(counts) - self.capacity - 1]
+            counts = counts - threshold
+            keep = counts > 0
+            codes, counts = codes[keep], counts[keep]
+            self.decrement += int(threshold)
+        self.codes, self.counts = codes, counts
+
+    def update(self, codes: np.ndarray, counts: np.ndarray = None):
+        """Add a batch of codes (or of distinct codes with their counts)."""
+        if counts is None:
+            codes, counts = reduce_counts(codes)
+        self.total += int(counts.sum())
+        self._merge_table(codes, counts)
+
+    def merge(self, other: "HeavyHitters"):
+        """Fold in a summary built on other data (e.g. in another process)."""
+        self.total += other.total
+        self.decrement += other.decrement
+        self._merge_table(other.codes, other.counts)
+
+    def top(self, n: int) -> List[Tuple[int, int, int]]:
+        """(code, lower bound, upper bound) of the n most frequent codes."""
+        codes, counts = top_codes(self.codes, self.counts, n)
+        return [(code, count, count + self.decrement)
+                for code, count in zip(codes.tolist(), counts.tolist())]
+
+
+def heavy_hitter_kmers(sequences, k: int, n: int = 20, epsilon: float = 1e-5,
+                       canonical: bool = False, chunk_size: int = CHUNK // 4) -> List[Tuple[str, int, int]]:
+    """
+    Approximate top-n k-mers (k <= 31) of one sequence or a collection, in
+    memory fixed by epsilon. Returns (k-mer, lower, upper) bounds on the
+    count, largest first.
+    """
+    summary = HeavyHitters(epsilon=epsilon)
+    for sequence in _as_collection(sequences):
+        for start in range(0, max(1, len(sequence) - k + 1), chunk_size):
+            summary.update(kmer_codes(sequence[start:start + chunk_size + k - 1], k, canonical))
+    return [(kmer_string(code, k), lower, upper) for code, lower, upper in summary.top(n)]
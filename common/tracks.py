@@ -0,0 +1,125 @@
+"""
+Fast smoothing and drawing of long per-window tracks.
+
+moving_average is a centred box filter computed from one cumulative sum,
+so it costs O(n) whatever the smoothing width; windows are cut at both
+ends of the track, like the per-point loops it replaces. minmax_decimate
+keeps the smallest and largest value of each pixel column, which is all a
+line plot of that width can show, so a million-point track is drawn as a
+few thousand points without losing its peaks.
+
+LineTracks owns one Line2D per named track on an existing axes and only
+swaps their data on update, so redrawing never clears or rebuilds the
+axes.
+
+threshold_runs turns a track and a cutoff into run-length intervals with
+one np.diff over the boolean mask. draw_runs renders all of them as a
+single broken_barh collection, and write_bed exports them in base
+coordinates.
+"""
+
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+
+
+def moving_average(values, k: int) -> np.ndarray:
+    """
+    Mean of values[i - k // 2 : i + k // 2 + 1] for every i, the window
+    clipped to the track.
+    """
+    values = np.asarray(values, dtype=float)
+    if k <= 1 or len(values) == 0:
+        return values
+    half = k // 2
+    prefix = np.concatenate(([0.0], np.cumsum(values)))
+    index = np.arange(len(values))
+    left = np.maximum(0, index - half)
+    right = np.minimum(len(values), index + half + 1)
+    return (prefix[right] - prefix[left]) / (right - left)
+
+
+def minmax_decimate(x, y, buckets: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    At most 2 * buckets points of (x, y): the minimum and maximum of y in
+    each of `buckets` consecutive runs, in their original order.
+    """
+    x, y = np.asarray(x), np.asarray(y)
+    n = len(y)
+    if buckets < 1 or n <= 2 * buckets:
+        return x, y
+    size = -(-n // buckets)
+    full = n // size * size
+    rows = y[:full].reshape(-1, size)
+    starts = np.arange(0, full, size)
+    low = starts + rows.argmin(axis=1)
+    high = starts + rows.argmax(axis=1)
+    chosen = np.sort(np.concatenate((low, high)))
+    if full < n:
+        tail = y[full:]
+        chosen = np.concatenate((chosen, np.sort([full + tail.argmin(), full + tail.argmax()])))
+    return x[chosen], y[chosen]
+
+
+class LineTracks:
+    """One Line2D per named track on an axes, updated in place."""
+
+    def __init__(self, ax, labels: Iterable[str], legend_title: str = None):
+        self.ax = ax
+        self.lines = {label: ax.plot([], [], label=label)[0] for label in labels}
+        self.legend = ax.legend(title=legend_title)
+        self.legend.set_visible(False)
+
+    def update(self, x, tracks: Dict[str, np.ndarray], smooth: int = 1):
+        """Smooth each track, decimate it to the axes' pixel width and show it."""
+        width = max(1, int(self.ax.bbox.width))
+        for label, y in tracks.items():
+            self.lines[label].set_data(*minmax_decimate(x, moving_average(y, smooth), width))
+        self.legend.set_visible(True)
+        self.ax.relim()
+        self.ax.autoscale_view(scaley=False)
+
+    def clear(self):
+        for line in self.lines.values():
+            line.set_data([], [])
+        self.legend.set_visible(False)
+
+
+def threshold_runs(signal, threshold: float, mode: str = "above") -> np.ndarray:
+    """
+    (runs, 2) array of the [start, end) index ranges where the signal is
+    >= threshold (mode "above") or < threshold (mode "below"). NaN never
+    counts as a hit.
+    """
+    signal = np.asarray(signal, dtype=float)
+    if mode == "above":
+        hit = signal >= threshold
+    elif mode == "below":
+        hit = signal < threshold
+    else:
+        raise ValueError("mode must be 'above' or 'below'")
+    edges = np.diff(np.concatenate(([0], hit.astype(np.int8), [0])))
+    return np.column_stack((np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)))
+
+
+def runs_to_bases(runs: np.ndarray, window_size: int, step: int = 1) -> np.ndarray:
+    """
+    Base ranges [start, end) spanned by runs of sliding windows (from the
+    first base of the first window to the last base of the last).
+    """
+    runs = np.asarray(runs).reshape(-1, 2)
+    return np.column_stack((runs[:, 0] * step, (runs[:, 1] - 1) * step + window_size))
+
+
+def draw_runs(ax, runs: np.ndarray, y: float = 0.0, height: float = 1.0, **style):
+    """Draw every run as a bar from y to y + height with one broken_barh call."""
+    runs = np.asarray(runs).reshape(-1, 2)
+    return ax.broken_barh(np.column_stack((runs[:, 0], runs[:, 1] - runs[:, 0])), (y, height), **style)
+
+
+def write_bed(path: str, chrom: str, intervals: np.ndarray, name: str = None):
+    """Write [start, end) base intervals as BED (0-based, end exclusive)."""
+    suffix = f"\t{name}" if name else ""
+    with open(path, "w") as handle:
+        handle.writelines(f"{chrom}\t{start}\t{end}{suffix}\n"
+                          for start, end in np.asarray(intervals).reshape(-1, 2).tolist())
@@ -0,0 +1,73 @@
+"""
+Background worker that only cares about the newest request.
+
+Interactive tools (L2's window analyzer) recompute on every slider move,
+but only the latest setting matters. LatestWorker runs jobs on one daemon
+thread: submitting a job replaces one that has not started yet and makes
+a running one stale, so it can stop early and its result is dropped.
+Results are collected with poll() from the GUI thread, since Tk widgets
+must not be touched from the worker.
+"""
+
+import queue
+import threading
+from typing import Any, Callable, Optional
+
+Job = Callable[[Callable[[], bool]], Any]
+
+
+class LatestWorker:
+    """
+    One background thread that runs only the newest job. A job is called
+    with an is_stale() callable and returns its result, or None when it
+    gave up. An exception raised by a job is delivered by poll() in place
+    of the result, and the thread keeps serving later jobs.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._pending = None
+        self._generation = 0
+        self._finished = queue.Queue()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, job: Job):
+        with self._condition:
+            self._generation += 1
+            self._pending = (self._generation, job)
+            self._condition.notify()
+
+    def cancel(self):
+        """Drop the job that has not started and make the running one stale."""
+        with self._condition:
+            self._generation += 1
+            self._pending = None
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending is None:
+                    self._condition.wait()
+                generation, job = self._pending
+                self._pending = None
+            is_stale = lambda: generation != self._generation
+            try:
+                result = job(is_stale)
+            except Exception as exc:
+                result = exc
+            if result is not None and not is_stale():
+                self._finished.put((generation, result))
+
+    def poll(self) -> Optional[Any]:
+        """
+        The newest finished result (or exception) that is still current,
+        or None.
+        """
+        latest = None
+        while True:
+            try:
+                generation, result = self._finished.get_nowait()
+            except queue.Empty:
+                return latest
+            if generation == self._generation:
+                latest = result